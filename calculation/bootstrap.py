@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+#title          : bootstrap.py
+#description    : Monte Carlo estimation of p-values and confidence intervals.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python bootstrap.py
+#=====================================================================
+import numpy as np
+from core import histogram as hi
+from distributions import distribution as dist
+from calculation import fit
+from calculation import measures as me
+
+
+# Number of replicates exceeding the observed statistics after which the sequential
+# p-value is reported.
+SEQUENTIAL_EXCEEDANCES = 10
+
+# Maximum number of Nelder-Mead iterations when refitting a synthetic sample from the
+# original optimum.
+REFIT_MAXITER = 50
+
+# Number of synthetic samples refitted in one task.
+REFIT_BLOCK_SIZE = 10
+
+# Number of resampled data sets for the confidence intervals.
+CONFIDENCE_REPLICATES = 200
+
+# Default confidence level of the intervals.
+CONFIDENCE_LEVEL = 0.95
+
+
+def replicate_ks_statistics(distribution, params, size):
+    """
+    Calculates the K-S statistics of a synthetic sample drawn from a fitted distribution.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param size: size of the synthetic sample.
+    :return: K-S statistics.
+    """
+    synthetic_sample = dist.samples(distribution, params, size)
+    return me.ks_statistics(dist.get_sample_cdf(synthetic_sample),
+                            dist.cdf(distribution, params, int(np.max(synthetic_sample))))
+
+
+def _p_value(statistics, ksd, replicates, sequential, significance):
+    """
+    Estimates the p-value of the observed K-S statistics from a stream of synthetic
+    statistics.
+
+    In sequential mode, the method of Besag and Clifford is used: sampling stops as soon as
+    SEQUENTIAL_EXCEEDANCES synthetic statistics exceed the observed one, and the p-value is
+    estimated by their ratio to the replicates drawn so far. If a significance level is
+    given, sampling also stops once the p-value falls below the level even if all remaining
+    replicates exceeded the observed statistics. Otherwise, all replicates are drawn.
+
+    :param statistics: iterable of synthetic K-S statistics.
+    :param ksd: observed K-S statistics.
+    :param replicates: maximum number of synthetic samples.
+    :param sequential: whether sampling should stop early.
+    :param significance: optional significance level of the decision in sequential mode.
+    :return: tuple containing the p-value and the number of synthetic samples used.
+    """
+    exceedances = 0
+    for r, statistic in enumerate(statistics, 1):
+        if statistic > ksd:
+            exceedances += 1
+        if sequential:
+            if exceedances >= SEQUENTIAL_EXCEEDANCES:
+                return float(exceedances)/float(r), r
+            if significance is not None\
+                    and float(exceedances+replicates-r+1)/float(replicates+1) < significance:
+                return float(exceedances+1)/float(r+1), r
+    if sequential:
+        return float(exceedances+1)/float(replicates+1), replicates
+    return float(exceedances)/float(replicates), replicates
+
+
+def ks_p_value(distribution, params, ksd, size, replicates=100, sequential=False, significance=None):
+    """
+    Estimates the p-value of the K-S statistics by comparing it to the statistics of
+    synthetic samples drawn from the fitted distribution, without refitting them.
+
+    :param distribution: fitted distribution.
+    :param params: fitted parameters.
+    :param ksd: observed K-S statistics.
+    :param size: sample size.
+    :param replicates: maximum number of synthetic samples.
+    :param sequential: whether sampling should stop early.
+    :param significance: optional significance level of the decision in sequential mode.
+    :return: tuple containing the p-value and the number of synthetic samples used.
+    """
+    statistics = (replicate_ks_statistics(distribution, params, size) for _ in range(replicates))
+    return _p_value(statistics, ksd, replicates, sequential, significance)
+
+
+def _refit_block(distribution, params, size, count, maxiter, seed):
+    """
+    Draws synthetic samples from a fitted distribution and refits each of them by K-S
+    optimization starting from the original optimum.
+
+    :param distribution: fitted distribution.
+    :param params: fitted parameters.
+    :param size: sample size.
+    :param count: number of synthetic samples.
+    :param maxiter: maximum number of iterations of the refits.
+    :param seed: seed of the random number generator of the block.
+    :return: list of the K-S statistics of the refitted samples.
+    """
+    rng = np.random.default_rng(seed)
+    return [fit.fit_ks(distribution, dist.samples(distribution, params, size, rng), init=params, maxiter=maxiter)['D']
+            for _ in range(count)]
+
+
+def _refit_statistics(distribution, params, size, replicates, maxiter, executor, seed):
+    """
+    Generates the K-S statistics of refitted synthetic samples in a fixed order. Samples
+    are processed in blocks, each with its own seed, and blocks run in parallel if an
+    executor is given. Pending blocks are cancelled when the generator is closed.
+
+    :param distribution: fitted distribution.
+    :param params: fitted parameters.
+    :param size: sample size.
+    :param replicates: number of synthetic samples.
+    :param maxiter: maximum number of iterations of the refits.
+    :param executor: optional executor to run the blocks.
+    :param seed: optional seed of the whole bootstrap.
+    :return: generator of K-S statistics.
+    """
+    counts = [min(REFIT_BLOCK_SIZE, replicates-i) for i in range(0, replicates, REFIT_BLOCK_SIZE)]
+    seeds = np.random.SeedSequence(seed).generate_state(len(counts))
+    if executor is None:
+        for count, block_seed in zip(counts, seeds):
+            for statistic in _refit_block(distribution, params, size, count, maxiter, block_seed):
+                yield statistic
+    else:
+        futures = [executor.submit(_refit_block, distribution, params, size, count, maxiter, block_seed)
+                   for count, block_seed in zip(counts, seeds)]
+        try:
+            for future in futures:
+                for statistic in future.result():
+                    yield statistic
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def ks_refit_p_value(distribution, params, ksd, size, replicates=100, sequential=False, significance=None,
+                     maxiter=REFIT_MAXITER, executor=None, seed=None):
+    """
+    Estimates the p-value of the K-S statistics by the bootstrap of Clauset et al.: every
+    synthetic sample is refitted before its K-S statistics is calculated, otherwise the
+    synthetic statistics are too small and the p-value is too large. Refits start from the
+    original optimum with a limited number of iterations as the optima of the synthetic
+    samples lie close to it.
+
+    :param distribution: fitted distribution.
+    :param params: fitted parameters.
+    :param ksd: observed K-S statistics.
+    :param size: sample size.
+    :param replicates: maximum number of synthetic samples.
+    :param sequential: whether sampling should stop early.
+    :param significance: optional significance level of the decision in sequential mode.
+    :param maxiter: maximum number of iterations of the refits.
+    :param executor: optional executor to refit blocks of synthetic samples in parallel.
+    :param seed: optional seed to make the p-value reproducible.
+    :return: tuple containing the p-value and the number of synthetic samples used.
+    """
+    statistics = _refit_statistics(distribution, params, size, replicates, maxiter, executor, seed)
+    try:
+        return _p_value(statistics, ksd, replicates, sequential, significance)
+    finally:
+        statistics.close()
+
+
+def _resample_block(distribution, data, params, objective, count, maxiter, seed):
+    """
+    Resamples the data from its histogram and refits each resampled data set starting from
+    the point estimate.
+
+    :param distribution: fitted distribution.
+    :param data: data used in the fit.
+    :param params: point estimate of the parameters.
+    :param objective: objective of the fit.
+    :param count: number of resampled data sets.
+    :param maxiter: maximum number of iterations of the refits.
+    :param seed: seed sequence of the random number generator of the block.
+    :return: list of the refitted parameters.
+    """
+    summary = hi.summarize(data)
+    rng = np.random.default_rng(seed)
+    _fit = fit.fit_mle if objective == fit.OBJECTIVE_MLE else fit.fit_ks
+    frequencies = summary.counts/float(summary.size)
+    estimates = []
+    for _ in range(count):
+        counts = rng.multinomial(summary.size, frequencies)
+        _mask = counts > 0
+        resampled = hi.Histogram(summary.values[_mask], counts[_mask])
+        estimates.append(_fit(distribution, resampled, init=params, maxiter=maxiter)['params'])
+    return estimates
+
+
+def confidence_intervals(distribution, data, params, objective=fit.OBJECTIVE_MLE, replicates=CONFIDENCE_REPLICATES,
+                         level=CONFIDENCE_LEVEL, maxiter=REFIT_MAXITER, executor=None, seed=None):
+    """
+    Calculates percentile confidence intervals of the fitted parameters by the
+    nonparametric bootstrap. Data sets are resampled from the histogram of the data by
+    multinomial draws over its unique values, and refitted from the point estimate.
+    Resamples are processed in blocks with independent generator streams spawned from the
+    seed, therefore the intervals do not depend on the executor.
+
+    :param distribution: fitted distribution.
+    :param data: data used in the fit.
+    :param params: point estimate of the parameters.
+    :param objective: objective of the fit (fit.OBJECTIVE_MLE or fit.OBJECTIVE_KS).
+    :param replicates: number of resampled data sets.
+    :param level: confidence level.
+    :param maxiter: maximum number of iterations of the refits.
+    :param executor: optional executor to refit blocks of resampled data sets in parallel.
+    :param seed: optional seed to make the intervals reproducible.
+    :return: tuple of numpy arrays containing the lower and upper bounds of the parameters.
+    """
+    payload = hi.portable(data)
+    counts = [min(REFIT_BLOCK_SIZE, replicates-i) for i in range(0, replicates, REFIT_BLOCK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    if executor is None:
+        blocks = [_resample_block(distribution, payload, params, objective, count, maxiter, block_seed)
+                  for count, block_seed in zip(counts, seeds)]
+    else:
+        futures = [executor.submit(_resample_block, distribution, payload, params, objective, count, maxiter,
+                                   block_seed)
+                   for count, block_seed in zip(counts, seeds)]
+        blocks = [future.result() for future in futures]
+    estimates = np.array([estimate for block in blocks for estimate in block])
+    alpha = 100.0*(1.0-level)/2.0
+    return np.percentile(estimates, alpha, axis=0), np.percentile(estimates, 100.0-alpha, axis=0)
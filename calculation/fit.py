@@ -6,48 +6,388 @@
 #version        : 0.1
 #usage          : python fit.py
 #===============================================
+import numpy as np
+from concurrent.futures import as_completed
+from core import histogram as hi
+from core import grids
 from distributions import distribution as dist
 from calculation.measures import ks_statistics
 from scipy import optimize as op
 
 
-def fit_mle(distribution, data):
+# Fitting modes
+FIT_MODE_LOCAL = 'local'  # Nelder-Mead from the initial parameters
+FIT_MODE_GLOBAL = 'global'  # Grid scan refined by Nelder-Mead from the best grid points
+
+# Available fitting modes
+AVAILABLE_MODES = [
+    FIT_MODE_LOCAL,
+    FIT_MODE_GLOBAL
+]
+
+# Objectives to minimize
+OBJECTIVE_MLE = 'mle'  # negative log-likelihood
+OBJECTIVE_KS = 'ks'  # K-S statistics
+
+# Number of grid points along each parameter axis in the global mode.
+GLOBAL_FIT_GRID_POINTS = 16
+
+# Maximum number of grid points that are refined in the global mode.
+GLOBAL_FIT_CANDIDATES = 4
+
+# Relative tolerance for two refined optima to be considered the same.
+GLOBAL_FIT_TOLERANCE = 1e-3
+
+# Relative step of the finite difference Hessian.
+HESSIAN_STEP = 1e-4
+
+# Distributions whose tail above x_min can be fitted.
+XMIN_DISTRIBUTIONS = [
+    dist.DISTRIBUTION_SHIFTED_POWER_LAW,
+    dist.DISTRIBUTION_TRUNCATED_POWER_LAW
+]
+
+# Smallest tail size for a value to be considered as x_min.
+XMIN_MIN_TAIL_SIZE = 10
+
+# Number of consecutive x_min candidates fitted in one task of the scan.
+XMIN_BLOCK_SIZE = 8
+
+
+def _objective(objective, distribution, data):
+    """
+    Creates the function to minimize.
+    The function accepts a single parameter vector or a (k, p) matrix of parameter vectors.
+
+    :param objective: objective to use.
+    :param distribution: distribution to fit.
+    :param data: data to use.
+    :return: objective function.
+    """
+    if objective == OBJECTIVE_MLE:
+        summary = hi.summarize(data)
+        return lambda x: -dist.log_likelihood(distribution, x, summary)
+    else:
+        summary = hi.summarize(data)
+        data_max = int(summary.max())
+        sample_cdf = summary.cdf()
+        # the model cdf is calculated in the same buffer in every evaluation
+        scratch = np.empty(data_max+1)
+
+        def ksd(x):
+            if np.ndim(x) == 2:
+                return np.array([ksd(p) for p in x])
+            return ks_statistics(sample_cdf, dist.cdf(distribution, x, domain=data_max, out=scratch),
+                                 overwrite_model=True)
+        return ksd
+
+
+def _local_fit(objective, distribution, data, params, maxiter=None):
+    """
+    Minimizes the objective with the Nelder-Mead method from the given parameters.
+
+    :param objective: objective to use.
+    :param distribution: distribution to fit.
+    :param data: data to use.
+    :param params: initial parameters.
+    :param maxiter: optional maximum number of iterations.
+    :return: tuple of the optimal parameters and the value of the objective.
+    """
+    options = None if maxiter is None else {'maxiter': maxiter}
+    res = op.minimize(_objective(objective, distribution, data), params, method='Nelder-Mead', options=options)
+    return res.x, float(res.fun)
+
+
+def _score(result):
+    """
+    Returns the objective value of a fit result for ranking, where non-finite values
+    signal degenerate parameters and rank last.
+
+    :param result: tuple of parameters and objective value.
+    :return: objective value.
+    """
+    return result[1] if np.isfinite(result[1]) else np.inf
+
+
+def _agree(results):
+    """
+    Checks if the two best optima found so far are the same.
+
+    :param results: list of (parameters, objective value) tuples.
+    :return: true if the best two optima agree, false otherwise.
+    """
+    if len(results) < 2:
+        return False
+    first, second = sorted(results, key=_score)[:2]
+    return abs(first[1]-second[1]) <= GLOBAL_FIT_TOLERANCE*max(1.0, abs(first[1]))\
+        and np.allclose(first[0], second[0], rtol=GLOBAL_FIT_TOLERANCE, atol=GLOBAL_FIT_TOLERANCE)
+
+
+def _global_fit(objective, distribution, data, executor=None):
+    """
+    Minimizes the objective by a coarse scan over the parameter grid of the distribution
+    followed by Nelder-Mead refinements from the best grid points. Refinement stops as soon
+    as two refined optima agree.
+
+    :param objective: objective to use.
+    :param distribution: distribution to fit.
+    :param data: data to use.
+    :param executor: optional executor to run the refinements in parallel.
+    :return: tuple of the optimal parameters and the value of the objective.
+    """
+    grid = dist.fit_grid(distribution, GLOBAL_FIT_GRID_POINTS)
+    with np.errstate(all='ignore'):
+        scores = np.asarray(_objective(objective, distribution, data)(grid), dtype=float)
+    scores[~np.isfinite(scores)] = np.inf
+    candidates = grid[np.argsort(scores, kind='stable')[:GLOBAL_FIT_CANDIDATES]]
+    results = []
+    if executor is None:
+        for params in candidates:
+            results.append(_local_fit(objective, distribution, data, params))
+            if _agree(results):
+                break
+    else:
+        payload = hi.portable(data)
+        futures = [executor.submit(_local_fit, objective, distribution, payload, params) for params in candidates]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if _agree(results):
+                for f in futures:
+                    f.cancel()
+                break
+    return min(results, key=_score)
+
+
+def _fit(objective, distribution, data, mode, executor, init=None, maxiter=None):
+    """
+    Minimizes the objective with the given fitting mode.
+
+    :param objective: objective to use.
+    :param distribution: distribution to fit.
+    :param data: data to use.
+    :param mode: fitting mode.
+    :param executor: optional executor for the global mode.
+    :param init: optional initial parameters for the local mode.
+    :param maxiter: optional maximum number of iterations for the local mode.
+    :return: tuple of the optimal parameters and the value of the objective.
+    """
+    if mode not in AVAILABLE_MODES:
+        raise ValueError("unknown fitting mode: %s" % mode)
+    if mode == FIT_MODE_GLOBAL:
+        return _global_fit(objective, distribution, data, executor)
+    if init is None:
+        init = dist.initial_params(distribution, hi.summarize(data))
+    return _local_fit(objective, distribution, data, init, maxiter)
+
+
+def _hessian(distribution, params, data):
+    """
+    Calculates the Hessian of the log-likelihood by central finite differences.
+    All points of the stencil are evaluated in a single batched log-likelihood call.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param data: histogram of the data.
+    :return: Hessian matrix as a numpy array.
+    """
+    _params = np.asarray(params, dtype=float)
+    p = len(_params)
+    h = HESSIAN_STEP*np.maximum(np.abs(_params), 1.0)
+    steps = np.diag(h)
+    pairs = [(i, j) for i in range(p) for j in range(i+1, p)]
+    stencil = [_params]
+    for i in range(p):
+        stencil += [_params+steps[i], _params-steps[i]]
+    for i, j in pairs:
+        stencil += [_params+steps[i]+steps[j], _params+steps[i]-steps[j],
+                    _params-steps[i]+steps[j], _params-steps[i]-steps[j]]
+    ll = np.atleast_1d(dist.log_likelihood(distribution, np.array(stencil), data))
+    hessian = np.empty((p, p))
+    for i in range(p):
+        hessian[i, i] = (ll[1+2*i] - 2*ll[0] + ll[2+2*i])/h[i]**2
+    for k, (i, j) in enumerate(pairs):
+        f = ll[1+2*p+4*k:5+2*p+4*k]
+        hessian[i, j] = hessian[j, i] = (f[0] - f[1] - f[2] + f[3])/(4*h[i]*h[j])
+    return hessian
+
+
+def covariance(distribution, params, data):
+    """
+    Calculates the asymptotic covariance matrix of the maximum likelihood estimate as the
+    inverse of the observed Fisher information. The information is given in closed form if
+    the distribution supports it, otherwise by the finite difference Hessian.
+
+    :param distribution: fitted distribution.
+    :param params: maximum likelihood estimate of the parameters.
+    :param data: data used in the fit.
+    :return: covariance matrix as a numpy array, filled with NaN if the information is
+    singular.
+    """
+    summary = hi.summarize(data)
+    information = dist.information(distribution, params, summary)
+    if information is None:
+        with np.errstate(all='ignore'):
+            information = -_hessian(distribution, params, summary)
+    try:
+        return np.linalg.inv(information)
+    except np.linalg.LinAlgError:
+        return np.full((len(params), len(params)), np.nan)
+
+
+def fit_mle(distribution, data, mode=FIT_MODE_LOCAL, executor=None, init=None, maxiter=None, errors=False):
     """
     Fits a given distribution on the data using maximum likelihood estimation.
+    If the distribution has a closed form estimator, it is used directly in any mode.
 
     :param distribution: distribution to fit.
     :param data: data to use.
+    :param mode: fitting mode.
+    :param executor: optional executor for the refinements in the global mode.
+    :param init: optional initial parameters in the local mode, e.g., a previous optimum.
+    :param maxiter: optional maximum number of iterations in the local mode.
+    :param errors: whether the asymptotic covariance and standard errors should be
+    calculated.
     :return: fit results in a dictionary containing:
         parameter values
         log-likelihood
-        K-S statistics.
+        K-S statistics
+        covariance matrix and standard errors, if requested.
     """
-    params = dist.DISTRIBUTIONS[distribution][dist.KEY_INITIAL_FIT_PARAMS]
-    nll = lambda x: -dist.log_likelihood(distribution, x, data)
-    res = op.minimize(nll, params, method='nelder-mead')
-    return {'params': res.x,
-            'log-likelihood': float(-res.fun),
-            'D': float(ks_statistics(dist.get_sample_cdf(data), dist.cdf(distribution, res.x)))
-            }
+    summary = hi.summarize(data)
+    exact = dist.mle(distribution, summary)
+    if exact is not None:
+        params = np.asarray(exact, dtype=float)
+        nll = -dist.log_likelihood(distribution, params, summary)
+    else:
+        params, nll = _fit(OBJECTIVE_MLE, distribution, summary, mode, executor, init, maxiter)
+    result = {'params': params,
+              'log-likelihood': -nll,
+              'D': float(ks_statistics(summary.cdf(), dist.cdf(distribution, params)))
+              }
+    if errors:
+        result['covariance'] = covariance(distribution, params, summary)
+        with np.errstate(invalid='ignore'):
+            result['standard-errors'] = np.sqrt(np.diag(result['covariance']))
+    return result
 
 
-def fit_ks(distribution, data):
+def fit_ks(distribution, data, mode=FIT_MODE_LOCAL, executor=None, init=None, maxiter=None):
     """
     Fits a given distribution on the data using K-S goodness-of-fit optimization.
 
     :param distribution: distribution to fit.
     :param data: data to use.
+    :param mode: fitting mode.
+    :param executor: optional executor for the refinements in the global mode.
+    :param init: optional initial parameters in the local mode, e.g., a previous optimum.
+    :param maxiter: optional maximum number of iterations in the local mode.
     :return: fit results in a dictionary containing:
         parameter values
         log-likelihood
         K-S statistics.
     """
-    params = dist.DISTRIBUTIONS[distribution][dist.KEY_INITIAL_FIT_PARAMS]
-    data_max = int(max(data))
-    sample_cdf = dist.get_sample_cdf(data)
-    ksd = lambda x: ks_statistics(sample_cdf, dist.cdf(distribution, x, domain=data_max))
-    res = op.minimize(ksd, params, method='Nelder-Mead')
-    return {'params': res.x,
-            'log-likelihood': float(dist.log_likelihood(distribution, res.x, data)),
-            'D': float(res.fun)
-            }
\ No newline at end of file
+    payload = hi.portable(data)
+    params, ksd = _fit(OBJECTIVE_KS, distribution, payload, mode, executor, init, maxiter)
+    return {'params': params,
+            'log-likelihood': float(dist.log_likelihood(distribution, params, hi.summarize(payload))),
+            'D': ksd
+            }
+
+
+def _tail_objective(distribution, tail):
+    """
+    Creates the negative log-likelihood of the distribution conditioned on the tail, that is
+    on the values not less than the smallest element of the tail.
+
+    :param distribution: distribution to fit.
+    :param tail: histogram of the tail.
+    :return: objective function.
+    """
+    xmin = int(tail.values[0])
+
+    def nll(x):
+        with np.errstate(all='ignore'):
+            value = -(dist.log_likelihood(distribution, x, tail) - tail.size*dist.log_sf(distribution, x, xmin))
+        return value if np.isfinite(value) else np.inf
+    return nll
+
+
+def _tail_ks_statistics(distribution, params, tail):
+    """
+    Calculates the K-S statistics between the tail and the distribution conditioned on it.
+
+    :param distribution: fitted distribution.
+    :param params: parameters.
+    :param tail: histogram of the tail.
+    :return: K-S statistics.
+    """
+    xmin = int(tail.values[0])
+    x = grids.x(int(tail.max()))[xmin:]
+    with np.errstate(all='ignore'):
+        model_cdf = np.cumsum(np.exp(dist.log_pmf(distribution, params, x) - dist.log_sf(distribution, params, xmin)))
+    sample_pmf = np.zeros(len(x))
+    sample_pmf[tail.values.astype(int)-xmin] = tail.counts/float(tail.size)
+    return float(ks_statistics(np.cumsum(sample_pmf), model_cdf))
+
+
+def _fit_tails(distribution, data, indices):
+    """
+    Fits the distribution on consecutive tails, starting each fit from the optimum of the
+    previous one as the tails differ by a single value only.
+
+    :param distribution: distribution to fit.
+    :param data: data to use.
+    :param indices: indices of the unique values used as x_min, in increasing order.
+    :return: list of (x_min, parameters, log-likelihood, K-S statistics) tuples.
+    """
+    all_tails = hi.summarize(data).tails()
+    tails = [all_tails[i] for i in indices]
+    params = dist.initial_params(distribution, tails[0])
+    results = []
+    for tail in tails:
+        res = op.minimize(_tail_objective(distribution, tail), params, method='Nelder-Mead')
+        params = res.x
+        results.append((int(tail.values[0]), res.x, -float(res.fun), _tail_ks_statistics(distribution, res.x, tail)))
+    return results
+
+
+def fit_xmin(distribution, data, executor=None):
+    """
+    Fits the tail of a distribution above the optimal x_min, following Clauset et al.
+    Every unique value with a large enough tail is tried as x_min, the tail is fitted by
+    maximum likelihood and the x_min with the smallest K-S statistics is chosen.
+    The statistics of all tails are derived from the same suffix sums, and the candidates
+    are fitted in blocks that can run in parallel.
+
+    :param distribution: distribution to fit, one of XMIN_DISTRIBUTIONS.
+    :param data: data to use.
+    :param executor: optional executor to fit the blocks of candidates in parallel.
+    :return: fit results in a dictionary containing:
+        parameter values
+        log-likelihood of the tail
+        K-S statistics of the tail
+        x_min
+        tail size.
+    """
+    if distribution not in XMIN_DISTRIBUTIONS:
+        raise ValueError("x_min scan is not available for %s" % distribution)
+    summary = hi.summarize(data)
+    tails = summary.tails()
+    candidates = [i for i, t in enumerate(tails) if t.values[0] >= 1 and t.size >= XMIN_MIN_TAIL_SIZE]
+    if len(candidates) == 0:
+        raise ValueError("sample has less than %i positive values" % XMIN_MIN_TAIL_SIZE)
+    blocks = [candidates[i:i+XMIN_BLOCK_SIZE] for i in range(0, len(candidates), XMIN_BLOCK_SIZE)]
+    payload = data if hasattr(data, 'attach') else summary
+    if executor is None:
+        results = [r for block in blocks for r in _fit_tails(distribution, payload, block)]
+    else:
+        futures = [executor.submit(_fit_tails, distribution, payload, block) for block in blocks]
+        results = [r for future in futures for r in future.result()]
+    best = min(range(len(results)), key=lambda i: results[i][3])
+    xmin, params, ll, ksd = results[best]
+    return {'params': params,
+            'log-likelihood': ll,
+            'D': ksd,
+            'xmin': xmin,
+            'tail-size': tails[candidates[best]].size
+            }
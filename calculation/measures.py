@@ -7,15 +7,17 @@
 #usage          : python measures.py
 #=====================================================================
 import numpy as np
+from math import erfc, sqrt
 from mpmath import ln
 
 
-def ks_statistics(data_cdf_, model_cdf_):
+def ks_statistics(data_cdf_, model_cdf_, overwrite_model=False):
     """
     Calculates the Kolmogorov-Smirnov D statistics for two cumulative core.
 
     :param data_cdf_: cdf of the data.
     :param model_cdf_: cdf of the model.
+    :param overwrite_model: whether the model cdf can be used as scratch space.
     :return: K-S D statistics.
     """
     _size_diff = len(data_cdf_) - len(model_cdf_)
@@ -24,6 +26,9 @@ def ks_statistics(data_cdf_, model_cdf_):
     if _size_diff < 0:
         return np.max(np.abs(np.append(data_cdf_, np.ones(-_size_diff)) - model_cdf_))
     if _size_diff == 0:
+        if overwrite_model:
+            np.subtract(model_cdf_, data_cdf_, out=model_cdf_)
+            return np.max(np.abs(model_cdf_, out=model_cdf_))
         return np.max(np.abs(data_cdf_ - model_cdf_))
 
 
@@ -53,4 +58,29 @@ def bic_measure(log_likelihood, params_num, sample_size):
     :param sample_size: sample size.
     :return: BIC value.
     """
-    return -2*log_likelihood + params_num*ln(sample_size)
\ No newline at end of file
+    return -2*log_likelihood + params_num*ln(sample_size)
+
+
+def vuong_test(log_likelihoods_1, log_likelihoods_2, weights=None):
+    """
+    Performs Vuong's likelihood ratio test for two non-nested models, that is
+    R = sum_i [ln(p1(x_i)) - ln(p2(x_i))],
+    and the two-sided p-value of R being different from zero, estimated from the variance
+    of the pointwise log-likelihood ratios.
+    Positive R favours the first model, negative R favours the second one.
+
+    :param log_likelihoods_1: pointwise log-likelihoods of the first model.
+    :param log_likelihoods_2: pointwise log-likelihoods of the second model.
+    :param weights: multiplicity of each point, if the log-likelihoods are given for the
+    unique values of the sample only.
+    :return: tuple containing the log-likelihood ratio and the p-value.
+    """
+    _diff = np.asarray(log_likelihoods_1, dtype=float) - np.asarray(log_likelihoods_2, dtype=float)
+    _weights = np.ones(len(_diff)) if weights is None else np.asarray(weights, dtype=float)
+    _n = np.sum(_weights)
+    _mean = np.sum(_weights*_diff)/_n
+    _var = np.sum(_weights*np.power(_diff-_mean, 2))/_n
+    _ratio = float(_n*_mean)
+    if _var <= 0:
+        return _ratio, 1.0
+    return _ratio, erfc(abs(_ratio)/sqrt(2*_n*_var))
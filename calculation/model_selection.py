@@ -6,11 +6,18 @@
 #version        : 0.1
 #usage          : python model_selection.py
 #===========================================================================
+import os
 import numpy as np
-from math import exp, floor
+from glob import glob
+from itertools import combinations
+from math import exp
+from core import histogram as hi
 from core import utils
+from core import shared
+from core import remote
 from distributions import distribution as dist
 from calculation import fit
+from calculation import bootstrap as bs
 from calculation import measures as me
 
 
@@ -18,15 +25,58 @@ from calculation import measures as me
 MODEL_SELECTION_METHOD_AIC = 'aic'  # Akaike information criterion
 MODEL_SELECTION_METHOD_KS = 'ks'  # Kolmogorov-Smirnov test
 MODEL_SELECTION_METHOD_BIC = 'bic'  # Bayesian information criterion
-MODEL_SELECTION_METHOD_LRT = 'lrt'  # Likelihood ratio test TODO
+MODEL_SELECTION_METHOD_LRT = 'lrt'  # Likelihood ratio test
+MODEL_SELECTION_METHOD_CV = 'cv'  # k-fold cross-validated log-likelihood
 
 # Available methods
 AVAILABLE_METHODS = [
     MODEL_SELECTION_METHOD_AIC,
     MODEL_SELECTION_METHOD_BIC,
-    MODEL_SELECTION_METHOD_KS
+    MODEL_SELECTION_METHOD_KS,
+    MODEL_SELECTION_METHOD_LRT,
+    MODEL_SELECTION_METHOD_CV
 ]
 
+# Significance level for the pairwise likelihood ratio tests.
+LRT_SIGNIFICANCE = 0.1
+
+# Number of folds of the cross-validated selection.
+CV_FOLDS = 5
+
+# Seed of the fold split, so that repeated selections on a sample agree.
+CV_SEED = 0
+
+# Name of the summary table of batch model selection.
+BATCH_SUMMARY_NAME = 'summary.csv'
+
+# Executors
+EXECUTOR_PROCESS = 'process'  # persistent local worker pool with shared-memory samples
+EXECUTOR_SOCKET = 'socket'  # local workers over sockets, further ones can connect to it
+
+# Available executors
+AVAILABLE_EXECUTORS = [
+    EXECUTOR_PROCESS,
+    EXECUTOR_SOCKET
+]
+
+
+def get_executor(name, workers=None):
+    """
+    Creates an executor for the fits and bootstraps.
+
+    :param name: name of the executor.
+    :param workers: number of local workers, the number of CPUs if not given.
+    :return: executor.
+    """
+    if name == EXECUTOR_PROCESS:
+        return shared.WorkerPool(workers)
+    if name == EXECUTOR_SOCKET:
+        executor = remote.SocketExecutor(workers)
+        print("  workers can connect to %s:%i with key %s" % (executor.address[0], executor.address[1],
+                                                              executor.authkey.hex()))
+        return executor
+    raise ValueError("unknown executor: %s" % name)
+
 
 def print_pmfs(data, fit_results, output_name):
     """
@@ -37,37 +87,240 @@ def print_pmfs(data, fit_results, output_name):
     :param output_name: name of output file.
     """
     print("  printing probability mass functions")
+    summary = hi.summarize(data)
+    data_max = int(summary.max())
     pmfs = {}
     for d in dist.get():
-        pmfs[d] = dist.pmf(d, fit_results[d]['params'], domain=np.max(data)+1)
+        pmfs[d] = dist.pmf(d, fit_results[d]['params'], domain=data_max+1)
+    frequencies = np.zeros(data_max+1)
+    frequencies[summary.values.astype(int)] = summary.counts/float(summary.size)
     output = []
-    for i in range(np.max(data.astype(int))+1):
-        row = [float(i), 0.0]
+    for i in range(data_max+1):
+        row = [float(i), frequencies[i]]
         for d in dist.get():
             row.append(pmfs[d][i])
         output.append(row)
-    for s in data:
-        output[int(floor(s))][1] += 1.0
-    for i in range(len(output)):
-        output[i][1] /= float(len(data))
     utils.print_csv(output_name, ['value', 'p_measured'] + dist.get(), output)
 
 
-def perform_aic_test(data, output_name):
+def pointwise_log_likelihood(distribution, params, data):
     """
-    Performs model selection based on the Akaike information criterion.
+    Returns the log-likelihood of a fitted distribution at each unique value of a sample,
+    such that the values weighted by their counts sum to the log-likelihood of the fit.
+    The probability mass function is used for the positive values. Some distributions
+    leave the zeros out of their log-likelihood, or approximate it for degenerate
+    parameters, therefore zeros and values outside the support of the mass function get
+    their contribution to the log-likelihood instead, and so do all values if the two
+    still disagree. The uniform approximation depends on the maximum of the sample, and
+    every value gets an equal share of its log-likelihood.
 
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param data: input data, or a reference to its shared histogram.
+    :return: log-likelihood of each unique value as a numpy array.
+    """
+    summary = hi.summarize(data)
+    ll = dist.log_pmf(distribution, params, summary.values)
+
+    def contribution(x):
+        return dist.log_likelihood(distribution, params, hi.Histogram([x], [1]))
+
+    total = dist.log_likelihood(distribution, params, summary)
+    irregular = (summary.values == 0) | ~np.isfinite(ll)
+    ll[irregular] = [contribution(x) for x in summary.values[irregular]]
+    if not np.isclose(np.dot(summary.counts, ll), total):
+        ll = np.array([contribution(x) for x in summary.values])
+    if not np.isclose(np.dot(summary.counts, ll), total):
+        ll = np.full(len(summary.values), total/summary.size)
+    return ll
+
+
+def fit_all(method, data, mode=fit.FIT_MODE_LOCAL, executor=None, **kwargs):
+    """
+    Fits all distributions on the data, which is summarized once for all fits.
+    If an executor is given, every distribution is fitted in a separate task, which receives
+    the name of the distribution and a reference to the data, i.e., the reference to the
+    histogram if the data is published to the executor, or the histogram otherwise.
+
+    :param method: fitting method, fit.fit_mle or fit.fit_ks.
     :param data: input data.
+    :param mode: fitting mode.
+    :param executor: optional executor to run the fits.
+    :param kwargs: further arguments of the fitting method.
+    :return: dictionary of the fit results for each distribution.
+    """
+    payload = hi.portable(data)
+    if executor is None:
+        return {d: method(d, payload, mode, **kwargs) for d in dist.get()}
+    futures = {d: executor.submit(method, d, payload, mode, **kwargs) for d in dist.get()}
+    return {d: futures[d].result() for d in dist.get()}
+
+
+def cv_folds(data, folds=CV_FOLDS, seed=CV_SEED):
+    """
+    Splits a sample into folds by multinomial thinning of its histogram: the count of each
+    value is divided among the folds at random with equal probabilities. The folds are
+    therefore disjoint random subsets of the sample, obtained without expanding it.
+
+    :param data: input data, or a reference to its shared histogram.
+    :param folds: number of folds, at least 2.
+    :param seed: optional seed of the split.
+    :return: (unique values, folds) numpy array of the counts in each fold.
+    """
+    if folds < 2:
+        raise ValueError("number of folds must be at least 2.")
+    summary = hi.summarize(data)
+    if summary.size < folds:
+        raise ValueError("sample is smaller than the number of folds.")
+    return np.random.default_rng(seed).multinomial(summary.counts, np.full(folds, 1.0/folds)).astype(np.int64)
+
+
+def _cv_score(distribution, data, held_out, init, mode=fit.FIT_MODE_LOCAL):
+    """
+    Fits a distribution on the sample without a fold and scores it on the fold by its
+    log-likelihood, which treats zeros the same way as the fit does.
+
+    :param distribution: distribution to fit.
+    :param data: input data, or a reference to its shared histogram.
+    :param held_out: counts of the unique values in the held-out fold.
+    :param init: initial parameters of the fit, e.g., the fit on the whole sample.
+    :param mode: fitting mode.
+    :return: mean log-likelihood of the held-out values.
+    """
+    summary = hi.summarize(data)
+    train = summary.counts - held_out
+    params = fit.fit_mle(distribution, hi.Histogram(summary.values[train > 0], train[train > 0]), mode,
+                         init=init)['params']
+    test = held_out > 0
+    ll = dist.log_likelihood(distribution, params, hi.Histogram(summary.values[test], held_out[test]))
+    return float(ll/np.sum(held_out))
+
+
+def cross_validate(data, fit_results, folds=CV_FOLDS, mode=fit.FIT_MODE_LOCAL, executor=None, seed=CV_SEED):
+    """
+    Calculates the k-fold cross-validated log-likelihood of every distribution.
+    Each distribution is refitted on every training split from its fit on the whole sample,
+    and scored by the mean log-likelihood of the held-out values. With an executor, every
+    distribution and fold is fitted in a separate task receiving a reference to the data
+    and the counts of the fold.
+
+    :param data: input data, or a reference to its shared histogram.
+    :param fit_results: fit results on the whole sample for each distribution.
+    :param folds: number of folds.
+    :param mode: fitting mode of the refits.
+    :param executor: optional executor to run the fits.
+    :param seed: optional seed of the split.
+    :return: dictionary of the (mean, standard error) of the held-out log-likelihood over
+    the folds for each distribution.
+    """
+    payload = hi.portable(data)
+    split = cv_folds(payload, folds, seed)
+    # folds that happen to be empty cannot be scored
+    columns = [j for j in range(folds) if np.sum(split[:, j]) > 0]
+    if len(columns) < 2:
+        raise ValueError("sample is too small to be split into %i folds." % folds)
+    if executor is None:
+        scores = {d: [_cv_score(d, payload, split[:, j], fit_results[d]['params'], mode) for j in columns]
+                  for d in dist.get()}
+    else:
+        futures = {d: [executor.submit(_cv_score, d, payload, split[:, j], fit_results[d]['params'], mode)
+                       for j in columns] for d in dist.get()}
+        scores = {d: [future.result() for future in futures[d]] for d in dist.get()}
+    return {d: (float(np.mean(scores[d])), float(np.std(scores[d], ddof=1)/np.sqrt(len(scores[d]))))
+            for d in dist.get()}
+
+
+def select(method, data, mode=fit.FIT_MODE_LOCAL, executor=None):
+    """
+    Performs model selection without printing, and returns the results in a form that can
+    be serialized, e.g., to JSON. Every distribution gets its parameters and log-likelihood
+    (or K-S statistics), and the score of the method: AIC or BIC with the corresponding
+    weight, K-S statistics, the number of significant LRT wins, or the cross-validated
+    log-likelihood with its standard error.
+
+    :param method: model selection method.
+    :param data: input data, or a reference to its shared histogram.
+    :param mode: fitting mode.
+    :param executor: optional executor to run the fits.
+    :return: dictionary containing the method, the sample size, the results of each
+    distribution and the name of the best distribution.
+    """
+    if method not in AVAILABLE_METHODS:
+        raise ValueError("unknown model selection method: %s" % method)
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    fit_results = fit_all(fit.fit_ks if method == MODEL_SELECTION_METHOD_KS else fit.fit_mle, data, mode, executor)
+    results = {d: {'params': [float(p) for p in fit_results[d]['params']]} for d in dist.get()}
+    if method == MODEL_SELECTION_METHOD_KS:
+        for d in dist.get():
+            results[d]['D'] = float(fit_results[d]['D'])
+        best = min(dist.get(), key=lambda d: results[d]['D'])
+    elif method == MODEL_SELECTION_METHOD_LRT:
+        pointwise = {d: pointwise_log_likelihood(d, fit_results[d]['params'], summary) for d in dist.get()}
+        for d in dist.get():
+            results[d].update({'log-likelihood': float(fit_results[d]['log-likelihood']), 'wins': 0})
+        for d1, d2 in combinations(dist.get(), 2):
+            ratio, p = me.vuong_test(pointwise[d1], pointwise[d2], summary.counts)
+            if p < LRT_SIGNIFICANCE:
+                results[d1 if ratio > 0 else d2]['wins'] += 1
+        best = max(dist.get(), key=lambda d: results[d]['wins'])
+    elif method == MODEL_SELECTION_METHOD_CV:
+        cv = cross_validate(data, fit_results, mode=mode, executor=executor)
+        for d in dist.get():
+            results[d].update({'log-likelihood': float(fit_results[d]['log-likelihood']),
+                               'CV': cv[d][0], 'CV-SE': cv[d][1]})
+        best = max(dist.get(), key=lambda d: results[d]['CV'])
+    else:
+        key = method.upper()
+        for d in dist.get():
+            log_likelihood = fit_results[d]['log-likelihood']
+            results[d]['log-likelihood'] = float(log_likelihood)
+            results[d][key] = float(me.aic_measure(log_likelihood, len(fit_results[d]['params'])))\
+                if method == MODEL_SELECTION_METHOD_AIC\
+                else float(me.bic_measure(log_likelihood, len(fit_results[d]['params']), summary.size))
+        best = min(dist.get(), key=lambda d: results[d][key])
+        weights = {d: exp(-(results[d][key]-results[best][key])/2) for d in dist.get()}
+        weights_total = sum(weights.values())
+        for d in dist.get():
+            results[d]['weight'] = weights[d]/weights_total
+    return {'method': method, 'size': summary.size, 'distributions': results, 'best': best}
+
+
+def print_confidence_intervals(distribution, data, fit_result, objective, level, executor=None):
+    """
+    Prints bootstrap confidence intervals of the fitted parameters.
+
+    :param distribution: fitted distribution.
+    :param data: data used in the fit.
+    :param fit_result: fit result of the distribution.
+    :param objective: objective of the fit.
+    :param level: confidence level.
+    :param executor: optional executor to run the bootstrap.
+    """
+    lower, upper = bs.confidence_intervals(distribution, data, fit_result['params'], objective, level=level,
+                                           executor=executor)
+    print("    %g%% CI from %s" % (100*level, dist.get_params(lower, distribution)))
+    print("    %g%% CI to   %s" % (100*level, dist.get_params(upper, distribution)))
+
+
+def perform_aic_test(data, output_name, mode=fit.FIT_MODE_LOCAL, confidence=None, errors=False, executor=None):
+    """
+    Performs model selection based on the Akaike information criterion.
+
+    :param data: input data, or a reference to its shared histogram.
     :param output_name: name of output file that contains the probability mass function
     of the original data and the fitted distributions with their optimal parameters.
+    :param mode: fitting mode.
+    :param confidence: optional confidence level of the bootstrap intervals of the parameters.
+    :param errors: whether asymptotic standard errors of the parameters should be printed.
+    :param executor: optional executor to run the fits and bootstraps.
     """
     print("AIC test")
-    print("  number of samples: %i" % len(data))
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    print("  number of samples: %i" % summary.size)
     print("  fitting distribution")
-    fit_results = {}
-    npdata = np.array(data)
-    for d in dist.get():
-        fit_results[d] = fit.fit_mle(d, npdata)
+    fit_results = fit_all(fit.fit_mle, data, mode, executor, errors=errors)
     aic = {d: me.aic_measure(fit_results[d]['log-likelihood'], len(fit_results[d]['params'])) for d in fit_results}
     daic = {d: aic[d] - min(aic.values()) for d in aic}
     weights = {d: exp(-daic[d]/2) for d in daic}
@@ -76,28 +329,35 @@ def perform_aic_test(data, output_name):
         weights[d] /= weights_total
         print("  %s:" % d.upper())
         print("    %s" % dist.get_params(fit_results[d]['params'], d))
+        if confidence is not None:
+            print_confidence_intervals(d, data, fit_results[d], fit.OBJECTIVE_MLE, confidence, executor)
+        if errors:
+            print("    standard errors: %s" % dist.get_params(fit_results[d]['standard-errors'], d))
         print("    AIC  = %.f" % aic[d])
         print("    dAIC = %.f" % daic[d])
         print("    w    = %r" % weights[d])
-    print_pmfs(npdata, fit_results, output_name)
+    print_pmfs(summary, fit_results, output_name)
 
 
-def perform_bic_test(data, output_name):
+def perform_bic_test(data, output_name, mode=fit.FIT_MODE_LOCAL, confidence=None, errors=False, executor=None):
     """
     Performs model selection based on the Bayesian information criterion.
 
-    :param data: input data.
+    :param data: input data, or a reference to its shared histogram.
     :param output_name: name of output file that contains the probability mass function
     of the original data and the fitted distributions with their optimal parameters.
+    :param mode: fitting mode.
+    :param confidence: optional confidence level of the bootstrap intervals of the parameters.
+    :param errors: whether asymptotic standard errors of the parameters should be printed.
+    :param executor: optional executor to run the fits and bootstraps.
     """
     print("BIC test")
-    print("  number of samples: %i" % len(data))
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    print("  number of samples: %i" % summary.size)
     print("  fitting distribution")
-    fit_results = {}
-    npdata = np.array(data)
-    for d in dist.get():
-        fit_results[d] = fit.fit_mle(d, npdata)
-    bic = {d: me.bic_measure(fit_results[d]['log-likelihood'], len(fit_results[d]['params']), len(npdata)) for d in fit_results}
+    fit_results = fit_all(fit.fit_mle, data, mode, executor, errors=errors)
+    bic = {d: me.bic_measure(fit_results[d]['log-likelihood'], len(fit_results[d]['params']), summary.size) for d in fit_results}
     dbic = {d: bic[d] - min(bic.values()) for d in bic}
     weights = {d: exp(-dbic[d]/2) for d in dbic}
     weights_total = sum(weights.values())
@@ -105,36 +365,239 @@ def perform_bic_test(data, output_name):
         weights[d] /= weights_total
         print("  %s:" % d.upper())
         print("    %s" % dist.get_params(fit_results[d]['params'], d))
+        if confidence is not None:
+            print_confidence_intervals(d, data, fit_results[d], fit.OBJECTIVE_MLE, confidence, executor)
+        if errors:
+            print("    standard errors: %s" % dist.get_params(fit_results[d]['standard-errors'], d))
         print("    BIC  = %.f" % bic[d])
         print("    dBIC = %.f" % dbic[d])
         print("    w    = %r" % weights[d])
-    print_pmfs(npdata, fit_results, output_name)
+    print_pmfs(summary, fit_results, output_name)
 
 
-def perform_ks_test(data, output_name, synthetic_samples_num=100):
+def perform_ks_test(data, output_name, synthetic_samples_num=100, mode=fit.FIT_MODE_LOCAL,
+                    sequential=False, significance=None, refit=False, executor=None, confidence=None):
     """
     Performs model selection based on the K-S goodness-of-fit statistics.
 
-    :param data: input data.
+    :param data: input data, or a reference to its shared histogram.
     :param output_name: name of output file that contains the probability mass function
     of the original data and the fitted distributions with their optimal parameters.
+    :param synthetic_samples_num: (maximum) number of synthetic samples for the p-values.
+    :param mode: fitting mode.
+    :param sequential: whether the p-values should be estimated sequentially, stopping
+    as soon as they are precise enough.
+    :param significance: optional significance level at which sequential estimation stops
+    once the fit is rejected.
+    :param refit: whether the synthetic samples should be refitted for the p-values.
+    :param executor: optional executor to run the fits and bootstraps.
+    :param confidence: optional confidence level of the bootstrap intervals of the parameters.
     """
     print("K-S test")
-    print("  number of samples: %i" % len(data))
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    print("  number of samples: %i" % summary.size)
     print("  fitting distribution")
-    fit_results = {}
-    npdata = np.array(data)
+    fit_results = fit_all(fit.fit_ks, data, mode, executor)
     for d in dist.get():
         print("  %s:" % d.upper())
-        fit_results[d] = fit.fit_ks(d, npdata)
         print("    %s" % dist.get_params(fit_results[d]['params'], d))
+        if confidence is not None:
+            print_confidence_intervals(d, data, fit_results[d], fit.OBJECTIVE_KS, confidence, executor)
         print("    D = %r" % fit_results[d]['D'])
-        params = fit_results[d]['params']
-        p = 0
-        for r in range(synthetic_samples_num):
-            synthetic_sample = dist.samples(d, params, len(data))
-            ksd = me.ks_statistics(dist.get_sample_cdf(synthetic_sample), dist.cdf(d, params, np.max(synthetic_sample)))
-            if ksd > fit_results[d]['D']:
-                p += 1
-        print("    p = %r" % (float(p)/float(synthetic_samples_num)))
-    print_pmfs(npdata, fit_results, output_name)
+        if refit:
+            p, replicates = bs.ks_refit_p_value(d, fit_results[d]['params'], fit_results[d]['D'], summary.size,
+                                                synthetic_samples_num, sequential, significance,
+                                                executor=executor)
+        else:
+            p, replicates = bs.ks_p_value(d, fit_results[d]['params'], fit_results[d]['D'], summary.size,
+                                          synthetic_samples_num, sequential, significance)
+        print("    p = %r (%i synthetic samples)" % (p, replicates))
+    print_pmfs(summary, fit_results, output_name)
+
+
+def perform_lrt_test(data, output_name, significance=LRT_SIGNIFICANCE, mode=fit.FIT_MODE_LOCAL, confidence=None,
+                     errors=False, executor=None):
+    """
+    Performs model selection based on pairwise Vuong likelihood ratio tests.
+    All distributions are fitted by MLE, and their pointwise log-likelihoods are calculated
+    once over the unique values of the sample. These are then reused in the
+    comparison of every pair of distributions. A distribution wins a comparison if its
+    log-likelihood ratio is positive and significant.
+
+    :param data: input data, or a reference to its shared histogram.
+    :param output_name: name of output file that contains the probability mass function
+    of the original data and the fitted distributions with their optimal parameters.
+    :param significance: significance level of the individual tests.
+    :param mode: fitting mode.
+    :param confidence: optional confidence level of the bootstrap intervals of the parameters.
+    :param errors: whether asymptotic standard errors of the parameters should be printed.
+    :param executor: optional executor to run the fits and bootstraps.
+    """
+    print("LRT test")
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    print("  number of samples: %i" % summary.size)
+    print("  fitting distribution")
+    fit_results = fit_all(fit.fit_mle, data, mode, executor, errors=errors)
+    pointwise = {}
+    for d in dist.get():
+        pointwise[d] = pointwise_log_likelihood(d, fit_results[d]['params'], summary)
+        print("  %s:" % d.upper())
+        print("    %s" % dist.get_params(fit_results[d]['params'], d))
+        if confidence is not None:
+            print_confidence_intervals(d, data, fit_results[d], fit.OBJECTIVE_MLE, confidence, executor)
+        if errors:
+            print("    standard errors: %s" % dist.get_params(fit_results[d]['standard-errors'], d))
+    print("  comparing distributions")
+    wins = {d: 0 for d in dist.get()}
+    for d1, d2 in combinations(dist.get(), 2):
+        ratio, p = me.vuong_test(pointwise[d1], pointwise[d2], summary.counts)
+        if p < significance:
+            wins[d1 if ratio > 0 else d2] += 1
+        print("    %s vs %s: R = %.f, p = %r" % (d1.upper(), d2.upper(), ratio, p))
+    for d in dist.get():
+        print("  %s: %i significant wins" % (d.upper(), wins[d]))
+    print_pmfs(summary, fit_results, output_name)
+
+
+def perform_cv_test(data, output_name, folds=CV_FOLDS, mode=fit.FIT_MODE_LOCAL, confidence=None, errors=False,
+                    executor=None):
+    """
+    Performs model selection based on the k-fold cross-validated log-likelihood.
+    The held-out log-likelihood does not rely on the asymptotics of the information
+    criteria, which may not hold for heavy-tailed samples.
+
+    :param data: input data, or a reference to its shared histogram.
+    :param output_name: name of output file that contains the probability mass function
+    of the original data and the fitted distributions with their optimal parameters.
+    :param folds: number of folds.
+    :param mode: fitting mode.
+    :param confidence: optional confidence level of the bootstrap intervals of the parameters.
+    :param errors: whether asymptotic standard errors of the parameters should be printed.
+    :param executor: optional executor to run the fits and bootstraps.
+    """
+    print("CV test")
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    print("  number of samples: %i" % summary.size)
+    print("  fitting distribution")
+    fit_results = fit_all(fit.fit_mle, data, mode, executor, errors=errors)
+    print("  cross-validating with %i folds" % folds)
+    cv = cross_validate(data, fit_results, folds, mode, executor)
+    for d in dist.get():
+        print("  %s:" % d.upper())
+        print("    %s" % dist.get_params(fit_results[d]['params'], d))
+        if confidence is not None:
+            print_confidence_intervals(d, data, fit_results[d], fit.OBJECTIVE_MLE, confidence, executor)
+        if errors:
+            print("    standard errors: %s" % dist.get_params(fit_results[d]['standard-errors'], d))
+        print("    CV = %r +- %r" % cv[d])
+    print_pmfs(summary, fit_results, output_name)
+
+
+def perform_xmin_fit(data, output_name, executor=None):
+    """
+    Fits the power-law distributions on the tail of the data above their optimal x_min.
+
+    :param data: input data, or a reference to its shared histogram.
+    :param output_name: name of output file that contains the probability mass function
+    of the tail of the original data and of the fitted distributions conditioned on their
+    tail.
+    :param executor: optional executor to run the x_min scans.
+    """
+    print("x_min scan")
+    data = hi.portable(data)
+    summary = hi.summarize(data)
+    print("  number of samples: %i" % summary.size)
+    print("  fitting tails")
+    data_max = int(summary.max())
+    frequencies = np.zeros(data_max+1)
+    frequencies[summary.values.astype(int)] = summary.counts/float(summary.size)
+    output = [[float(i), frequencies[i]] for i in range(data_max+1)]
+    for d in fit.XMIN_DISTRIBUTIONS:
+        fit_result = fit.fit_xmin(d, data, executor)
+        print("  %s:" % d.upper())
+        print("    %s" % dist.get_params(fit_result['params'], d))
+        print("    x_min = %i" % fit_result['xmin'])
+        print("    n     = %i" % fit_result['tail-size'])
+        print("    D     = %r" % fit_result['D'])
+        tail_pmf = np.exp(dist.log_pmf(d, fit_result['params'], np.arange(data_max+1))
+                          - dist.log_sf(d, fit_result['params'], fit_result['xmin']))
+        tail_pmf[:fit_result['xmin']] = 0.0
+        for i in range(data_max+1):
+            output[i].append(tail_pmf[i])
+    print("  printing probability mass functions")
+    utils.print_csv(output_name, ['value', 'p_measured'] + fit.XMIN_DISTRIBUTIONS, output)
+
+
+def batch_inputs(pattern):
+    """
+    Lists the input files of a batch: all files of a directory, or the files matching a
+    glob pattern.
+
+    :param pattern: directory or glob pattern.
+    :return: sorted list of file names.
+    """
+    if os.path.isdir(pattern):
+        return sorted(os.path.join(pattern, name) for name in os.listdir(pattern)
+                      if os.path.isfile(os.path.join(pattern, name)))
+    return sorted(name for name in glob(pattern) if os.path.isfile(name))
+
+
+def perform_batch(inputs, output_dir, method, mode=fit.FIT_MODE_LOCAL, executor=None):
+    """
+    Performs model selection on a batch of samples in one process.
+    Every file gets its probability mass functions in the output directory under its own
+    name, and a summary table lists the best model of each file with the weights (AIC,
+    BIC), K-S statistics, significant wins (LRT) or cross-validated log-likelihoods (CV)
+    of all distributions. A file that
+    cannot be read or fitted is marked as failed in the summary, and the batch goes on.
+
+    :param inputs: list of input files.
+    :param output_dir: output directory.
+    :param method: model selection method.
+    :param mode: fitting mode.
+    :param executor: optional executor to run the fits, samples are published to it if
+    it supports publishing.
+    """
+    if method not in AVAILABLE_METHODS:
+        raise ValueError("unknown model selection method: %s" % method)
+    print("batch %s selection" % method.upper())
+    print("  number of files: %i" % len(inputs))
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    score = {MODEL_SELECTION_METHOD_AIC: 'weight', MODEL_SELECTION_METHOD_BIC: 'weight',
+             MODEL_SELECTION_METHOD_KS: 'D', MODEL_SELECTION_METHOD_LRT: 'wins',
+             MODEL_SELECTION_METHOD_CV: 'CV'}[method]
+    outputs = set()
+    rows = []
+    for i, input_name in enumerate(inputs, 1):
+        print("  [%i/%i] %s" % (i, len(inputs), input_name))
+        output_name = os.path.splitext(os.path.basename(input_name))[0]
+        if output_name in outputs or output_name + '.csv' == BATCH_SUMMARY_NAME:
+            output_name = "%s-%i" % (output_name, i)
+        outputs.add(output_name)
+        reference = None
+        try:
+            data = utils.read_sample(input_name)
+            if len(data) == 0:
+                raise ValueError("sample is empty.")
+            if hasattr(executor, 'publish'):
+                data = reference = executor.publish(data)
+            result = select(method, data, mode, executor)
+            print_pmfs(data, result['distributions'], os.path.join(output_dir, output_name + '.csv'))
+            print("    best: %s" % result['best'])
+            rows.append([input_name, result['size'], result['best'], 'ok']
+                        + [result['distributions'][d][score] for d in dist.get()])
+        except Exception as error:
+            # a failing file is recorded and skipped
+            print("    failed: %s" % error)
+            rows.append([input_name, 0, '', "failed: %s" % error] + ['']*len(dist.get()))
+        finally:
+            if reference is not None:
+                executor.release(reference)
+    print("  printing summary")
+    utils.print_csv(os.path.join(output_dir, BATCH_SUMMARY_NAME), ['file', 'size', 'best', 'status'] + dist.get(),
+                    rows)
+    print("  %i of %i files failed" % (sum(1 for row in rows if row[3] != 'ok'), len(rows)))
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+#title          : service.py
+#description    : Long-running model selection service.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python model.py --serve <host:port or socket path>
+#=====================================================================
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import time
+import numpy as np
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from core import histogram as hi
+from core import shared
+from core import utils
+from calculation import fit
+from calculation import model_selection as ms
+
+
+# Number of selections running at the same time.
+SERVICE_MAX_CONCURRENT = 2
+
+# Number of requests that are running or waiting, above which requests are rejected.
+SERVICE_MAX_PENDING = 32
+
+# Largest accepted request body in bytes.
+SERVICE_MAX_BODY = 1 << 28
+
+# Number of most recent requests the latency statistics are calculated over.
+SERVICE_LATENCY_WINDOW = 1024
+
+# Number of selection results kept for repeated samples.
+SERVICE_RESULT_CACHE_SIZE = 128
+
+# Reasons of the HTTP status codes used by the service.
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def parse_address(address):
+    """
+    Parses the address of the service: host:port for HTTP over TCP, and a path for HTTP
+    over a Unix socket otherwise.
+
+    :param address: address as a string.
+    :return: (host, port) tuple or socket path.
+    """
+    host, separator, port = address.rpartition(':')
+    if separator and '/' not in address:
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def parse_sample(payload):
+    """
+    Reads the sample of a request, given either as the raw sample in 'data', or as its
+    histogram in 'values' and 'counts'.
+
+    :param payload: decoded request.
+    :return: histogram of the sample.
+    """
+    if 'data' in payload:
+        summary = hi.summarize(utils.compact(payload['data']))
+    elif 'values' in payload and 'counts' in payload:
+        values = utils.compact(payload['values'])
+        counts = np.asarray(payload['counts'], dtype=float)
+        if counts.shape != values.shape or np.any(counts < 0) or np.any(counts != np.floor(counts)):
+            raise ValueError("counts must be non-negative integers, one for each value.")
+        # repeated values are merged and empty ones dropped
+        values, inverse = np.unique(values, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts, minlength=len(values)).astype(np.int64)
+        summary = hi.Histogram(values[counts > 0], counts[counts > 0])
+    else:
+        raise ValueError("request must contain either data, or values and counts.")
+    if summary.size == 0:
+        raise ValueError("sample is empty.")
+    return summary
+
+
+class Metrics:
+    """
+    Request counters and latency statistics of the service.
+    """
+
+    def __init__(self, window=SERVICE_LATENCY_WINDOW):
+        """
+        Initializer.
+
+        :param window: number of most recent requests the latencies are kept for.
+        """
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.cache_hits = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, latency, status):
+        """
+        Records a finished request.
+
+        :param latency: time spent on the request in seconds.
+        :param status: HTTP status code of the response.
+        """
+        self.requests += 1
+        if status == 503:
+            self.rejected += 1
+        elif status >= 400:
+            self.errors += 1
+        self._latencies.append(latency)
+
+    def snapshot(self):
+        """
+        Returns the current metrics, latencies in milliseconds.
+
+        :return: dictionary of the metrics.
+        """
+        metrics = {'requests': self.requests, 'errors': self.errors, 'rejected': self.rejected,
+                   'cache-hits': self.cache_hits}
+        if len(self._latencies) > 0:
+            latencies = 1000.0*np.array(self._latencies)
+            metrics['latency'] = {'mean': float(np.mean(latencies)),
+                                  'p50': float(np.percentile(latencies, 50)),
+                                  'p95': float(np.percentile(latencies, 95)),
+                                  'p99': float(np.percentile(latencies, 99)),
+                                  'max': float(np.max(latencies))}
+        return metrics
+
+
+class SelectionService:
+    """
+    Model selection over HTTP.
+
+    The service keeps a worker pool alive with its modules imported and caches warm, and
+    fits the distributions of every request on it with the sample published in shared
+    memory. Selections run in a bounded number of threads, requests above the pending
+    limit are rejected, and results of repeated samples are served from a cache.
+
+    Endpoints:
+      POST /select   {"method": "aic", "mode": "local", "data": [...]} or with
+                     "values" and "counts" instead of "data", returns the selection.
+      GET  /metrics  request counters and latencies.
+      GET  /health   status of the service.
+    """
+
+    def __init__(self, executor=None, max_concurrent=SERVICE_MAX_CONCURRENT, max_pending=SERVICE_MAX_PENDING,
+                 cache_size=SERVICE_RESULT_CACHE_SIZE):
+        """
+        Initializer.
+
+        :param executor: executor to run the fits, a worker pool is expected.
+        :param max_concurrent: number of selections running at the same time.
+        :param max_pending: number of running and waiting requests above which requests are
+        rejected.
+        :param cache_size: number of cached selection results.
+        """
+        self.executor = executor
+        self.max_pending = max_pending
+        self.metrics = Metrics()
+        self._threads = ThreadPoolExecutor(max_workers=max_concurrent)
+        self._pending = 0
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def _select(self, method, mode, summary):
+        """
+        Runs a selection on the sample, publishing it for the workers if the executor
+        supports it.
+
+        :param method: model selection method.
+        :param mode: fitting mode.
+        :param summary: histogram of the sample.
+        :return: selection results.
+        """
+        if not hasattr(self.executor, 'publish'):
+            return ms.select(method, summary, mode, self.executor)
+        reference = self.executor.publish(summary)
+        try:
+            return ms.select(method, reference, mode, self.executor)
+        finally:
+            self.executor.release(reference)
+
+    @staticmethod
+    def _parse(body):
+        """
+        Decodes a selection request and summarizes its sample.
+
+        :param body: request body.
+        :return: tuple of the method, the fitting mode, the histogram of the sample and the
+        key of the request in the result cache.
+        """
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise ValueError("request must be a JSON object.")
+        method = payload.get('method', ms.MODEL_SELECTION_METHOD_AIC)
+        mode = payload.get('mode', fit.FIT_MODE_LOCAL)
+        if method not in ms.AVAILABLE_METHODS:
+            raise ValueError("unknown model selection method: %s" % method)
+        if mode not in fit.AVAILABLE_MODES:
+            raise ValueError("unknown fitting mode: %s" % mode)
+        summary = parse_sample(payload)
+        digest = hashlib.sha1()
+        for part in (method.encode(), mode.encode(), summary.values.tobytes(), summary.counts.tobytes()):
+            digest.update(part)
+        return method, mode, summary, digest.hexdigest()
+
+    async def select(self, body):
+        """
+        Performs a selection request. Decoding and summarizing the sample run in the default
+        executor of the event loop, so that large requests do not block the other
+        connections, and the selection itself in the selection threads.
+
+        :param body: request body.
+        :return: selection results.
+        """
+        loop = asyncio.get_running_loop()
+        method, mode, summary, key = await loop.run_in_executor(None, self._parse, body)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.metrics.cache_hits += 1
+            return self._cache[key]
+        result = await loop.run_in_executor(self._threads, self._select, method, mode, summary)
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    async def _route(self, verb, path, body):
+        """
+        Dispatches a request to its endpoint.
+
+        :param verb: HTTP method.
+        :param path: requested path.
+        :param body: request body.
+        :return: tuple of the status code and the response object.
+        """
+        if verb == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'pending': self._pending}
+        if verb == 'GET' and path == '/metrics':
+            return 200, dict(self.metrics.snapshot(), pending=self._pending)
+        if verb == 'POST' and path == '/select':
+            if self._pending >= self.max_pending:
+                return 503, {'error': "too many pending requests."}
+            self._pending += 1
+            try:
+                return 200, await self.select(body)
+            except (ValueError, TypeError, KeyError) as error:
+                return 400, {'error': str(error)}
+            finally:
+                self._pending -= 1
+        return 404, {'error': "unknown endpoint: %s %s" % (verb, path)}
+
+    async def handle(self, reader, writer):
+        """
+        Serves one HTTP request on a connection.
+
+        :param reader: stream reader of the connection.
+        :param writer: stream writer of the connection.
+        """
+        start = time.perf_counter()
+        try:
+            verb, path, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length > SERVICE_MAX_BODY:
+                status, response = 413, {'error': "request body is too large."}
+            else:
+                status, response = await self._route(verb, path, await reader.readexactly(length))
+        except (ValueError, asyncio.IncompleteReadError) as error:
+            status, response = 400, {'error': "malformed request: %s" % error}
+        except Exception as error:
+            status, response = 500, {'error': repr(error)}
+        content = json.dumps(response).encode()
+        writer.write(("HTTP/1.1 %i %s\r\nContent-Type: application/json\r\nContent-Length: %i\r\n"
+                      "Connection: close\r\n\r\n" % (status, _REASONS[status], len(content))).encode() + content)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        self.metrics.record(time.perf_counter()-start, status)
+
+    async def run(self, address):
+        """
+        Listens on the address until the process is interrupted or terminated.
+
+        :param address: (host, port) tuple or Unix socket path.
+        """
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self.handle, *address)
+        else:
+            server = await asyncio.start_unix_server(self.handle, address)
+        print("  listening on %s" % ', '.join(str(s.getsockname()) for s in server.sockets))
+        async with server:
+            await stop.wait()
+        if not isinstance(address, tuple) and os.path.exists(address):
+            os.unlink(address)
+
+    def close(self):
+        """
+        Stops the selection threads.
+        """
+        self._threads.shutdown()
+
+
+def serve(address, workers=None, max_concurrent=SERVICE_MAX_CONCURRENT, max_pending=SERVICE_MAX_PENDING):
+    """
+    Runs the model selection service until interrupted or terminated.
+
+    :param address: host:port or Unix socket path.
+    :param workers: number of worker processes, the number of CPUs if not given.
+    :param max_concurrent: number of selections running at the same time.
+    :param max_pending: number of running and waiting requests above which requests are
+    rejected.
+    """
+    executor = shared.WorkerPool(workers)
+    service = SelectionService(executor, max_concurrent, max_pending)
+    try:
+        asyncio.run(service.run(parse_address(address)))
+    finally:
+        service.close()
+        executor.shutdown()
@@ -8,7 +8,7 @@
 #========================================================
 import numpy as np
 from scipy import stats
-from mpmath import ln, sqrt
+from core import histogram as hi
 
 #############
 # CONSTANTS #
@@ -29,6 +29,23 @@ DEFAULT_SAMPLE_MAX = DEFAULT_PDF_MAX
 # Used mostly for testing.
 DEFAULT_SAMPLE_SIZE = 10000
 
+# Number of samples generated in one chunk when streaming large samples.
+SAMPLE_CHUNK_SIZE = 1 << 20
+
+# Number of chunks generated ahead when streaming samples on an executor.
+SAMPLE_CHUNK_PREFETCH = 4
+
+# Probability of the left tail that is ignored when bounding the acceptance ratio of
+# rejection sampling.
+REJECTION_TAIL = 1e-12
+
+# Maximum number of integers the acceptance ratio of rejection sampling is bounded over.
+REJECTION_WINDOW = 1024
+
+# Number of parameter vectors processed together when a batched calculation needs an
+# array over the whole domain for each parameter vector.
+BATCH_BLOCK_SIZE = 64
+
 
 ###########
 # CLASSES #
@@ -44,41 +61,106 @@ class RealDistribution():
     """
 
     @staticmethod
-    def pmf(params, domain=DEFAULT_PDF_MAX):
+    def pmf(params, domain=DEFAULT_PDF_MAX, out=None):
         """
         Returns the probability mass function.
 
         :param params: a list containing the parameters.
         :param domain: domain size.
-        :return: probability mass function as a numpy array.
+        :param out: optional buffer of length domain+1 to calculate the function in.
+        :return: probability mass function as a numpy array, the buffer if it was used.
+        """
+        raise NotImplementedError("Subclass must implement pmf(params, domain, out).")
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Returns the logarithm of the probability mass function at the given values only.
+
+        :param params: a list containing the parameters.
+        :param x: non-negative integer values, a scalar or numpy array of any shape.
+        :param out: optional buffer with the shape of x to calculate the function in.
+        :return: log-probabilities with the shape of x, the buffer if it was given.
         """
-        raise NotImplementedError("Subclass must implement pmf(params, domain).")
+        raise NotImplementedError("Subclass must implement log_pmf(params, x, out).")
 
     @staticmethod
-    def samples(params, size=DEFAULT_SAMPLE_SIZE, domain=DEFAULT_SAMPLE_MAX):
+    def log_sf(params, x):
+        """
+        Returns the logarithm of the survival function, P(X >= x).
+        This is required to fit the tail of the distribution above a lower bound only.
+
+        :param params: a list containing the parameters.
+        :param x: lower bound of the tail as a non-negative integer.
+        :return: log-probability of the tail.
+        """
+        raise NotImplementedError("Subclass must implement log_sf(params, x).")
+
+    @staticmethod
+    def samples(params, size=DEFAULT_SAMPLE_SIZE, domain=DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns a given number of samples.
 
         :param params: a list containing the parameters.
         :param size: number of samples to return.
         :param domain: domain size.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: samples in a numpy array.
         """
-        raise NotImplementedError("Subclass must implement samples(params, size, domain).")
+        raise NotImplementedError("Subclass must implement samples(params, size, domain, rng).")
 
     @staticmethod
     def log_likelihood(params, data, nonzero_only=False):
         """
         Returns the log-likelihood of the distribution for a given sample.
+        If a (k, p) matrix of parameter vectors is given, the log-likelihoods of all k
+        parameter vectors are calculated together.
 
-        :param params: a list containing the parameters.
-        :param data: the data over which the log-likelihood should be calculated.
+        :param params: a list containing the parameters, or a matrix of parameter vectors.
+        :param data: the data over which the log-likelihood should be calculated, either a
+        numpy array or its histogram.
         :param nonzero_only: whether nonzero elements should be considered only. In some
         cases, this parameter is unused.
-        :return: the log-likelihood.
+        :return: the log-likelihood, or a numpy array of log-likelihoods.
         """
         raise NotImplementedError("Subclass must implement log_likelihood(params, data).")
 
+    @staticmethod
+    def initial_params(data):
+        """
+        Returns starting parameters for the fit estimated from the data, e.g., by the method
+        of moments. Distributions without such an estimate start from their default initial
+        parameters.
+
+        :param data: histogram of the data.
+        :return: a list containing the parameters, or None.
+        """
+        return None
+
+    @staticmethod
+    def mle(data):
+        """
+        Returns the maximum likelihood estimate of the parameters if it has a closed form.
+        Distributions without an exact estimator are fitted numerically.
+
+        :param data: histogram of the data.
+        :return: a list containing the parameters, or None.
+        """
+        return None
+
+    @staticmethod
+    def information(params, data):
+        """
+        Returns the observed Fisher information, i.e., the negative Hessian of the
+        log-likelihood, if it has a closed form. For other distributions it is calculated
+        by finite differences.
+
+        :param params: a list containing the parameters.
+        :param data: histogram of the data.
+        :return: information matrix as a numpy array, or None.
+        """
+        return None
+
     @staticmethod
     def get_params(params):
         """
@@ -100,26 +182,45 @@ class Delta(RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=DEFAULT_PDF_MAX):
+    def pmf(params, domain=DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function of a delta distribution.
+        The function covers the domain only, as for the other distributions, therefore a
+        location beyond the domain, e.g., of a degenerate log-normal with a large mu, leaves
+        all of the mass outside and the function is zero.
 
         :param params: single element list with the location parameter.
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
-        real_domain = max(int(params[0]), domain)
-        _pmf = np.append(np.zeros(int(params[0])), [1.0])
-        return np.append(_pmf, np.zeros(real_domain-int(params[0])))
+        _pmf = buffer(out, domain+1)
+        _pmf.fill(0.0)
+        if 0 <= params[0] <= domain:
+            _pmf[int(params[0])] = 1.0
+        return _pmf
 
     @staticmethod
-    def samples(params, size=DEFAULT_SAMPLE_SIZE, domain=DEFAULT_SAMPLE_MAX):
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function of a delta distribution.
+
+        :param params: single element list with the location parameter.
+        :param x: values to evaluate the function at.
+        :param out: optional buffer with the shape of x.
+        :return: zero at the location, -inf elsewhere.
+        """
+        return where(np.asarray(x) == np.floor(float(params[0])), 0.0, -np.inf, out)
+
+    @staticmethod
+    def samples(params, size=DEFAULT_SAMPLE_SIZE, domain=DEFAULT_SAMPLE_MAX, rng=None):
         """
         Generates samples for a delta distribution.
 
         :param params: single element list with the location parameter.
         :param size: number of samples.
         :param domain: unused.
+        :param rng: unused.
         :return: numpy array of samples.
         """
         return np.ones(size) * int(params[0])
@@ -130,11 +231,16 @@ class Delta(RealDistribution):
         Returns the log-likelihood of a delta distribution.
         The distribution is approximated by a narrow Gaussian.
 
-        :param params: single element list with the location parameter.
+        :param params: single element list with the location parameter, which can be a
+        numpy array of locations.
         :param data: the data over which the log-likelihood should be calculated.
-        :return: log-likelihood.
+        :return: log-likelihood, or a numpy array of log-likelihoods for each location.
         """
-        return -len(data)*ln(EPSILON*sqrt(2*np.pi)) - 0.5*np.sum(0.5*np.power(data-params[0], 2))/EPSILON**2
+        _data = hi.summarize(data)
+        _loc = np.asarray(params[0], dtype=float)
+        squares = _data.sum(lambda x: np.power(x-np.reshape(_loc, (-1, 1)), 2))
+        ll = -_data.size*np.log(EPSILON*np.sqrt(2*np.pi)) - 0.5*0.5*squares/EPSILON**2
+        return float(ll[0]) if _loc.ndim == 0 else ll
 delta = Delta()
 
 
@@ -147,27 +253,46 @@ class Uniform(RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=DEFAULT_PDF_MAX):
+    def pmf(params, domain=DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function of a uniform distribution.
 
         :param params: unused.
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
-        return np.ones(domain+1)/float(domain+1)
+        _pmf = buffer(out, domain+1)
+        _pmf.fill(1.0/float(domain+1))
+        return _pmf
+
+    @staticmethod
+    def log_pmf(params, x, out=None, domain=DEFAULT_PDF_MAX):
+        """
+        Logarithm of the probability mass function of a uniform distribution.
+
+        :param params: unused.
+        :param x: values to evaluate the function at.
+        :param out: optional buffer with the shape of x.
+        :param domain: domain size.
+        :return: log-probabilities within the domain, -inf outside.
+        """
+        _x = np.asarray(x)
+        return where((_x >= 0) & (_x <= domain), -np.log(domain+1.0), -np.inf, out)
 
     @staticmethod
-    def samples(params, size=DEFAULT_SAMPLE_SIZE, domain=DEFAULT_SAMPLE_MAX):
+    def samples(params, size=DEFAULT_SAMPLE_SIZE, domain=DEFAULT_SAMPLE_MAX, rng=None):
         """
         Generates samples for a uniform distribution.
 
         :param params: unused.
         :param size: number of samples.
         :param domain: domain size.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
-        return np.random.uniform(0, domain, size)
+        _rng = np.random if rng is None else rng
+        return _rng.uniform(0, domain, size)
 
     @staticmethod
     def log_likelihood(params, data):
@@ -178,11 +303,80 @@ class Uniform(RealDistribution):
         :param data: the data over which the log-likelihood should be calculated.
         :return: log-likelihood.
         """
-        return -len(data) * ln(float(np.max(data)))
+        _data = hi.summarize(data)
+        with np.errstate(divide='ignore'):
+            return -_data.size * float(np.log(_data.max()))
 uniform = Uniform()
 
 
-def generate_discrete_samples(values, probabilities, size=DEFAULT_SAMPLE_SIZE):
+def buffer(out, size):
+    """
+    Returns the array a probability mass function of the given size is calculated in: the
+    buffer provided by the caller if it has the size, and a new array otherwise.
+
+    :param out: optional buffer.
+    :param size: size of the function.
+    :return: numpy array.
+    """
+    return out if out is not None and len(out) == size else np.empty(size)
+
+
+def where(condition, x, y, out=None):
+    """
+    Selects elements as numpy.where does, optionally into a buffer.
+
+    :param condition: condition array.
+    :param x: values where the condition holds.
+    :param y: values elsewhere.
+    :param out: optional buffer with the shape of the condition.
+    :return: numpy array of the selected values, the buffer if it was given.
+    """
+    if out is None:
+        return np.where(condition, x, y)
+    np.copyto(out, y)
+    np.copyto(out, x, where=condition)
+    return out
+
+
+def batch(params):
+    """
+    Converts parameters into a matrix of parameter vectors.
+
+    :param params: a list containing the parameters, or a matrix of parameter vectors.
+    :return: tuple of the (k, p) parameter matrix and whether a single parameter vector
+    was given.
+    """
+    _params = np.asarray(params, dtype=float)
+    return np.atleast_2d(_params), _params.ndim < 2
+
+
+def unbatch(values, single):
+    """
+    Converts the results of a batched calculation back to the shape of the parameters.
+
+    :param values: numpy array of the results for each parameter vector.
+    :param single: whether a single parameter vector was given.
+    :return: a single float or the numpy array of results.
+    """
+    return float(values[0]) if single else values
+
+
+def batch_apply(func, params, block=BATCH_BLOCK_SIZE):
+    """
+    Applies a function on blocks of parameter vectors, in order to limit the memory of
+    calculations that need a domain-sized array for each parameter vector.
+
+    :param func: function taking a (b, p) parameter matrix and returning b values.
+    :param params: (k, p) parameter matrix.
+    :param block: number of parameter vectors in one block.
+    :return: numpy array of the k values.
+    """
+    if len(params) == 0:
+        return np.empty(0)
+    return np.concatenate([func(params[i:i+block]) for i in range(0, len(params), block)])
+
+
+def generate_discrete_samples(values, probabilities, size=DEFAULT_SAMPLE_SIZE, rng=None):
     """
     Generates a sample of discrete random variables specified by the probabilities.
 
@@ -190,8 +384,118 @@ def generate_discrete_samples(values, probabilities, size=DEFAULT_SAMPLE_SIZE):
     :param probabilities: probabilities, must have the same length as the domain of
     values.
     :param size: number of samples to return.
+    :param rng: random number generator, numpy's global generator is used if not given.
     :return: list of samples.
     """
     assert len(values) == len(probabilities)
     _random_sampler = stats.rv_discrete(values=(values, probabilities/np.sum(probabilities)))
-    return _random_sampler.rvs(size=size)
\ No newline at end of file
+    return _random_sampler.rvs(size=size, random_state=rng)
+
+
+def _log_interval(continuous, x):
+    """
+    Returns the logarithm of the probability that a continuous random variable falls in
+    the interval (x-1/2, x+1/2]. Left of the median it is calculated from the cdf, right of
+    it from the survival function, in order to avoid cancellation.
+
+    :param continuous: frozen scipy continuous distribution.
+    :param x: numpy array of the centers of the intervals.
+    :return: numpy array of log-probabilities.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upper, lower = continuous.logcdf(x+0.5), continuous.logcdf(x-0.5)
+        via_cdf = upper + np.log1p(-np.exp(lower-upper))
+        upper, lower = continuous.logsf(x-0.5), continuous.logsf(x+0.5)
+        via_sf = upper + np.log1p(-np.exp(lower-upper))
+    return np.where(x <= continuous.median(), via_cdf, via_sf)
+
+
+def generate_rejection_samples(continuous, mode, size=DEFAULT_SAMPLE_SIZE, rng=None):
+    """
+    Generates samples of a positive discrete distribution with P(x) ~ f(x) for x = 1, 2,
+    ..., where f is the density of a continuous distribution.
+    Continuous samples X are drawn above 1/2 by the inverse survival function and rounded
+    to the nearest integer x, which is accepted with a probability proportional to
+    f(x) / P(x-1/2 < X <= x+1/2). This corrects for the difference between the discretized
+    density and the distribution of the rounded samples. Neither a grid nor a domain limit
+    is involved, and the cost is O(size). Samples beyond the range of int64 are rejected.
+    If the mass above 1/2 underflows, the density decays so fast that the samples are drawn
+    from its values over the first REJECTION_WINDOW integers instead.
+
+    :param continuous: frozen scipy continuous distribution with density f.
+    :param mode: location of the maximum of f.
+    :param size: number of samples.
+    :param rng: random number generator, numpy's global generator is used if not given.
+    :return: numpy array of samples.
+    """
+    _rng = np.random if rng is None else rng
+    mass = float(continuous.sf(0.5))
+    if not mass > 0:
+        window = np.arange(1, REJECTION_WINDOW+1)
+        log_f = continuous.logpdf(window)
+        if not np.isfinite(np.max(log_f)):
+            return delta.samples([1], size).astype(np.int64)
+        return generate_discrete_samples(window, np.exp(log_f-np.max(log_f)), size, rng).astype(np.int64)
+    low = max(1, int(np.floor(continuous.ppf(REJECTION_TAIL)+0.5)))
+    window = np.arange(low, max(low, min(int(np.ceil(mode))+1, low+REJECTION_WINDOW))+1)
+    log_bound = max(0.0, float(np.max(continuous.logpdf(window) - _log_interval(continuous, window))))
+    _samples = np.empty(size, dtype=np.int64)
+    filled = 0
+    while filled < size:
+        proposals = int(1.1*(size-filled)*np.exp(log_bound)) + 16
+        x = np.floor(continuous.isf((1-_rng.random(proposals))*mass)+0.5)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_ratio = np.where((x >= 1) & (x < 2.0**63), continuous.logpdf(x) - _log_interval(continuous, x),
+                                 -np.inf)
+            accepted = x[np.log(_rng.random(proposals)) < log_ratio - log_bound]
+        accepted = accepted[:size-filled]
+        _samples[filled:filled+len(accepted)] = accepted
+        filled += len(accepted)
+    return _samples
+
+
+def log_discretized_pmf(continuous, x, out=None, log_sf=None, **params):
+    """
+    Returns the logarithm of the probability mass function of a continuous distribution
+    discretized over the non-negative integers:
+
+    P(x) = (F(x+1) - F(x)) / (1 - F(0)),
+
+    where F is the cdf of the continuous distribution. Differences are calculated in log
+    space from the cdf left of the median and from the survival function right of it.
+    Probabilities that underflow in both are returned as -inf.
+
+    :param continuous: scipy continuous distribution.
+    :param x: non-negative integer values as a numpy array.
+    :param out: optional buffer with the shape of x.
+    :param log_sf: optional closed-form log-survival function taking x and the parameters,
+    used in place of the continuous distribution's logsf that underflows in heavy tails.
+    :param params: parameters of the continuous distribution, arrays must broadcast with x.
+    :return: log-probabilities.
+    """
+    _x = np.asarray(x, dtype=float)
+    _log_sf = continuous.logsf if log_sf is None else log_sf
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        upper, lower = continuous.logcdf(_x+1, **params), continuous.logcdf(_x, **params)
+        via_cdf = upper + np.log1p(-np.exp(lower-upper))
+        upper, lower = _log_sf(_x, **params), _log_sf(_x+1, **params)
+        via_sf = upper + np.log1p(-np.exp(lower-upper))
+        log_p = np.where(upper < continuous.logcdf(_x, **params), via_sf, via_cdf) - _log_sf(0.0, **params)
+    return where(np.isnan(log_p), -np.inf, log_p, out)
+
+
+def generate_discretized_samples(continuous, size=DEFAULT_SAMPLE_SIZE, rng=None, **params):
+    """
+    Generates samples of a continuous distribution discretized over the non-negative
+    integers (see log_discretized_pmf). Samples are drawn by the inverse survival function
+    restricted to the positive half-line and rounded down, which costs O(size).
+
+    :param continuous: scipy continuous distribution.
+    :param size: number of samples.
+    :param rng: random number generator, numpy's global generator is used if not given.
+    :param params: parameters of the continuous distribution.
+    :return: numpy array of samples.
+    """
+    _rng = np.random if rng is None else rng
+    u = (1-_rng.random(size))*continuous.sf(0, **params)
+    return np.floor(continuous.isf(u, **params)).astype(np.int64)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#title          : grids.py
+#description    : Shared read-only grids over the domain of the distributions.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python grids.py
+#=====================================================
+import numpy as np
+from scipy import special as sp
+
+
+# Largest domain the grids are kept for, larger domains are calculated on every call.
+GRID_MAX_SIZE = 1 << 24
+
+# Grids built so far, by name.
+_grids = {}
+
+
+def _grid(name, domain, func):
+    """
+    Returns a grid over 0, 1, ..., domain. Grids are built once for the next power of two
+    above the domain and grown when a larger domain is requested, and every call returns a
+    read-only view.
+
+    :param name: name of the grid.
+    :param domain: largest value of the grid.
+    :param func: function computing the grid from the integers.
+    :return: numpy array of the grid values.
+    """
+    if domain >= GRID_MAX_SIZE:
+        return func(np.arange(0, domain+1))
+    grid = _grids.get(name)
+    if grid is None or len(grid) <= domain:
+        grid = func(np.arange(0, 1 << int(domain).bit_length()))
+        grid.flags.writeable = False
+        _grids[name] = grid
+    return grid[:domain+1]
+
+
+def x(domain):
+    """
+    Returns the integers 0, 1, ..., domain.
+
+    :param domain: largest value.
+    :return: numpy array of integers.
+    """
+    return _grid('x', int(domain), lambda n: n)
+
+
+def log_x(domain):
+    """
+    Returns the logarithm of the integers 0, 1, ..., domain, with -inf at zero.
+
+    :param domain: largest value.
+    :return: numpy array of logarithms.
+    """
+    def _log(n):
+        with np.errstate(divide='ignore'):
+            return np.log(n)
+    return _grid('log_x', int(domain), _log)
+
+
+def log_factorial(domain):
+    """
+    Returns the logarithm of the factorials 0!, 1!, ..., domain!.
+
+    :param domain: largest value.
+    :return: numpy array of log-factorials.
+    """
+    return _grid('log_factorial', int(domain), lambda n: sp.gammaln(n+1.0))
+
+
+def log_factorial_of(values):
+    """
+    Returns the logarithm of the factorial of non-negative integer values, looked up in the
+    shared grid if the values are small enough, and calculated otherwise.
+
+    :param values: non-negative integer values as a scalar or numpy array.
+    :return: log-factorials with the shape of the values.
+    """
+    _values = np.asarray(values)
+    if _values.size == 0 or not np.all(np.isfinite(_values)) or np.min(_values) < 0:
+        return sp.gammaln(_values+1.0)
+    top = int(np.max(_values))
+    if top >= GRID_MAX_SIZE:
+        return sp.gammaln(_values+1.0)
+    return log_factorial(top)[_values.astype(np.int64)]
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+#title          : histogram.py
+#description    : Compressed summary of a sample.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python histogram.py
+#=====================================================
+import os
+import threading
+import numpy as np
+from core import grids
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Number of unique values reduced in one chunk. Chunks are small enough to keep the
+# function values in cache, and their boundaries do not depend on the number of threads,
+# therefore the sums are deterministic.
+REDUCTION_CHUNK_SIZE = 1 << 16
+
+# Largest ratio of the maximum to the size of an unsigned sample that is summarized by
+# counting the occurrences of every value up to the maximum.
+BINCOUNT_SIZE_RATIO = 4
+
+# Number of threads reducing the chunks.
+REDUCTION_THREADS = os.cpu_count() or 1
+
+_reduction_pool = None
+
+# Marks the threads of the reduction pool.
+_reduction_thread = threading.local()
+
+
+def _mark_reduction_thread():
+    """
+    Marks the current thread as a thread of the reduction pool.
+    """
+    _reduction_thread.active = True
+
+
+def _pool():
+    """
+    Returns the thread pool of the chunked reductions, creating it at first use.
+
+    :return: thread pool executor.
+    """
+    global _reduction_pool
+    if _reduction_pool is None:
+        _reduction_pool = ThreadPoolExecutor(max_workers=REDUCTION_THREADS, initializer=_mark_reduction_thread)
+    return _reduction_pool
+
+
+def _reset_pool():
+    """
+    Drops the reduction pool in a forked child, which inherits the pool without its
+    threads, so that the child creates its own at first use.
+    """
+    global _reduction_pool
+    _reduction_pool = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+class Histogram:
+    """
+    Value/count summary of a sample.
+
+    Degree sequences contain very few unique values compared to their size, therefore all
+    likelihood calculations are performed over the unique values weighted by their counts.
+    Statistics that do not depend on the model parameters are computed once and cached.
+    """
+
+    def __init__(self, values, counts):
+        """
+        Initializer.
+
+        :param values: sorted unique values of the sample.
+        :param counts: number of occurrences of each value.
+        """
+        self.values = np.asarray(values, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self._cache = {}
+
+    @staticmethod
+    def from_sample(data):
+        """
+        Creates the summary of a raw sample.
+
+        :param data: sample as a numpy array.
+        :return: histogram of the sample.
+        """
+        _data = np.asarray(data)
+        # counting takes memory proportional to the largest value, therefore it is only used
+        # when that is bounded by the type or comparable to the size of the sample
+        if _data.dtype.kind == 'u' and _data.dtype.itemsize < 8 and _data.size > 0\
+                and (_data.dtype.itemsize <= 2 or int(np.max(_data)) < BINCOUNT_SIZE_RATIO*_data.size):
+            counts = np.bincount(_data)
+            values = np.flatnonzero(counts)
+            return Histogram(values, counts[values])
+        values, counts = np.unique(_data, return_counts=True)
+        return Histogram(values, counts)
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        # cached statistics, e.g., the tails, can be much larger than the histogram and are
+        # recomputed in the receiving process
+        return {'values': self.values, 'counts': self.counts}
+
+    def __setstate__(self, state):
+        self.values = state['values']
+        self.counts = state['counts']
+        self._cache = {}
+
+    def _cached(self, key, func):
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    @property
+    def size(self):
+        """
+        Number of elements in the sample.
+        """
+        return self._cached('size', lambda: int(np.sum(self.counts)))
+
+    @property
+    def total(self):
+        """
+        Sum of the elements of the sample.
+        """
+        return self._cached('total', lambda: float(self.sum(lambda x: x)))
+
+    @property
+    def log_total(self):
+        """
+        Sum of the logarithm of the nonzero elements of the sample.
+        """
+        return self._cached('log_total', lambda: self.nonzero().sum(np.log))
+
+    @property
+    def log_factorial_total(self):
+        """
+        Sum of the log-factorial of the elements of the sample.
+        """
+        return self._cached('log_factorial_total', lambda: float(self.sum(grids.log_factorial_of)))
+
+    def max(self):
+        """
+        Returns the largest element of the sample.
+
+        :return: maximum value.
+        """
+        return self.values[-1]
+
+    @property
+    def mean(self):
+        """
+        Mean of the sample.
+        """
+        return self.total/self.size
+
+    @property
+    def variance(self):
+        """
+        Variance of the sample.
+        """
+        mean = self.mean
+        return self._cached('variance', lambda: self.sum(lambda x: np.power(x-mean, 2))/self.size)
+
+    def quantile(self, q):
+        """
+        Returns the smallest element of the sample that is not less than a fraction q of
+        the sample.
+
+        :param q: fraction between 0 and 1.
+        :return: quantile value.
+        """
+        cumulative = np.cumsum(self.counts)
+        return self.values[min(int(np.searchsorted(cumulative, q*self.size)), len(self.values)-1)]
+
+    def nonzero(self):
+        """
+        Returns the summary of the nonzero elements of the sample.
+
+        :return: histogram of the positive values.
+        """
+        def _nonzero():
+            _mask = self.values > 0
+            return Histogram(self.values[_mask], self.counts[_mask])
+        return self._cached('nonzero', _nonzero)
+
+    def cdf(self):
+        """
+        Returns the cumulative distribution of the sample over the range from zero to the
+        largest element.
+
+        :return: cumulative distribution as a numpy array.
+        """
+        pmf = np.zeros(int(self.max())+1)
+        pmf[self.values.astype(int)] = self.counts/float(self.size)
+        return np.cumsum(pmf)
+
+    def tails(self):
+        """
+        Returns the summaries of the tails of the sample starting at each unique value.
+        The statistics of the tails are computed at once from suffix sums over the unique
+        values, therefore no tail needs another pass over the sample.
+
+        :return: list of histograms, the i-th one containing the elements not less than the
+        i-th unique value.
+        """
+        def suffix(x):
+            return np.cumsum(x[::-1])[::-1]
+
+        def _tails():
+            sizes = suffix(self.counts)
+            totals = suffix(self.values*self.counts)
+            with np.errstate(divide='ignore'):
+                log_totals = suffix(np.where(self.values > 0, np.log(self.values), 0.0)*self.counts)
+            tails = []
+            for i in range(len(self.values)):
+                tail = Histogram(self.values[i:], self.counts[i:])
+                tail._cache.update(size=int(sizes[i]), total=float(totals[i]), log_total=float(log_totals[i]))
+                tails.append(tail)
+            return tails
+        return self._cached('tails', _tails)
+
+    def sum(self, func):
+        """
+        Returns the sum of a function over the elements of the sample.
+        The function is evaluated at the unique values only, and it may return an array of
+        shape (k, m) for m unique values, in which case k sums are returned.
+        Samples that do not compress into few unique values, e.g., continuous ones, are
+        reduced in chunks over a thread pool, and the partial sums are added in a fixed
+        order. Reductions started within the pool, e.g., by a function reading statistics
+        of the sample, are reduced in the calling thread, as waiting on the pool from its
+        own threads could exhaust it.
+
+        :param func: function to evaluate on the unique values.
+        :return: sum of the function values weighted by the counts.
+        """
+        if len(self.values) <= REDUCTION_CHUNK_SIZE:
+            return np.dot(func(self.values), self.counts)
+
+        def partial(i):
+            return np.dot(func(self.values[i:i+REDUCTION_CHUNK_SIZE]), self.counts[i:i+REDUCTION_CHUNK_SIZE])
+        starts = range(0, len(self.values), REDUCTION_CHUNK_SIZE)
+        if getattr(_reduction_thread, 'active', False):
+            return np.sum([partial(i) for i in starts], axis=0)
+        return np.sum(list(_pool().map(partial, starts)), axis=0)
+
+
+def summarize(data):
+    """
+    Returns the summary of a sample, or the summary itself if it is already summarized.
+    References to shared histograms are resolved to the histogram they refer to.
+
+    :param data: sample as a numpy array, histogram or shared histogram reference.
+    :return: histogram of the sample.
+    """
+    if isinstance(data, Histogram):
+        return data
+    if hasattr(data, 'attach'):
+        return data.attach()
+    return Histogram.from_sample(data)
+
+
+def portable(data):
+    """
+    Returns the data in the form that is cheapest to pass to a task in another process:
+    references to shared histograms as they are, and the summary of anything else.
+
+    :param data: sample as a numpy array, histogram or shared histogram reference.
+    :return: shared histogram reference or histogram.
+    """
+    return data if hasattr(data, 'attach') else summarize(data)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+#title          : remote.py
+#description    : Socket-based executor with workers connecting over the network.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python -m core.remote <host> <port> <authkey>
+#=====================================================
+import os
+import queue
+import threading
+from sys import argv
+from concurrent.futures import Executor, Future
+from multiprocessing import Process
+from multiprocessing.connection import Listener, Client
+from core import histogram as hi
+from core import shared
+
+
+# Histograms published by the executor in this process, or received by this worker, by name.
+_histograms = {}
+
+
+class CachedHistogram:
+    """
+    Reference to a histogram published by a socket executor.
+
+    The executor sends the histogram to each worker along with the first task referring to
+    it, and the worker keeps it until the executor releases it. Anywhere a sample or its
+    histogram is accepted, the reference is resolved to the histogram of the process.
+    """
+
+    def __init__(self, name):
+        """
+        Initializer.
+
+        :param name: name of the histogram.
+        """
+        self.name = name
+
+    def attach(self):
+        """
+        Returns the histogram the reference refers to, along with its cached statistics.
+
+        :return: histogram of the sample.
+        """
+        return _histograms[self.name]
+
+
+def _references(args, kwargs):
+    """
+    Returns the names of the histograms the arguments of a task refer to.
+
+    :param args: positional arguments.
+    :param kwargs: keyword arguments.
+    :return: set of names.
+    """
+    return {arg.name for arg in list(args) + list(kwargs.values()) if isinstance(arg, CachedHistogram)}
+
+
+def serve(address, authkey):
+    """
+    Runs a worker: connects to the executor at the given address and runs the tasks it
+    receives until it is told to stop or the connection is lost. The histograms sent along
+    with the tasks are kept until the executor releases them.
+
+    :param address: address of the executor as a (host, port) tuple.
+    :param authkey: authentication key of the executor.
+    """
+    shared._initialize()
+    try:
+        connection = Client(address, authkey=authkey)
+    except OSError:
+        return
+    try:
+        while True:
+            task = connection.recv()
+            if task is None:
+                break
+            fn, args, kwargs, published, released = task
+            _histograms.update(published)
+            for name in released:
+                _histograms.pop(name, None)
+            try:
+                connection.send((True, fn(*args, **kwargs)))
+            except Exception as error:
+                connection.send((False, error))
+    except (EOFError, OSError):
+        pass
+    finally:
+        connection.close()
+
+
+class SocketExecutor(Executor):
+    """
+    Executor sending its tasks over sockets to worker processes.
+
+    Workers connect to the executor and receive pickled tasks one at a time, therefore
+    tasks must be module level functions with small arguments, e.g., references to the
+    data instead of the data. Samples published through the executor are sent to each
+    worker once, with its first task referring to them. A number of local worker processes
+    is started by default, and further workers can be attached by running this module with
+    the address and key of the executor. The executor listens on the local host unless
+    another address is given.
+    """
+
+    def __init__(self, workers=None, address=('127.0.0.1', 0), authkey=None):
+        """
+        Initializer.
+
+        :param workers: number of local worker processes, the number of CPUs if not given.
+        :param address: address to listen on, a free port on the local host by default.
+        :param authkey: authentication key of the workers, a random one if not given.
+        """
+        self.authkey = os.urandom(16) if authkey is None else authkey
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._published = {}
+        self._shutdown = False
+        threading.Thread(target=self._accept, daemon=True).start()
+        self._processes = [Process(target=serve, args=(self.address, self.authkey), daemon=True)
+                           for _ in range((os.cpu_count() or 1) if workers is None else workers)]
+        for process in self._processes:
+            process.start()
+
+    def _accept(self):
+        """
+        Accepts the connections of the workers and starts a dispatching thread for each.
+        """
+        while True:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError):
+                break
+            with self._lock:
+                if self._shutdown:
+                    connection.close()
+                    break
+                thread = threading.Thread(target=self._dispatch, args=(connection,), daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def _dispatch(self, connection):
+        """
+        Sends tasks to a worker one at a time and resolves their futures with the results.
+        If the worker is lost, its current task fails and no more tasks are sent to it.
+        Published histograms are sent with the first task referring to them, and released
+        ones are dropped by the worker with the next task.
+
+        :param connection: connection to the worker.
+        """
+        sent = set()
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                break
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                published = {name: self._published[name] for name in _references(args, kwargs) - sent}
+                released = {name for name in sent if name not in self._published}
+            sent = (sent | set(published)) - released
+            try:
+                connection.send((fn, args, kwargs, published, released))
+                success, value = connection.recv()
+            except (EOFError, OSError) as error:
+                future.set_exception(error)
+                break
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        connection.close()
+
+    def publish(self, data):
+        """
+        Publishes a sample for the tasks of the executor.
+
+        :param data: sample as a numpy array or histogram.
+        :return: reference to pass to the tasks instead of the data.
+        """
+        reference = CachedHistogram(os.urandom(8).hex())
+        _histograms[reference.name] = hi.summarize(data)
+        with self._lock:
+            self._published[reference.name] = _histograms[reference.name]
+        return reference
+
+    def release(self, reference):
+        """
+        Removes a sample published by the executor. Workers drop their copy with their next
+        task.
+
+        :param reference: reference to the histogram.
+        """
+        with self._lock:
+            self._published.pop(reference.name, None)
+        _histograms.pop(reference.name, None)
+
+    def submit(self, fn, *args, **kwargs):
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in threads:
+            self._tasks.put(None)
+        self._listener.close()
+        if wait:
+            for thread in threads:
+                thread.join()
+            for process in self._processes:
+                process.join()
+        with self._lock:
+            for name in self._published:
+                _histograms.pop(name, None)
+            self._published = {}
+
+
+if __name__ == '__main__':
+    serve((argv[1], int(argv[2])), bytes.fromhex(argv[3]))
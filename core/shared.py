@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+#title          : shared.py
+#description    : Shared-memory samples and a persistent worker pool.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python shared.py
+#=====================================================
+import atexit
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from core import histogram as hi
+
+
+# Segments created by this process, by name.
+_published = {}
+
+# Segments attached by this process and the histograms viewing them, by name.
+_attached = {}
+
+# Released segments that could not be closed yet as they are still viewed.
+_retired = []
+
+
+class SharedHistogram:
+    """
+    Reference to the histogram of a sample published in shared memory.
+
+    The reference is small and picklable, therefore it can be passed to other processes
+    in place of the data. Anywhere a sample or its histogram is accepted, the reference
+    is resolved to a histogram viewing the shared segment without copying it.
+    """
+
+    def __init__(self, name, length):
+        """
+        Initializer.
+
+        :param name: name of the shared memory segment.
+        :param length: number of unique values in the histogram.
+        """
+        self.name = name
+        self.length = length
+
+    def attach(self):
+        """
+        Returns the histogram viewing the shared segment. The segment is attached once per
+        process and the histogram is kept along with its cached statistics.
+
+        :return: histogram of the sample.
+        """
+        if self.name not in _attached:
+            segment = _published[self.name] if self.name in _published\
+                else shared_memory.SharedMemory(name=self.name)
+            # the views keep their own memoryview as base, which holds an export of the segment
+            # as long as any of them lives
+            buffer = memoryview(segment.buf)
+            values = np.frombuffer(buffer, dtype=np.float64, count=self.length)
+            counts = np.frombuffer(buffer, dtype=np.int64, count=self.length, offset=8*self.length)
+            _attached[self.name] = (segment, hi.Histogram(values, counts))
+        return _attached[self.name][1]
+
+
+def publish(data):
+    """
+    Publishes the histogram of a sample in shared memory.
+
+    :param data: sample as a numpy array or histogram.
+    :return: reference to the shared histogram.
+    """
+    summary = hi.summarize(data)
+    length = len(summary.values)
+    segment = shared_memory.SharedMemory(create=True, size=max(16*length, 1))
+    np.ndarray((length,), dtype=np.float64, buffer=segment.buf)[:] = summary.values
+    np.ndarray((length,), dtype=np.int64, buffer=segment.buf, offset=8*length)[:] = summary.counts
+    _published[segment.name] = segment
+    return SharedHistogram(segment.name, length)
+
+
+def _close(segment):
+    """
+    Closes a segment in this process. If views of the segment are still in use, the segment
+    is kept open and closing is retried along with the next segment.
+
+    :param segment: shared memory segment.
+    """
+    for retired in list(_retired) + [segment]:
+        try:
+            retired.close()
+            if retired in _retired:
+                _retired.remove(retired)
+        except BufferError:
+            if retired not in _retired:
+                _retired.append(retired)
+
+
+def _detach(name):
+    """
+    Drops the histogram viewing a segment and closes the segment in this process.
+
+    :param name: name of the segment.
+    """
+    if name in _attached:
+        segment, _ = _attached.pop(name)
+        if name not in _published:
+            _close(segment)
+
+
+def release(reference):
+    """
+    Removes a published histogram from shared memory. Workers still attached to the
+    segment keep their view until they exit.
+
+    :param reference: reference to the shared histogram.
+    """
+    _detach(reference.name)
+    segment = _published.pop(reference.name, None)
+    if segment is not None:
+        _close(segment)
+        segment.unlink()
+
+
+def _detach_all():
+    """
+    Detaches all segments attached by this process.
+    """
+    for name in list(_attached):
+        _detach(name)
+
+
+def _initialize():
+    """
+    Initializes a worker: imports the modules used by the tasks and makes sure that the
+    attached segments are closed at exit.
+    """
+    import calculation.fit
+    import calculation.bootstrap
+    atexit.register(_detach_all)
+
+
+class WorkerPool(Executor):
+    """
+    Persistent pool of worker processes.
+
+    Samples published through the pool are copied to shared memory once, and the tasks
+    receive references to them, which the workers resolve to zero-copy views. Workers stay
+    alive across tasks, distributions and samples with their modules imported, and every
+    published segment is removed when the pool shuts down.
+    """
+
+    def __init__(self, workers=None):
+        """
+        Initializer.
+
+        :param workers: number of worker processes, the number of CPUs if not given.
+        """
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_initialize)
+        self._references = []
+
+    def publish(self, data):
+        """
+        Publishes a sample for the tasks of the pool.
+
+        :param data: sample as a numpy array or histogram.
+        :return: reference to pass to the tasks instead of the data.
+        """
+        reference = publish(data)
+        self._references.append(reference)
+        return reference
+
+    def release(self, reference):
+        """
+        Removes a sample published by the pool.
+
+        :param reference: reference to the shared histogram.
+        """
+        self._references.remove(reference)
+        release(reference)
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        for reference in self._references:
+            release(reference)
+        self._references = []
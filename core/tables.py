@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+#title          : tables.py
+#description    : Persisted lookup tables of special functions.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python model.py --build-tables
+#=====================================================
+import json
+import os
+import struct
+import numpy as np
+
+
+# Identifier of table files.
+TABLE_MAGIC = b'DEGTAB'
+
+# Version of the file format, files of other versions are ignored.
+TABLE_VERSION = 1
+
+# Directory of the table files.
+TABLE_DIR = os.environ.get('DEGREE_TABLES', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                         'tables'))
+
+# Largest absolute error of the tabulated values allowed in a grid cell. Cells whose
+# error exceeds it are evaluated exactly.
+TABLE_TOLERANCE = 1e-6
+
+# Functions that can be tabulated, by name.
+_registry = {}
+
+# Tables loaded by this process, by name, None if a table is not available.
+_tables = {}
+
+
+def _weights(t):
+    """
+    Returns the weights of cubic Lagrange interpolation over the nodes -1, 0, 1 and 2.
+
+    :param t: numpy array of positions relative to node 0.
+    :return: (4, ...) numpy array of weights.
+    """
+    return np.stack([-t*(t-1)*(t-2)/6, (t+1)*(t-1)*(t-2)/2, -(t+1)*t*(t-2)/2, (t+1)*t*(t-1)/6])
+
+
+class Table:
+    """
+    Values of a function of two variables over a regular grid.
+
+    Values are interpolated by tensor product cubic polynomials over the 4x4 nodes around
+    the query point, therefore the error decreases with the fourth power of the spacing.
+    When a table is built, the interpolation is compared to the exact function within
+    every cell, and cells whose error exceeds the tolerance are marked to be evaluated
+    exactly.
+    """
+
+    def __init__(self, name, revision, axes, values, valid, tolerance, error):
+        """
+        Initializer.
+
+        :param name: name of the tabulated function.
+        :param revision: revision of the tabulated function.
+        :param axes: list of the (low, high, nodes) tuples of the two variables.
+        :param values: (n1, n2) numpy array of the function values at the nodes.
+        :param valid: (n1-1, n2-1) numpy array marking the cells within tolerance.
+        :param tolerance: error tolerance of the cells.
+        :param error: largest error among the valid cells.
+        """
+        self.name = name
+        self.revision = revision
+        self.axes = [tuple(axis) for axis in axes]
+        self.values = values
+        self.valid = valid
+        self.tolerance = tolerance
+        self.error = error
+
+    def _nodes(self, axis):
+        low, high, n = self.axes[axis]
+        return np.linspace(low, high, int(n))
+
+    def interpolate(self, x, y):
+        """
+        Interpolates the function. Queries outside the table or in cells that are not
+        within tolerance are returned as NaN.
+
+        :param x: numpy array of the first variable.
+        :param y: numpy array of the second variable, same shape as x.
+        :return: numpy array of interpolated values.
+        """
+        positions, cells, inside = [], [], np.ones(np.shape(x), dtype=bool)
+        for axis, z in enumerate((np.asarray(x, dtype=float), np.asarray(y, dtype=float))):
+            low, high, n = self.axes[axis]
+            with np.errstate(invalid='ignore'):
+                inside &= (z >= low) & (z <= high)
+            u = np.where(inside, (z-low)/(high-low)*(n-1), 0.0)
+            positions.append(u)
+            cells.append(np.clip(np.floor(u).astype(int), 0, int(n)-2))
+        inside &= self.valid[cells[0], cells[1]].astype(bool)
+        starts = [np.clip(cell-1, 0, int(self.axes[axis][2])-4) for axis, cell in enumerate(cells)]
+        wx = _weights(positions[0]-starts[0]-1)
+        wy = _weights(positions[1]-starts[1]-1)
+        result = np.zeros(np.shape(x))
+        for a in range(4):
+            for b in range(4):
+                result += wx[a]*wy[b]*self.values[starts[0]+a, starts[1]+b]
+        return np.where(inside, result, np.nan)
+
+    @staticmethod
+    def build(name, executor=None):
+        """
+        Builds the table of a registered function and validates it cell by cell.
+        The error of tensor product interpolation is the sum of the errors along the two
+        variables, which may cancel at a single point, therefore the error of a cell is
+        bounded by the larger of the error at its center and the sum of the largest errors
+        at the midpoints of its edges along each variable.
+
+        :param name: name of the function.
+        :param executor: optional executor to evaluate the rows of the grid in parallel.
+        :return: table.
+        """
+        _, revision, axes = _registry[name]
+        table = Table(name, revision, axes, None, None, TABLE_TOLERANCE, 0.0)
+        x, y = table._nodes(0), table._nodes(1)
+        cx, cy = (x[1:]+x[:-1])/2, (y[1:]+y[:-1])/2
+        grids = [(x, y), (cx, cy), (cx, y), (x, cy)]
+        rows = [(name, xi, _y) for _x, _y in grids for xi in _x]
+        if executor is None:
+            results = [_evaluate_row(*row) for row in rows]
+        else:
+            results = [future.result() for future in [executor.submit(_evaluate_row, *row) for row in rows]]
+        exact = []
+        for _x, _ in grids:
+            exact.append(np.array(results[:len(_x)]))
+            results = results[len(_x):]
+        table.values = exact[0]
+        table.valid = np.ones((len(cx), len(cy)), dtype=np.uint8)
+        errors = []
+        for (_x, _y), _exact in zip(grids[1:], exact[1:]):
+            gx, gy = np.meshgrid(_x, _y, indexing='ij')
+            with np.errstate(invalid='ignore'):
+                errors.append(np.abs(table.interpolate(gx, gy)-_exact))
+        along_x = np.maximum(errors[1][:, 1:], errors[1][:, :-1])
+        along_y = np.maximum(errors[2][1:, :], errors[2][:-1, :])
+        bound = np.fmax(errors[0], along_x+along_y)
+        table.valid = (bound <= TABLE_TOLERANCE).astype(np.uint8)
+        table.error = float(np.max(bound[table.valid > 0])) if np.any(table.valid) else 0.0
+        return table
+
+    def save(self, directory=TABLE_DIR):
+        """
+        Writes the table to its file in the given directory.
+
+        :param directory: directory of the table files.
+        :return: name of the file.
+        """
+        header = json.dumps({'name': self.name, 'revision': self.revision, 'axes': self.axes,
+                             'tolerance': self.tolerance, 'error': self.error}).encode()
+        header += b' '*(-(len(TABLE_MAGIC)+6+len(header)) % 8)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        filename = os.path.join(directory, self.name + '.tab')
+        with open(filename, 'wb') as _output_file:
+            _output_file.write(TABLE_MAGIC + struct.pack('<HI', TABLE_VERSION, len(header)) + header)
+            _output_file.write(np.ascontiguousarray(self.values, dtype='<f8').tobytes())
+            _output_file.write(np.ascontiguousarray(self.valid, dtype=np.uint8).tobytes())
+        return filename
+
+    @staticmethod
+    def load(filename):
+        """
+        Maps a table file into memory.
+
+        :param filename: name of the table file.
+        :return: table, or None if the file is of another format version.
+        """
+        with open(filename, 'rb') as _input_file:
+            if _input_file.read(len(TABLE_MAGIC)) != TABLE_MAGIC:
+                return None
+            version, length = struct.unpack('<HI', _input_file.read(6))
+            if version != TABLE_VERSION:
+                return None
+            header = json.loads(_input_file.read(length).decode())
+        offset = len(TABLE_MAGIC)+6+length
+        n1, n2 = int(header['axes'][0][2]), int(header['axes'][1][2])
+        values = np.memmap(filename, dtype='<f8', mode='r', offset=offset, shape=(n1, n2))
+        valid = np.memmap(filename, dtype=np.uint8, mode='r', offset=offset+8*n1*n2, shape=(n1-1, n2-1))
+        return Table(header['name'], header['revision'], header['axes'], values, valid, header['tolerance'],
+                     header['error'])
+
+
+def _evaluate_row(name, x, y):
+    """
+    Evaluates a registered function exactly along a row of the grid.
+
+    :param name: name of the function.
+    :param x: value of the first variable.
+    :param y: numpy array of the second variable.
+    :return: list of function values.
+    """
+    func = _registry[name][0]
+    return [func(x, yi) for yi in y]
+
+
+def register(name, func, axes, revision=1):
+    """
+    Registers a function that can be tabulated.
+
+    :param name: name of the function and its table.
+    :param func: exact function of two scalar variables.
+    :param axes: list of the (low, high, nodes) tuples of the two variables.
+    :param revision: revision of the function, tables of other revisions are ignored.
+    """
+    _registry[name] = (func, revision, axes)
+
+
+def get(name, directory=TABLE_DIR):
+    """
+    Returns the table of a function, mapping it into memory at first use. Tables that do
+    not exist, or belong to another revision or grid, are not used.
+
+    :param name: name of the function.
+    :param directory: directory of the table files.
+    :return: table, or None.
+    """
+    if name not in _tables:
+        filename = os.path.join(directory, name + '.tab')
+        table = Table.load(filename) if os.path.isfile(filename) else None
+        if table is not None and (table.revision != _registry[name][1]
+                                  or table.axes != [tuple(axis) for axis in _registry[name][2]]):
+            table = None
+        _tables[name] = table
+    return _tables[name]
+
+
+def lookup(name, x, y):
+    """
+    Returns the interpolated values of a function where its table is available and within
+    tolerance, and NaN elsewhere, where the function has to be evaluated exactly.
+
+    :param name: name of the function.
+    :param x: numpy array of the first variable.
+    :param y: numpy array of the second variable.
+    :return: numpy array of values.
+    """
+    table = get(name)
+    if table is None:
+        return np.full(np.shape(x), np.nan)
+    return table.interpolate(x, y)
+
+
+def build(directory=TABLE_DIR, executor=None):
+    """
+    Builds and saves the tables of all registered functions.
+
+    :param directory: directory of the table files.
+    :param executor: optional executor to evaluate the grids in parallel.
+    :return: list of the built tables.
+    """
+    tables = []
+    for name in sorted(_registry):
+        table = Table.build(name, executor)
+        table.save(directory)
+        _tables.pop(name, None)
+        tables.append(table)
+    return tables
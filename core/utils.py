@@ -7,6 +7,19 @@
 #usage          : python utils.py
 #=====================================================
 import csv
+import numpy as np
+from itertools import islice
+from core import histogram as hi
+
+
+# Number of rows parsed at once when reading a sample.
+SAMPLE_READ_CHUNK = 1 << 20
+
+# Integer type of samples stored in binary files.
+SAMPLE_FILE_DTYPE = np.uint32
+
+# Column names of histogram files.
+HISTOGRAM_HEADER = ['value', 'count']
 
 
 def read_csv(filename):
@@ -21,6 +34,73 @@ def read_csv(filename):
         return list(list(row) for row in csv.reader(_input_file, delimiter=' '))[1:]
 
 
+def compact(values):
+    """
+    Converts a sample to the smallest unsigned integer type that can hold its values.
+    All distributions are defined over non-negative integers, thus any other value is
+    rejected.
+
+    :param values: sample as a list or numpy array.
+    :return: sample as a numpy array of unsigned integers.
+    """
+    _values = np.asarray(values)
+    if _values.size == 0:
+        return _values.astype(np.uint8)
+    if _values.dtype.kind != 'u':
+        if not np.all(np.isfinite(_values)):
+            raise ValueError("sample contains non-finite values.")
+        if np.min(_values) < 0:
+            raise ValueError("sample contains negative values.")
+        if np.any(_values != np.floor(_values)):
+            raise ValueError("sample contains non-integer values.")
+    return _values.astype(np.min_scalar_type(int(np.max(_values))))
+
+
+def read_histogram(filename):
+    """
+    Reads the histogram of a sample from a csv file written by write_histogram_chunks.
+
+    :param filename: name of the histogram file.
+    :return: histogram of the sample.
+    """
+    rows = [row for row in read_csv(filename) if len(row) > 1]
+    values = compact([float(row[0]) for row in rows])
+    counts = np.array([int(row[1]) for row in rows], dtype=np.int64)
+    order = np.argsort(values)
+    return hi.Histogram(values[order], counts[order])
+
+
+def read_sample(filename, chunk=SAMPLE_READ_CHUNK):
+    """
+    Reads a sample from a csv file, one value in the first column of each row.
+    The file is parsed in chunks that are validated and compacted one by one, so the whole
+    sample is never stored as floats.
+    Binary (.npy) samples are mapped into memory instead of being read, and histogram files
+    are read as histograms.
+    Note: first line is reserved for header, so it is ignored.
+
+    :param filename: name of the data file.
+    :param chunk: number of rows parsed at once.
+    :return: sample as a numpy array of unsigned integers, or its histogram.
+    """
+    if filename.endswith('.npy'):
+        _values = np.load(filename, mmap_mode='r')
+        return _values if _values.dtype.kind == 'u' else compact(_values)
+    chunks = []
+    with open(filename, 'r') as _input_file:
+        rows = csv.reader(_input_file, delimiter=' ')
+        if next(rows, None) == ['#'] + HISTOGRAM_HEADER:
+            return read_histogram(filename)
+        while True:
+            block = list(islice(rows, chunk))
+            if len(block) == 0:
+                break
+            chunks.append(compact([float(row[0]) for row in block if len(row) > 0]))
+    if len(chunks) == 0:
+        return compact([])
+    return np.concatenate(chunks)
+
+
 def print_csv(filename, header, data):
     """
     Prints out data in a csv file with given header.
@@ -37,3 +117,48 @@ def print_csv(filename, header, data):
                 csv_out.writerow(row)
             else:
                 csv_out.writerow([row])
+
+
+def write_sample_chunks(filename, chunks, size, dtype=SAMPLE_FILE_DTYPE):
+    """
+    Writes a sample given in chunks to a binary (.npy) file. The file is mapped into memory
+    and filled chunk by chunk, therefore only one chunk is held in memory at a time.
+
+    :param filename: name of the output file.
+    :param chunks: iterable of numpy arrays of samples.
+    :param size: total number of samples.
+    :param dtype: integer type of the stored samples.
+    :return: number of samples written.
+    """
+    _output = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=(size,))
+    written = 0
+    for _chunk in chunks:
+        _values = compact(_chunk)
+        if _values.size > 0 and int(np.max(_values)) > np.iinfo(dtype).max:
+            raise ValueError("sample contains values too large for %s." % np.dtype(dtype).name)
+        _output[written:written+len(_values)] = _values
+        written += len(_values)
+    _output.flush()
+    del _output
+    return written
+
+
+def write_histogram_chunks(filename, chunks):
+    """
+    Writes the histogram of a sample given in chunks to a csv file. Counts are merged
+    chunk by chunk, therefore memory is bounded by the number of unique values instead of
+    the size of the sample.
+
+    :param filename: name of the output file.
+    :param chunks: iterable of numpy arrays of samples.
+    :return: number of samples written.
+    """
+    values, counts = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    for _chunk in chunks:
+        _values, _counts = np.unique(compact(_chunk), return_counts=True)
+        values, inverse = np.unique(np.concatenate([values, _values.astype(np.uint64)]), return_inverse=True)
+        merged = np.zeros(len(values), dtype=np.int64)
+        np.add.at(merged, inverse, np.concatenate([counts, _counts]))
+        counts = merged
+    print_csv(filename, HISTOGRAM_HEADER, [[int(v), int(c)] for v, c in zip(values, counts)])
+    return int(np.sum(counts))
@@ -15,6 +15,12 @@ from distributions.weibull import weibull
 from distributions.truncated_power_law import truncated_power_law
 from distributions.shifted_power_law import shifted_power_law
 from distributions.normal import normal
+from distributions.geometric import geometric
+from distributions.negative_binomial import negative_binomial
+from distributions.yule_simon import yule_simon
+from distributions.log_logistic import log_logistic
+from distributions.logistic import logistic
+from distributions.gumbel import gumbel
 
 
 # Distribution names
@@ -25,32 +31,70 @@ DISTRIBUTION_WEIBULL = 'weibull'
 DISTRIBUTION_SHIFTED_POWER_LAW = 'shifted-power-law'
 DISTRIBUTION_TRUNCATED_POWER_LAW = 'truncated-power-law'
 DISTRIBUTION_NORMAL = 'normal'
+DISTRIBUTION_GEOMETRIC = 'geometric'
+DISTRIBUTION_NEGATIVE_BINOMIAL = 'negative-binomial'
+DISTRIBUTION_YULE_SIMON = 'yule-simon'
+DISTRIBUTION_LOG_LOGISTIC = 'log-logistic'
+DISTRIBUTION_LOGISTIC = 'logistic'
+DISTRIBUTION_GUMBEL = 'gumbel'
 
 KEY_CLASS = 'class'
 KEY_TEST_PARAMS = 'test-params'
 KEY_INITIAL_FIT_PARAMS = 'initial-fit-params'
+KEY_FIT_RANGE = 'fit-range'
 DISTRIBUTIONS = {
     DISTRIBUTION_POISSON: {KEY_CLASS: poisson,
                            KEY_TEST_PARAMS: [3.4],
-                           KEY_INITIAL_FIT_PARAMS: [20.0]},
+                           KEY_INITIAL_FIT_PARAMS: [20.0],
+                           KEY_FIT_RANGE: [(0.01, 1000.0)]},
     DISTRIBUTION_EXPONENTIAL: {KEY_CLASS: exponential,
                                KEY_TEST_PARAMS: [17.0],
-                               KEY_INITIAL_FIT_PARAMS: [10.0]},
+                               KEY_INITIAL_FIT_PARAMS: [10.0],
+                               KEY_FIT_RANGE: [(0.01, 1000.0)]},
     DISTRIBUTION_SHIFTED_POWER_LAW: {KEY_CLASS: shifted_power_law,
                                      KEY_TEST_PARAMS: [2.3, 20.7],
-                                     KEY_INITIAL_FIT_PARAMS: [1.2, 1.0]},
+                                     KEY_INITIAL_FIT_PARAMS: [1.2, 1.0],
+                                     KEY_FIT_RANGE: [(1.01, 6.0), (0.01, 1000.0)]},
     DISTRIBUTION_TRUNCATED_POWER_LAW: {KEY_CLASS: truncated_power_law,
                                        KEY_TEST_PARAMS: [2.3, 123.0],
-                                       KEY_INITIAL_FIT_PARAMS: [1.2, 50.0]},
+                                       KEY_INITIAL_FIT_PARAMS: [1.2, 50.0],
+                                       KEY_FIT_RANGE: [(0.01, 6.0), (0.1, 10000.0)]},
     DISTRIBUTION_LOGNORMAL: {KEY_CLASS: lognormal,
                              KEY_TEST_PARAMS: [1.9, 1.1],
-                             KEY_INITIAL_FIT_PARAMS: [1.0, 0.5]},
+                             KEY_INITIAL_FIT_PARAMS: [1.0, 0.5],
+                             KEY_FIT_RANGE: [(0.01, 10.0), (0.01, 10.0)]},
     DISTRIBUTION_WEIBULL: {KEY_CLASS: weibull,
                            KEY_TEST_PARAMS: [0.5, 1.2],
-                           KEY_INITIAL_FIT_PARAMS: [3.2, 0.8]},
+                           KEY_INITIAL_FIT_PARAMS: [3.2, 0.8],
+                           KEY_FIT_RANGE: [(0.05, 10.0), (0.01, 1000.0)]},
     DISTRIBUTION_NORMAL: {KEY_CLASS: normal,
                           KEY_TEST_PARAMS: [80.8, 8.9],
-                          KEY_INITIAL_FIT_PARAMS: [10.0, 5.0]}
+                          KEY_INITIAL_FIT_PARAMS: [10.0, 5.0],
+                          KEY_FIT_RANGE: [(0.01, 1000.0), (0.01, 1000.0)]},
+    DISTRIBUTION_GEOMETRIC: {KEY_CLASS: geometric,
+                             KEY_TEST_PARAMS: [0.08],
+                             KEY_INITIAL_FIT_PARAMS: [0.5],
+                             KEY_FIT_RANGE: [(0.002, 0.998)]},
+    DISTRIBUTION_NEGATIVE_BINOMIAL: {KEY_CLASS: negative_binomial,
+                                     KEY_TEST_PARAMS: [2.5, 0.2],
+                                     KEY_INITIAL_FIT_PARAMS: [1.0, 0.5],
+                                     KEY_FIT_RANGE: [(0.01, 100.0), (0.002, 0.998)]},
+    DISTRIBUTION_YULE_SIMON: {KEY_CLASS: yule_simon,
+                              KEY_TEST_PARAMS: [1.7],
+                              KEY_INITIAL_FIT_PARAMS: [2.0],
+                              KEY_FIT_RANGE: [(0.05, 50.0)]},
+    DISTRIBUTION_LOG_LOGISTIC: {KEY_CLASS: log_logistic,
+                                KEY_TEST_PARAMS: [12.0, 2.5],
+                                KEY_INITIAL_FIT_PARAMS: [5.0, 2.0],
+                                KEY_FIT_RANGE: [(0.01, 1000.0), (0.05, 20.0)]},
+    DISTRIBUTION_LOGISTIC: {KEY_CLASS: logistic,
+                            KEY_TEST_PARAMS: [40.0, 6.0],
+                            KEY_INITIAL_FIT_PARAMS: [10.0, 5.0],
+                            KEY_FIT_RANGE: [(0.01, 1000.0), (0.01, 500.0)]},
+    DISTRIBUTION_GUMBEL: {KEY_CLASS: gumbel,
+                          KEY_TEST_PARAMS: [25.0, 8.0],
+                          KEY_INITIAL_FIT_PARAMS: [10.0, 5.0],
+                          KEY_FIT_RANGE: [(0.01, 1000.0), (0.01, 500.0)]}
 }
 
 
@@ -63,6 +107,19 @@ def get():
     return sorted(list(DISTRIBUTIONS.keys()))
 
 
+def fit_grid(distribution, points):
+    """
+    Returns a coarse grid over the parameter space of a distribution.
+    Points are spaced geometrically along each parameter axis within the fit range.
+
+    :param distribution: distribution to use.
+    :param points: number of points along each parameter axis.
+    :return: (k, p) numpy array of parameter vectors.
+    """
+    axes = [np.geomspace(low, high, points) for low, high in DISTRIBUTIONS[distribution][KEY_FIT_RANGE]]
+    return np.array(np.meshgrid(*axes, indexing='ij')).reshape(len(axes), -1).T
+
+
 def get_sample_pmf(values):
     """
     Creates the probability mass function from a sample of values.
@@ -70,7 +127,7 @@ def get_sample_pmf(values):
     :param values: sample of values.
     :return: probability mass function as a numpy array.
     """
-    return np.histogram(values.astype(int), range(int(np.max(values))))[0] / len(values)
+    return np.bincount(np.asarray(values).astype(int)) / len(values)
 
 
 def get_sample_cdf(values):
@@ -83,55 +140,175 @@ def get_sample_cdf(values):
     return np.cumsum(get_sample_pmf(values))
 
 
-def pmf(distribution, params, domain=co.DEFAULT_PDF_MAX):
+def pmf(distribution, params, domain=co.DEFAULT_PDF_MAX, out=None):
     """
     Returns the probability mass function for the given distribution.
 
     :param distribution: distribution to use.
     :param params: parameters.
     :param domain: domain size.
-    :return: probability mass function.
+    :param out: optional buffer of length domain+1 to calculate the function in.
+    :return: probability mass function, the buffer if it was used.
+    """
+    return DISTRIBUTIONS[distribution][KEY_CLASS].pmf(params, domain=domain, out=out)
+
+
+def log_pmf(distribution, params, x, out=None):
+    """
+    Returns the logarithm of the probability mass function of a given distribution at the
+    given values only.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param x: non-negative integer values as a scalar or numpy array.
+    :param out: optional buffer with the shape of x to calculate the function in.
+    :return: log-probabilities with the shape of x, the buffer if it was given.
+    """
+    return DISTRIBUTIONS[distribution][KEY_CLASS].log_pmf(params, x, out)
+
+
+def log_sf(distribution, params, x):
     """
-    return DISTRIBUTIONS[distribution][KEY_CLASS].pmf(params, domain=domain)
+    Returns the logarithm of the survival function, P(X >= x), of a given distribution.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param x: lower bound of the tail.
+    :return: log-probability of the tail.
+    """
+    return DISTRIBUTIONS[distribution][KEY_CLASS].log_sf(params, x)
 
 
-def cdf(distribution, params, domain=co.DEFAULT_PDF_MAX):
+def cdf(distribution, params, domain=co.DEFAULT_PDF_MAX, out=None):
     """
     Returns the cumulative distribution function of a given distribution.
+    The probability mass function is accumulated in place.
 
     :param distribution: distribution to use.
     :param params: parameters.
     :param domain: domain size.
-    :return: cumulative distribution function.
+    :param out: optional buffer of length domain+1 to calculate the function in.
+    :return: cumulative distribution function, the buffer if it was used.
     """
-    return np.cumsum(pmf(distribution, params, domain=domain))
+    _pmf = pmf(distribution, params, domain=domain, out=out)
+    return np.cumsum(_pmf, out=_pmf)
 
 
-def samples(distribution, params, size=co.DEFAULT_SAMPLE_SIZE):
+def samples(distribution, params, size=co.DEFAULT_SAMPLE_SIZE, rng=None):
     """
     Returns samples from a given distribution.
 
     :param distribution: distribution to use.
     :param params: parameters.
     :param size: sample size
+    :param rng: random number generator, numpy's global generator is used if not given.
+    :return: numpy array of samples.
+    """
+    return DISTRIBUTIONS[distribution][KEY_CLASS].samples(params, size=size, rng=rng)
+
+
+def _sample_chunk(distribution, params, size, seed):
+    """
+    Draws one chunk of samples with a generator seeded for the chunk.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param size: number of samples in the chunk.
+    :param seed: seed of the chunk.
     :return: numpy array of samples.
     """
-    return DISTRIBUTIONS[distribution][KEY_CLASS].samples(params, size=size)
+    _samples = DISTRIBUTIONS[distribution][KEY_CLASS].samples(params, size=size, rng=np.random.default_rng(seed))
+    # substitute uniform samples are continuous
+    return _samples if _samples.dtype.kind in 'iu' else np.floor(_samples).astype(np.int64)
+
+
+def sample_chunks(distribution, params, size, chunk=co.SAMPLE_CHUNK_SIZE, seed=None, executor=None):
+    """
+    Generates a large sample in chunks of fixed size, so that the sample never has to fit
+    in memory. Every chunk has its own seed derived from the seed of the whole sample,
+    therefore the chunks are reproducible and do not depend on whether they are generated
+    sequentially or on an executor. On an executor, a bounded number of chunks is generated
+    ahead.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param size: total number of samples.
+    :param chunk: number of samples in one chunk, the last one may be shorter.
+    :param seed: optional seed of the whole sample.
+    :param executor: optional executor to generate the chunks in parallel.
+    :return: generator of numpy arrays of samples.
+    """
+    counts = [min(chunk, size-i) for i in range(0, size, chunk)]
+    seeds = np.random.SeedSequence(seed).generate_state(len(counts))
+    if executor is None:
+        for count, chunk_seed in zip(counts, seeds):
+            yield _sample_chunk(distribution, params, count, chunk_seed)
+        return
+    futures = []
+    try:
+        for count, chunk_seed in zip(counts, seeds):
+            futures.append(executor.submit(_sample_chunk, distribution, params, count, chunk_seed))
+            if len(futures) > co.SAMPLE_CHUNK_PREFETCH:
+                yield futures.pop(0).result()
+        while len(futures) > 0:
+            yield futures.pop(0).result()
+    finally:
+        for future in futures:
+            future.cancel()
 
 
 def log_likelihood(distribution, params, data, nonzero_only=False):
     """
     Returns the log-likelihood of a distribution over a given sample.
+    If a (k, p) matrix of parameter vectors is given, all k log-likelihoods are calculated in
+    one pass over the data.
 
     :param distribution: distribution to use.
-    :param params: parameters.
-    :param data: data to use.
+    :param params: parameters, or a matrix of parameter vectors.
+    :param data: data to use, either as a numpy array or its histogram.
     :param nonzero_only: whether only non-zero data points should be used.
-    :return: log-likelihood.
+    :return: log-likelihood, or a numpy array of log-likelihoods.
     """
     return DISTRIBUTIONS[distribution][KEY_CLASS].log_likelihood(params, data, nonzero_only)
 
 
+def initial_params(distribution, data):
+    """
+    Returns the starting parameters of a fit, estimated from the data if the distribution
+    supports it, and the default initial parameters otherwise.
+
+    :param distribution: distribution to use.
+    :param data: histogram of the data.
+    :return: list containing the parameters.
+    """
+    params = DISTRIBUTIONS[distribution][KEY_CLASS].initial_params(data)
+    return DISTRIBUTIONS[distribution][KEY_INITIAL_FIT_PARAMS] if params is None else params
+
+
+def mle(distribution, data):
+    """
+    Returns the closed form maximum likelihood estimate of the parameters of a distribution,
+    if it exists.
+
+    :param distribution: distribution to use.
+    :param data: histogram of the data.
+    :return: list containing the parameters, or None.
+    """
+    return DISTRIBUTIONS[distribution][KEY_CLASS].mle(data)
+
+
+def information(distribution, params, data):
+    """
+    Returns the closed form observed Fisher information of a distribution, if it exists.
+
+    :param distribution: distribution to use.
+    :param params: parameters.
+    :param data: histogram of the data.
+    :return: information matrix as a numpy array, or None.
+    """
+    return DISTRIBUTIONS[distribution][KEY_CLASS].information(params, data)
+
+
 def get_params(params, distribution):
     """
     Creates a printable message of the parameter values.
@@ -7,9 +7,10 @@
 #usage          : python exponential.py
 #=====================================================
 import numpy as np
-from mpmath import exp, ln
 
 from core import core as co
+from core import grids
+from core import histogram as hi
 
 
 class Exponential(co.RealDistribution):
@@ -23,57 +24,110 @@ class Exponential(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function.
 
         :param params: single element list containing the scale (beta) parameter.
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[0] < co.EPSILON:
-            return co.delta.pmf([0], domain)
+            return co.delta.pmf([0], domain, out)
         else:
-            c = 1-exp(-1/params[0])
-            x = np.arange(0, domain+1)
-            return np.exp(-x/params[0])*c
+            _pmf = np.multiply(grids.x(domain), -1/params[0], out=co.buffer(out, domain+1))
+            np.exp(_pmf, out=_pmf)
+            return np.multiply(_pmf, -np.expm1(-1/params[0]), out=_pmf)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: single element list containing the scale (beta) parameter.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        else:
+            return np.subtract(np.log(-np.expm1(-1/params[0])), np.asarray(x, dtype=float)/params[0], out=out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with discrete exponential distribution.
 
+        The discrete exponential distribution is a geometric distribution with success
+        probability 1-exp(-1/beta), counting the failures before the first success.
+
         :param params: single element list containing the scale (beta) parameter.
         :param size: number of samples.
-        :param domain: domain size.
+        :param domain: unused.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
         if params[0] < co.EPSILON:
-            return co.delta.samples([0], size)
+            return co.delta.samples([0], size, rng=rng)
         else:
-            x = np.arange(0, domain+1)
-            return co.generate_discrete_samples(x, np.exp(-x/params[0]), size)
+            _rng = np.random if rng is None else rng
+            return _rng.geometric(-np.expm1(-1/params[0]), size) - 1
 
     @staticmethod
     def log_likelihood(params, data, nonzero_only=False):
         """
         Calculates the log-likelihood on the data.
 
-        :param params: single element list containing the scale (beta) parameter.
-        :param data: input data as a numpy array.
+        :param params: single element list containing the scale (beta) parameter, or a
+        matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero_only: whether nonzero element should be considered only.  This is
         used after determining the parameters and comparing to distributions that ignore
         zero values.
         :return: log-likelihood.
         """
-        if params[0] < co.EPSILON:
-            return co.delta.log_likelihood([0], data)
-        else:
-            if nonzero_only:
-                _samples = data[np.where(data > 0)]
-            else:
-                _samples = data
-            return len(_samples)*ln(1-exp(-1/params[0])) - np.sum(_samples)/params[0]
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        beta = _params[:, 0]
+        ll = np.empty(len(_params))
+        delta = beta < co.EPSILON
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        ll[~delta] = _samples.size*np.log(-np.expm1(-1/beta[~delta])) - _samples.total/beta[~delta]
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def mle(data):
+        """
+        Maximum likelihood estimate of beta.
+        With q = exp(-1/beta), the distribution is geometric with the estimate q = m/(1+m),
+        where m is the sample mean.
+
+        :param data: histogram of the data.
+        :return: single element list containing the scale (beta) parameter.
+        """
+        if data.total == 0:
+            return [0.0]
+        return [1/np.log1p(data.size/data.total)]
+
+    @staticmethod
+    def information(params, data):
+        """
+        Observed Fisher information of beta.
+        With u = 1/beta, the log-likelihood is n*log(1-exp(-u)) - u*sum(x), whose derivatives
+        in u are transformed to beta by the chain rule.
+
+        :param params: single element list containing the scale (beta) parameter.
+        :param data: histogram of the data.
+        :return: 1x1 information matrix.
+        """
+        beta = params[0]
+        em1 = np.expm1(1/beta)
+        d1 = data.size/em1 - data.total
+        d2 = -data.size*(em1+1)/em1**2
+        return np.array([[-(d2/beta**4 + 2*d1/beta**3)]])
 
     @staticmethod
     def get_params(params):
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+#title          : geometric.py
+#description    : Geometric distribution.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python geometric.py
+#=====================================================
+import numpy as np
+
+from core import core as co
+from core import grids
+from core import histogram as hi
+
+
+class Geometric(co.RealDistribution):
+    """
+    Geometric distribution:
+
+    Geometric(x) = p * (1-p)^x,
+
+    that is, the number of failures before the first success.
+    If the success probability is close to one, a delta distribution is used. If it is too
+    small, the distribution is approximated by a uniform distribution.
+    """
+
+    @staticmethod
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
+        """
+        Probability mass function.
+
+        :param params: single element list containing the success probability (p).
+        :param domain: domain size.
+        :param out: optional buffer of length domain+1.
+        :return: probability mass function.
+        """
+        if params[0] > 1 - co.EPSILON:
+            return co.delta.pmf([0], domain, out)
+        elif params[0] < co.EPSILON:
+            return co.uniform.pmf(None, domain, out)
+        else:
+            _pmf = Geometric.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: single element list containing the success probability (p).
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] > 1 - co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        elif params[0] < co.EPSILON:
+            return co.uniform.log_pmf(None, x, out)
+        else:
+            return np.add(np.log(params[0]), np.asarray(x, dtype=float)*np.log1p(-params[0]), out=out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
+        """
+        Returns samples with geometric distribution.
+
+        :param params: single element list containing the success probability (p).
+        :param size: number of samples.
+        :param domain: domain size for the uniform approximation.
+        :param rng: random number generator, numpy's global generator is used if not given.
+        :return: numpy array of samples.
+        """
+        if params[0] > 1 - co.EPSILON:
+            return co.delta.samples([0], size, rng=rng)
+        elif params[0] < co.EPSILON:
+            return co.uniform.samples(None, size, domain, rng=rng)
+        else:
+            _rng = np.random if rng is None else rng
+            return _rng.geometric(params[0], size) - 1
+
+    @staticmethod
+    def log_likelihood(params, data, nonzero_only=False):
+        """
+        Calculates the log-likelihood on the data.
+
+        :param params: single element list containing the success probability (p), or a
+        matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
+        :param nonzero_only: whether nonzero element should be considered only.  This is
+        used after determining the parameters and comparing to distributions that ignore
+        zero values.
+        :return: log-likelihood.
+        """
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        p = _params[:, 0]
+        ll = np.empty(len(_params))
+        delta = p > 1 - co.EPSILON
+        uniform = p < co.EPSILON
+        geometric = ~delta & ~uniform
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        ll[uniform] = co.uniform.log_likelihood(None, _data)
+        ll[geometric] = _samples.size*np.log(p[geometric]) + _samples.total*np.log1p(-p[geometric])
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def mle(data):
+        """
+        Maximum likelihood estimate of p, which is 1/(1+m) with m being the sample mean.
+
+        :param data: histogram of the data.
+        :return: single element list containing the success probability (p).
+        """
+        return [1/(1+data.mean)]
+
+    @staticmethod
+    def information(params, data):
+        """
+        Observed Fisher information of p, which is n/p^2 + sum(x)/(1-p)^2.
+
+        :param params: single element list containing the success probability (p).
+        :param data: histogram of the data.
+        :return: 1x1 information matrix.
+        """
+        return np.array([[data.size/params[0]**2 + data.total/(1-params[0])**2]])
+
+    @staticmethod
+    def get_params(params):
+        return "p = %.5f" % params[0]
+geometric = Geometric()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+#title          : gumbel.py
+#description    : Discretized Gumbel distribution.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python gumbel.py
+#=====================================================================
+import numpy as np
+from scipy import stats
+
+from core import core as co
+from core import grids
+from core import histogram as hi
+
+# Euler-Mascheroni constant.
+EULER_GAMMA = 0.5772156649015329
+
+# Standardized value above which the asymptotic form of the log-survival function is used.
+ASYMPTOTIC_TAIL = 30.0
+
+
+class Gumbel(co.RealDistribution):
+    """
+    Discretized Gumbel distribution truncated at zero:
+
+    Gumbel(x) = (F(x+1) - F(x)) / (1 - F(0)),
+
+    where F(t) = exp(-exp(-(t-mu)/beta)) is the cdf of the continuous Gumbel distribution.
+    If the scale parameter is very small, a delta distribution is used.
+    """
+
+    @staticmethod
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
+        """
+        Probability mass function.
+
+        :param params: two elements list containing the location (mu) and scale (beta)
+        parameters.
+        :param domain: domain size.
+        :param out: optional buffer of length domain+1.
+        :return: probability mass function.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.pmf([max(params[0], 0)], domain, out)
+        else:
+            _pmf = Gumbel.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: two elements list containing the location (mu) and scale (beta)
+        parameters.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.log_pmf([max(params[0], 0)], x, out)
+        else:
+            return co.log_discretized_pmf(stats.gumbel_r, x, out, _log_sf, loc=params[0], scale=params[1])
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
+        """
+        Returns samples with discretized Gumbel distribution.
+
+        :param params: two elements list containing the location (mu) and scale (beta)
+        parameters.
+        :param size: number of samples.
+        :param domain: unused.
+        :param rng: random number generator, numpy's global generator is used if not given.
+        :return: numpy array of samples.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.samples([max(params[0], 0)], size, rng=rng)
+        else:
+            return co.generate_discretized_samples(stats.gumbel_r, size, rng, loc=params[0], scale=params[1])
+
+    @staticmethod
+    def log_likelihood(params, data, nonzero_only=False):
+        """
+        Calculates the log-likelihood on the data.
+
+        :param params: two elements list containing the location (mu) and scale (beta)
+        parameters, or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
+        :param nonzero_only: whether nonzero element should be considered only.  This is
+        used after determining the parameters and comparing to distributions that ignore
+        zero values.
+        :return: log-likelihood.
+        """
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        mu = _params[:, 0]
+        beta = _params[:, 1]
+        ll = np.empty(len(_params))
+        delta = beta < co.EPSILON
+        ll[delta] = co.delta.log_likelihood([np.maximum(mu[delta], 0)], _data)
+        ll[~delta] = _samples.sum(lambda x: co.log_discretized_pmf(
+            stats.gumbel_r, x, log_sf=_log_sf, loc=mu[~delta, np.newaxis], scale=beta[~delta, np.newaxis]))
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def initial_params(data):
+        """
+        Estimates the parameters by the method of moments, the mean and variance of the
+        continuous distribution being mu+gamma*beta and (pi*beta)^2/6, where gamma is the
+        Euler-Mascheroni constant.
+
+        :param data: histogram of the data.
+        :return: two elements list containing the location (mu) and scale (beta)
+        parameters.
+        """
+        beta = max(np.sqrt(6*data.variance)/np.pi, 0.1)
+        return [data.mean+0.5-EULER_GAMMA*beta, beta]
+
+    @staticmethod
+    def get_params(params):
+        return "(mu, beta) = (%.5f, %.5f)" % (params[0], params[1])
+gumbel = Gumbel()
+
+
+def _log_sf(x, loc, scale):
+    """
+    Closed-form logarithm of the survival function of the continuous Gumbel distribution,
+    log(1 - exp(-exp(-z))) with z = (x-mu)/beta. Far in the right tail, where exp(-z)
+    underflows, the asymptotic form -z - exp(-z)/2 is used.
+
+    :param x: numpy array of values.
+    :param loc: location parameter (mu).
+    :param scale: scale parameter (beta).
+    :return: numpy array of log-survival probabilities.
+    """
+    z = (x-loc) / scale
+    with np.errstate(over='ignore'):
+        return np.where(z > ASYMPTOTIC_TAIL, -z - 0.5*np.exp(-z), np.log(-np.expm1(-np.exp(-z))))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+#title          : log_logistic.py
+#description    : Discretized log-logistic distribution.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python log_logistic.py
+#=====================================================================
+import numpy as np
+from scipy import stats
+
+from core import core as co
+from core import grids
+from core import histogram as hi
+
+
+class LogLogistic(co.RealDistribution):
+    """
+    Discretized log-logistic distribution:
+
+    LogLogistic(x) = F(x+1) - F(x),
+
+    where F(t) = 1 / (1 + (t/alpha)^(-beta)) is the cdf of the continuous log-logistic
+    distribution.
+    If the scale parameter is very small, a delta distribution is used. If the shape
+    parameter is too small, the distribution is approximated by a uniform distribution.
+    """
+
+    @staticmethod
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
+        """
+        Probability mass function.
+
+        :param params: two elements list containing the scale (alpha) and shape (beta)
+        parameters.
+        :param domain: domain size.
+        :param out: optional buffer of length domain+1.
+        :return: probability mass function.
+        """
+        if params[0] < co.EPSILON:
+            return co.delta.pmf([0], domain, out)
+        elif params[1] < co.EPSILON:
+            return co.uniform.pmf(None, domain, out)
+        else:
+            _pmf = LogLogistic.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: two elements list containing the scale (alpha) and shape (beta)
+        parameters.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        elif params[1] < co.EPSILON:
+            return co.uniform.log_pmf(None, x, out)
+        else:
+            return co.log_discretized_pmf(stats.fisk, x, out, _log_sf, c=params[1], scale=params[0])
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
+        """
+        Returns samples with discretized log-logistic distribution.
+
+        :param params: two elements list containing the scale (alpha) and shape (beta)
+        parameters.
+        :param size: number of samples.
+        :param domain: domain size for the uniform approximation.
+        :param rng: random number generator, numpy's global generator is used if not given.
+        :return: numpy array of samples.
+        """
+        if params[0] < co.EPSILON:
+            return co.delta.samples([0], size, rng=rng)
+        elif params[1] < co.EPSILON:
+            return co.uniform.samples(None, size, domain, rng=rng)
+        else:
+            return co.generate_discretized_samples(stats.fisk, size, rng, c=params[1], scale=params[0])
+
+    @staticmethod
+    def log_likelihood(params, data, nonzero_only=False):
+        """
+        Calculates the log-likelihood on the data.
+
+        :param params: two elements list containing the scale (alpha) and shape (beta)
+        parameters, or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
+        :param nonzero_only: whether nonzero element should be considered only.  This is
+        used after determining the parameters and comparing to distributions that ignore
+        zero values.
+        :return: log-likelihood.
+        """
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        alpha = _params[:, 0]
+        beta = _params[:, 1]
+        ll = np.empty(len(_params))
+        delta = alpha < co.EPSILON
+        uniform = ~delta & (beta < co.EPSILON)
+        log_logistic = ~delta & ~uniform
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        ll[uniform] = co.uniform.log_likelihood(None, _data)
+        ll[log_logistic] = _samples.sum(lambda x: co.log_discretized_pmf(
+            stats.fisk, x, log_sf=_log_sf, c=beta[log_logistic, np.newaxis], scale=alpha[log_logistic, np.newaxis]))
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def initial_params(data):
+        """
+        Estimates the parameters from the quartiles of the data, as the median of the
+        continuous distribution is alpha and the ratio of its quartiles is 9^(1/beta).
+
+        :param data: histogram of the data.
+        :return: two elements list containing the scale (alpha) and shape (beta)
+        parameters.
+        """
+        lower, median, upper = [data.quantile(q)+0.5 for q in [0.25, 0.5, 0.75]]
+        return [median, 2*np.log(3)/np.log(upper/lower) if upper > lower else 10.0]
+
+    @staticmethod
+    def get_params(params):
+        return "(alpha, beta) = (%.5f, %.5f)" % (params[0], params[1])
+log_logistic = LogLogistic()
+
+
+def _log_sf(x, c, scale):
+    """
+    Closed-form logarithm of the survival function of the continuous log-logistic
+    distribution, -log(1 + (x/alpha)^beta). Above the scale the equivalent form
+    -beta*log(x/alpha) - log(1 + (x/alpha)^(-beta)) is used, which does not overflow.
+
+    :param x: numpy array of values.
+    :param c: shape parameter (beta).
+    :param scale: scale parameter (alpha).
+    :return: numpy array of log-survival probabilities.
+    """
+    z = np.asarray(x, dtype=float) / scale
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        return np.where(z > 1, -c*np.log(z) - np.log1p(z**-c), -np.log1p(z**c))
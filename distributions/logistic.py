@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+#title          : logistic.py
+#description    : Discretized logistic distribution.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python logistic.py
+#=====================================================================
+import numpy as np
+from scipy import stats
+
+from core import core as co
+from core import grids
+from core import histogram as hi
+
+
+class Logistic(co.RealDistribution):
+    """
+    Discretized logistic distribution truncated at zero:
+
+    Logistic(x) = (F(x+1) - F(x)) / (1 - F(0)),
+
+    where F(t) = 1 / (1 + exp(-(t-mu)/s)) is the cdf of the continuous logistic
+    distribution.
+    If the scale parameter is very small, a delta distribution is used.
+    """
+
+    @staticmethod
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
+        """
+        Probability mass function.
+
+        :param params: two elements list containing the location (mu) and scale (s)
+        parameters.
+        :param domain: domain size.
+        :param out: optional buffer of length domain+1.
+        :return: probability mass function.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.pmf([max(params[0], 0)], domain, out)
+        else:
+            _pmf = Logistic.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: two elements list containing the location (mu) and scale (s)
+        parameters.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.log_pmf([max(params[0], 0)], x, out)
+        else:
+            return co.log_discretized_pmf(stats.logistic, x, out, loc=params[0], scale=params[1])
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
+        """
+        Returns samples with discretized logistic distribution.
+
+        :param params: two elements list containing the location (mu) and scale (s)
+        parameters.
+        :param size: number of samples.
+        :param domain: unused.
+        :param rng: random number generator, numpy's global generator is used if not given.
+        :return: numpy array of samples.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.samples([max(params[0], 0)], size, rng=rng)
+        else:
+            return co.generate_discretized_samples(stats.logistic, size, rng, loc=params[0], scale=params[1])
+
+    @staticmethod
+    def log_likelihood(params, data, nonzero_only=False):
+        """
+        Calculates the log-likelihood on the data.
+
+        :param params: two elements list containing the location (mu) and scale (s)
+        parameters, or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
+        :param nonzero_only: whether nonzero element should be considered only.  This is
+        used after determining the parameters and comparing to distributions that ignore
+        zero values.
+        :return: log-likelihood.
+        """
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        mu = _params[:, 0]
+        s = _params[:, 1]
+        ll = np.empty(len(_params))
+        delta = s < co.EPSILON
+        ll[delta] = co.delta.log_likelihood([np.maximum(mu[delta], 0)], _data)
+        ll[~delta] = _samples.sum(lambda x: co.log_discretized_pmf(
+            stats.logistic, x, loc=mu[~delta, np.newaxis], scale=s[~delta, np.newaxis]))
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def initial_params(data):
+        """
+        Estimates the parameters by the method of moments, the variance of the continuous
+        distribution being (pi*s)^2/3.
+
+        :param data: histogram of the data.
+        :return: two elements list containing the location (mu) and scale (s) parameters.
+        """
+        return [data.mean+0.5, max(np.sqrt(3*data.variance)/np.pi, 0.1)]
+
+    @staticmethod
+    def get_params(params):
+        return "(mu, s) = (%.5f, %.5f)" % (params[0], params[1])
+logistic = Logistic()
@@ -7,9 +7,13 @@
 #usage          : python lognormal.py
 #===================================================================
 import numpy as np
-from mpmath import exp, ln, sqrt
+from scipy import special as sp
+from scipy import stats
+from mpmath import exp
 
 from core import core as co
+from core import grids
+from core import histogram as hi
 
 
 class Lognormal(co.RealDistribution):
@@ -23,24 +27,55 @@ class Lognormal(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function at integer values.
 
         :param params: two elements list with the location (mu) and shape (sigma)
         parameters.
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[1] < co.EPSILON:
-            return co.delta.pmf([exp(params[0])], domain)
+            return co.delta.pmf([exp(params[0])], domain, out)
         else:
-            x = np.arange(1, domain+1)
-            _pmf = np.append([0.0], np.exp(-0.5*np.power((np.log(x)-params[0])/params[1], 2))/x)
-            return _pmf/np.sum(_pmf)
+            log_x = grids.log_x(domain)[1:]
+            _pmf = co.buffer(out, domain+1)
+            _pmf[0] = 0.0
+            tail = _pmf[1:]
+            np.subtract(log_x, params[0], out=tail)
+            np.divide(tail, params[1], out=tail)
+            np.square(tail, out=tail)
+            np.multiply(tail, -0.5, out=tail)
+            np.subtract(tail, log_x, out=tail)
+            np.exp(tail, out=tail)
+            return np.divide(_pmf, np.sum(_pmf), out=_pmf)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function at integer values.
+        The distribution is normalized over the default domain, and zero has no mass.
+
+        :param params: two elements list with the location (mu) and shape (sigma)
+        parameters.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[1] < co.EPSILON:
+            return co.delta.log_pmf([exp(params[0])], x, out)
+        else:
+            grid = grids.log_x(co.DEFAULT_PDF_MAX)[1:]
+            log_c = sp.logsumexp(-0.5*np.power((grid-params[0])/params[1], 2) - grid)
+            _x = np.asarray(x, dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_x = np.log(_x)
+                return co.where(_x > 0, -0.5*np.power((log_x-params[0])/params[1], 2) - log_x - log_c, -np.inf, out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with discrete log-normal distribution.
 
@@ -48,15 +83,14 @@ class Lognormal(co.RealDistribution):
         parameters.
         :param size: number of samples.
         :param domain: unused.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
-        #return np.random.lognormal(params[0], params[1], size)  # FIXME continuous sampling
         if params[1] < co.EPSILON:
-            return co.delta.samples([exp(params[0])], size)
+            return co.delta.samples([exp(params[0])], size, rng=rng)
         else:
-            x = np.arange(1, domain+1)
-            p = np.exp(-0.5*np.power((np.log(x)-params[0])/params[1], 2))/x
-            return co.generate_discrete_samples(x, p, size)
+            return co.generate_rejection_samples(stats.lognorm(params[1], scale=np.exp(params[0])),
+                                                 np.exp(params[0]-params[1]**2), size, rng)
 
     @staticmethod
     def log_likelihood(params, data, nonzero_only=False):
@@ -64,8 +98,8 @@ class Lognormal(co.RealDistribution):
         Calculates the log-likelihood on the data.
 
         :param params: two elements list with the location (mu) and shape (sigma)
-        parameters.
-        :param data: input data as a numpy array.
+        parameters, or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero_only: unused.
         :return: log-likelihood.
         """
@@ -83,15 +117,22 @@ class Lognormal(co.RealDistribution):
                 - np.sum(np.power(np.log(nonzero_samples)-params[0], 2))/(2*params[1]**2)\
                 - len(data)*ln(params[1]*sqrt(2*np.pi))
         """  # FIXME continuous log-likelihood
-        nonzero_samples = data[np.where(data > 0)]
-        if params[0] < co.EPSILON or params[1] < co.EPSILON:
-            return co.delta.log_likelihood([0], data)
-        else:
-            x = np.arange(1, co.DEFAULT_PDF_MAX+1)
-            c = np.sum(np.exp(-0.5*np.power((np.log(x)-params[0])/params[1], 2))/x)
-            return -np.sum(np.log(nonzero_samples))\
-                - np.sum(np.power(np.log(nonzero_samples)-params[0], 2))/(2*params[1]**2)\
-                - len(data)*ln(c)
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        nonzero_samples = _data.nonzero()
+        ll = np.empty(len(_params))
+        delta = (_params[:, 0] < co.EPSILON) | (_params[:, 1] < co.EPSILON)
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        mu = _params[~delta, 0:1]
+        sigma = _params[~delta, 1:2]
+        log_x = grids.log_x(co.DEFAULT_PDF_MAX)[1:]
+        c = co.batch_apply(
+            lambda p: np.sum(np.exp(-0.5*np.power((log_x-p[:, 0:1])/p[:, 1:2], 2) - log_x), axis=1),
+            _params[~delta])
+        ll[~delta] = -nonzero_samples.log_total\
+            - nonzero_samples.sum(lambda x: np.power(np.log(x)-mu, 2))/(2*sigma[:, 0]**2)\
+            - _data.size*np.log(c)
+        return co.unbatch(ll, single)
 
     @staticmethod
     def get_params(params):
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+#title          : negative_binomial.py
+#description    : Negative binomial distribution.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python negative_binomial.py
+#=====================================================================
+import numpy as np
+from scipy import special as sp
+
+from core import core as co
+from core import grids
+from core import histogram as hi
+
+
+class NegativeBinomial(co.RealDistribution):
+    """
+    Negative binomial distribution:
+
+    NegativeBinomial(x) = Gamma(x+r) / (Gamma(r) * x!) * p^r * (1-p)^x.
+
+    If the number of successes is very small or the success probability is close to one, a
+    delta distribution is used. If the success probability is too small, the distribution
+    is approximated by a uniform distribution.
+    """
+
+    @staticmethod
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
+        """
+        Probability mass function.
+
+        :param params: two elements list containing the number of successes (r) and the
+        success probability (p).
+        :param domain: domain size.
+        :param out: optional buffer of length domain+1.
+        :return: probability mass function.
+        """
+        if params[0] < co.EPSILON or params[1] > 1 - co.EPSILON:
+            return co.delta.pmf([0], domain, out)
+        elif params[1] < co.EPSILON:
+            return co.uniform.pmf(None, domain, out)
+        else:
+            _pmf = NegativeBinomial.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: two elements list containing the number of successes (r) and the
+        success probability (p).
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON or params[1] > 1 - co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        elif params[1] < co.EPSILON:
+            return co.uniform.log_pmf(None, x, out)
+        else:
+            _x = np.asarray(x, dtype=float)
+            return np.add(sp.gammaln(_x+params[0]) - sp.gammaln(params[0]) - grids.log_factorial_of(_x),
+                          params[0]*np.log(params[1]) + _x*np.log1p(-params[1]), out=out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
+        """
+        Returns samples with negative binomial distribution.
+
+        :param params: two elements list containing the number of successes (r) and the
+        success probability (p).
+        :param size: number of samples.
+        :param domain: domain size for the uniform approximation.
+        :param rng: random number generator, numpy's global generator is used if not given.
+        :return: numpy array of samples.
+        """
+        if params[0] < co.EPSILON or params[1] > 1 - co.EPSILON:
+            return co.delta.samples([0], size, rng=rng)
+        elif params[1] < co.EPSILON:
+            return co.uniform.samples(None, size, domain, rng=rng)
+        else:
+            _rng = np.random if rng is None else rng
+            return _rng.negative_binomial(params[0], params[1], size)
+
+    @staticmethod
+    def log_likelihood(params, data, nonzero_only=False):
+        """
+        Calculates the log-likelihood on the data.
+        Only the term log(Gamma(x+r)) is evaluated over the data, the rest is calculated
+        from the sample size and sum, and the factorials are independent of the parameters.
+
+        :param params: two elements list containing the number of successes (r) and the
+        success probability (p), or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
+        :param nonzero_only: whether nonzero element should be considered only.  This is
+        used after determining the parameters and comparing to distributions that ignore
+        zero values.
+        :return: log-likelihood.
+        """
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        r = _params[:, 0]
+        p = _params[:, 1]
+        ll = np.empty(len(_params))
+        delta = (r < co.EPSILON) | (p > 1 - co.EPSILON)
+        uniform = ~delta & (p < co.EPSILON)
+        negative_binomial = ~delta & ~uniform
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        ll[uniform] = co.uniform.log_likelihood(None, _data)
+        r = r[negative_binomial]
+        p = p[negative_binomial]
+        ll[negative_binomial] = _samples.sum(lambda x: sp.gammaln(x+r[:, np.newaxis]))\
+            - _samples.size*sp.gammaln(r) - _samples.log_factorial_total\
+            + _samples.size*r*np.log(p) + _samples.total*np.log1p(-p)
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def initial_params(data):
+        """
+        Estimates the parameters by the method of moments, that is p = m/v and
+        r = m^2/(v-m), where m and v are the sample mean and variance. For under-dispersed
+        samples a large r is used. The success probability is kept above 10*EPSILON, with r
+        adjusted to keep the mean, so that strongly over-dispersed samples do not start the
+        fit in the flat uniform approximation.
+
+        :param data: histogram of the data.
+        :return: two elements list containing the number of successes (r) and the success
+        probability (p).
+        """
+        if data.variance > data.mean > 0:
+            p = data.mean/data.variance
+        else:
+            p = 100.0/(100.0+data.mean)
+        p = max(p, 10*co.EPSILON)
+        return [data.mean*p/(1-p) if p < 1 else 100.0, p]
+
+    @staticmethod
+    def get_params(params):
+        return "(r, p) = (%.5f, %.5f)" % (params[0], params[1])
+negative_binomial = NegativeBinomial()
@@ -7,9 +7,11 @@
 #usage          : python normal.py
 #===================================================================
 import numpy as np
-from mpmath import ln
+from scipy import special as sp
 
 from core import core as co
+from core import grids
+from core import histogram as hi
 
 
 class Normal(co.RealDistribution):
@@ -25,26 +27,51 @@ class Normal(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function at integer values.
 
         :param params: two elements list with the location (mu) and shape (sigma)
         parameters.
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[0] < co.EPSILON:
-            return co.delta.pmf([0], domain)
+            return co.delta.pmf([0], domain, out)
         elif params[1] < co.EPSILON:
-            return co.delta.pmf([params[0]], domain)
+            return co.delta.pmf([params[0]], domain, out)
         else:
-            x = np.arange(0, domain+1)
-            _pmf = np.exp(-0.5*np.power((x-params[0])/params[1], 2))
-            return _pmf/np.sum(_pmf)
+            _pmf = np.subtract(grids.x(domain), params[0], out=co.buffer(out, domain+1))
+            np.divide(_pmf, params[1], out=_pmf)
+            np.square(_pmf, out=_pmf)
+            np.multiply(_pmf, -0.5, out=_pmf)
+            np.exp(_pmf, out=_pmf)
+            return np.divide(_pmf, np.sum(_pmf), out=_pmf)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function at integer values.
+        The distribution is normalized over the default domain.
+
+        :param params: two elements list with the location (mu) and shape (sigma)
+        parameters.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        elif params[1] < co.EPSILON:
+            return co.delta.log_pmf([params[0]], x, out)
+        else:
+            grid = grids.x(co.DEFAULT_PDF_MAX)
+            log_c = sp.logsumexp(-0.5*np.power((grid-params[0])/params[1], 2))
+            return np.subtract(-0.5*np.power((np.asarray(x, dtype=float)-params[0])/params[1], 2), log_c, out=out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with discrete normal distribution.
 
@@ -52,16 +79,17 @@ class Normal(co.RealDistribution):
         parameters.
         :param size: number of samples.
         :param domain: unused.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
         if params[0] < co.EPSILON:
-            return co.delta.samples([0], size, domain)
+            return co.delta.samples([0], size, domain, rng=rng)
         elif params[1] < co.EPSILON:
-            return co.delta.samples([params[0]], domain)
+            return co.delta.samples([params[0]], domain, rng=rng)
         else:
-            x = np.arange(0, domain+1)
+            x = grids.x(domain)
             p = np.exp(-0.5*np.power((x-params[0])/params[1], 2))
-            return co.generate_discrete_samples(x, p, size)
+            return co.generate_discrete_samples(x, p, size, rng)
 
     @staticmethod
     def log_likelihood(params, data, nonzero_only=False):
@@ -69,26 +97,31 @@ class Normal(co.RealDistribution):
         Calculates the log-likelihood on the data.
 
         :param params: two elements list with the location (mu) and shape (sigma)
-        parameters.
-        :param data: input data as a numpy array.
+        parameters, or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero_only: whether nonzero element should be considered only.  This is
         used after determining the parameters and comparing to distributions that ignore
         zero values.
         :return: log-likelihood.
         """
-        if params[0] < co.EPSILON:
-            return co.delta.log_likelihood([0], data)
-        elif params[1] < co.EPSILON:
-            return co.delta.log_likelihood([params[0]], data)
-        else:
-            if nonzero_only:
-                _samples = data[np.where(data > 0)]
-            else:
-                _samples = data
-            x = np.arange(0, co.DEFAULT_PDF_MAX+1)
-            c = np.sum(np.exp(-0.5*np.power((x-params[0])/params[1], 2)))
-            return - np.sum(np.power(_samples-params[0], 2))/(2*params[1]**2)\
-                - len(_samples)*ln(c)
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        mu = _params[:, 0]
+        sigma = _params[:, 1]
+        ll = np.empty(len(_params))
+        delta_zero = mu < co.EPSILON
+        delta_mu = ~delta_zero & (sigma < co.EPSILON)
+        normal = ~delta_zero & ~delta_mu
+        ll[delta_zero] = co.delta.log_likelihood([0], _data)
+        ll[delta_mu] = co.delta.log_likelihood([mu[delta_mu]], _data)
+        x = grids.x(co.DEFAULT_PDF_MAX)
+        c = co.batch_apply(
+            lambda p: np.sum(np.exp(-0.5*np.power((x-p[:, 0:1])/p[:, 1:2], 2)), axis=1),
+            _params[normal])
+        ll[normal] = - _samples.sum(lambda y: np.power(y-mu[normal, np.newaxis], 2))/(2*sigma[normal]**2)\
+            - _samples.size*np.log(c)
+        return co.unbatch(ll, single)
 
     @staticmethod
     def get_params(params):
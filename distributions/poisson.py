@@ -7,11 +7,10 @@
 #usage          : python poisson.py
 #=====================================================
 import numpy as np
-from scipy import special as sp
-from scipy import stats
-from mpmath import ln
 
 from core import core as co
+from core import grids
+from core import histogram as hi
 
 
 class Poisson(co.RealDistribution):
@@ -24,59 +23,99 @@ class Poisson(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function.
 
         :param params: a one element list containing the shape (lambda) parameter.
         :param domain: maximum of the domain.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[0] < co.EPSILON:
-            return co.delta.pmf([0], domain)
+            return co.delta.pmf([0], domain, out)
         else:
-            return stats.poisson.pmf(np.arange(0, domain+1), params[0])
+            _pmf = Poisson.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: a one element list containing the shape (lambda) parameter.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        else:
+            _x = np.asarray(x, dtype=float)
+            return np.subtract(_x*np.log(params[0]) - params[0], grids.log_factorial_of(_x), out=out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with Poisson distribution.
 
         :param params: a one element list containing the shape (lambda) parameter.
         :param size: number of samples.
         :param domain: unused.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: samples.
         """
         if params[0] < co.EPSILON:
-            return co.delta.samples([0], size)
+            return co.delta.samples([0], size, rng=rng)
         else:
-            return np.random.poisson(params[0], size)
+            _rng = np.random if rng is None else rng
+            return _rng.poisson(params[0], size)
 
     @staticmethod
     def log_likelihood(params, data, nonzero_only=False):
         """
         Calculates the log-likelihood on the data.
-        The factorial is approximated by using Stirling's formula.
+        The log-factorial term does not depend on lambda, it is calculated exactly once
+        per sample and cached along with the sum of the sample.
 
-        :param params: a one element list containing the shape (lambda) parameter.
-        :param data: input data as a numpy array.
+        :param params: a one element list containing the shape (lambda) parameter, or a
+        matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero_only: whether nonzero element should be considered only.  This is
         used after determining the parameters and comparing to distributions that ignore
         zero values.
         :return: log-likelihood.
         """
-        nonzero_samples = data[np.where(data > 0)]
-        if params[0] < co.EPSILON:
-            return co.delta.log_likelihood([0], data)
-        else:
-            if nonzero_only:
-                _sampes = data[np.where(data > 0)]
-            else:
-                _sampes = data
-            return np.sum(_sampes)*ln(params[0])\
-                - len(_sampes)*params[0]\
-                - 0.5*len(_sampes)*ln(2*np.pi) - np.sum((0.5+nonzero_samples)*np.log(nonzero_samples)-nonzero_samples)\
-                - np.sum(np.log(1+1/(12*nonzero_samples)+1/(288*np.power(nonzero_samples, 2))))
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        lam = _params[:, 0]
+        ll = np.empty(len(_params))
+        delta = lam < co.EPSILON
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        ll[~delta] = _samples.total*np.log(lam[~delta]) - _samples.size*lam[~delta] - _samples.log_factorial_total
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def mle(data):
+        """
+        Maximum likelihood estimate of lambda, which is the sample mean.
+
+        :param data: histogram of the data.
+        :return: a one element list containing the shape (lambda) parameter.
+        """
+        return [data.total/data.size]
+
+    @staticmethod
+    def information(params, data):
+        """
+        Observed Fisher information of lambda, which is sum(x)/lambda^2.
+
+        :param params: a one element list containing the shape (lambda) parameter.
+        :param data: histogram of the data.
+        :return: 1x1 information matrix.
+        """
+        return np.array([[data.total/params[0]**2]])
 
     @staticmethod
     def get_params(params):
@@ -7,9 +7,12 @@
 #usage          : python shifted_power_law.py
 #=====================================================================
 import numpy as np
-from mpmath import ln, zeta
+from scipy import special as sp
+from mpmath import zeta, im
 
 from core import core as co
+from core import grids
+from core import histogram as hi
 
 
 class ShiftedPowerLaw(co.RealDistribution):
@@ -25,78 +28,145 @@ class ShiftedPowerLaw(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function.
 
         :param params: two elements list containing the exponent (gamma) and shift (x0).
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[0] < co.EPSILON:
             if params[1] < co.EPSILON:
-                return co.delta.pmf([0], domain)
+                return co.delta.pmf([0], domain, out)
             else:
-                return co.uniform.pmf(None, domain)
+                return co.uniform.pmf(None, domain, out)
         else:
-            c = float(zeta(params[0], params[1]))
+            c = _normalizer(np.array([params[0]]), np.array([params[1]]))[0]
             if c < co.EPSILON:
-                return co.delta.pmf([0], domain)
+                return co.delta.pmf([0], domain, out)
             else:
-                return np.power(np.arange(0, domain+1)+params[1], -params[0])/c
+                _pmf = np.add(grids.x(domain), params[1], out=co.buffer(out, domain+1))
+                np.power(_pmf, -params[0], out=_pmf)
+                return np.divide(_pmf, c, out=_pmf)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: two elements list containing the exponent (gamma) and shift (x0).
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            if params[1] < co.EPSILON:
+                return co.delta.log_pmf([0], x, out)
+            else:
+                return co.uniform.log_pmf(None, x, out)
+        else:
+            c = _normalizer(np.array([params[0]]), np.array([params[1]]))[0]
+            if c < co.EPSILON:
+                return co.delta.log_pmf([0], x, out)
+            else:
+                return np.subtract(-params[0]*np.log(np.asarray(x, dtype=float)+params[1]), np.log(c), out=out)
+
+    @staticmethod
+    def log_sf(params, x):
+        """
+        Logarithm of the survival function, P(X >= x) = zeta(gamma, x + x0) / zeta(gamma, x0).
+        The approximating delta and uniform distributions are not used for tail fits,
+        therefore their tail is considered empty.
+
+        :param params: two elements list containing the exponent (gamma) and shift (x0).
+        :param x: lower bound of the tail.
+        :return: log-probability of the tail.
+        """
+        if params[0] < co.EPSILON:
+            return -np.inf
+        c = _normalizer(np.array([params[0], params[0]]), np.array([params[1], x+params[1]]))
+        if c[0] < co.EPSILON or c[1] <= 0:
+            return -np.inf
+        return float(np.log(c[1]) - np.log(c[0]))
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with discrete shifted power-law.
 
         :param params: two elements list containing the exponent (gamma) and shift (x0).
         :param size: number of samples.
         :param domain: domain size.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
         if params[0] < co.EPSILON:
             if params[1] < co.EPSILON:
-                return co.delta.samples([0], size)
+                return co.delta.samples([0], size, rng=rng)
             else:
-                return co.uniform.samples(None, size)
+                return co.uniform.samples(None, size, rng=rng)
         else:
-            if float(zeta(params[0], params[1])) < co.EPSILON:
-                return co.delta.samples([0], size)
+            if _normalizer(np.array([params[0]]), np.array([params[1]]))[0] < co.EPSILON:
+                return co.delta.samples([0], size, rng=rng)
             else:
-                x = np.arange(0, co.DEFAULT_SAMPLE_MAX+1)
-                return co.generate_discrete_samples(x, np.power(x+params[1], -params[0]), size)
+                x = grids.x(co.DEFAULT_SAMPLE_MAX)
+                return co.generate_discrete_samples(x, np.power(x+params[1], -params[0]), size, rng)
 
     @staticmethod
     def log_likelihood(params, data, nonzero_only=False):
         """
         Calculates the log-likelihood on the data.
 
-        :param params: two elements list containing the exponent (gamma) and shift (x0).
-        :param data: input data as a numpy array.
+        :param params: two elements list containing the exponent (gamma) and shift (x0), or
+        a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero_only:  whether nonzero element should be considered only.  This is
         used after determining the parameters  and comparing to distributions that ignore
         zero values.
         :return: log-likelihood.
         """
-        if params[0] < co.EPSILON:
-            if params[1] < co.EPSILON:
-                return co.delta.log_likelihood([0], data)
-            else:
-                return co.uniform.log_likelihood(None, data)
-        else:
-            c = float(zeta(params[0], params[1]))
-            if c < co.EPSILON:
-                return co.delta.log_likelihood([0], data)
-            else:
-                if nonzero_only:
-                    _samples = data[np.where(data > 0)]
-                else:
-                    _samples = data
-                return -params[0]*np.sum(np.log(_samples+params[1])) - len(_samples)*ln(c)
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        _samples = _data.nonzero() if nonzero_only else _data
+        gamma = _params[:, 0]
+        x0 = _params[:, 1]
+        c = np.zeros(len(_params))
+        power_law = gamma >= co.EPSILON
+        c[power_law] = _normalizer(gamma[power_law], x0[power_law])
+        uniform = ~power_law & (x0 >= co.EPSILON)
+        delta = ~power_law & ~uniform | power_law & (c < co.EPSILON)
+        power_law &= ~delta
+        ll = np.empty(len(_params))
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        ll[uniform] = co.uniform.log_likelihood(None, _data)
+        with np.errstate(invalid='ignore'):
+            ll[power_law] = -gamma[power_law]*_samples.sum(lambda x: np.log(x+x0[power_law, np.newaxis]))\
+                - _samples.size*np.log(c[power_law])
+        return co.unbatch(ll, single)
 
     @staticmethod
     def get_params(params):
         return "(gamma, x0) = (%.5f, %.5f)" % (params[0], params[1])
 shifted_power_law = ShiftedPowerLaw()
 
+
+def _normalizer(gamma, x0):
+    """
+    Calculates the Hurwitz zeta function for arrays of exponents and shifts.
+    The vectorized scipy implementation is used where it is defined, and the analytic
+    continuation of mpmath elsewhere. Complex values of the continuation, e.g., for
+    negative shifts, are returned as NaN.
+
+    :param gamma: numpy array of exponents.
+    :param x0: numpy array of shifts.
+    :return: numpy array of the normalizing constants.
+    """
+    c = np.empty(len(gamma))
+    fast = (gamma > 1) & (x0 > 0)
+    c[fast] = sp.zeta(gamma[fast], x0[fast])
+    values = [zeta(g, s) for g, s in zip(gamma[~fast], x0[~fast])]
+    c[~fast] = [float(v) if im(v) == 0 else np.nan for v in values]
+    return c
+
@@ -7,9 +7,26 @@
 #usage          : python truncated_power_law.py
 #=====================================================================
 import numpy as np
-from mpmath import ln, exp, polylog
+from functools import lru_cache
+from mpmath import exp, polylog, lerchphi
 
 from core import core as co
+from core import grids
+from core import histogram as hi
+from core import tables
+
+# Number of normalizing constants kept in memory.
+NORMALIZER_CACHE_SIZE = 1024
+
+# Name of the lookup table of the logarithm of the normalizing constant.
+NORMALIZER_TABLE = 'truncated-power-law'
+
+# Grid of the lookup table over the exponent and the logarithm of the cutoff.
+NORMALIZER_TABLE_AXES = [(0.01, 5.0, 161), (float(np.log(0.5)), float(np.log(1e5)), 161)]
+
+# Relative mass of the tail below which it is calculated directly by the Lerch transcendent
+# instead of subtracting the head from the normalizing constant.
+LERCH_THRESHOLD = 1e-8
 
 
 class TruncatedPowerLaw(co.RealDistribution):
@@ -25,29 +42,89 @@ class TruncatedPowerLaw(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function.
 
         :param params: two elements list containing the exponent (gamma) and cutoff
         (kappa).
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[0] < co.EPSILON:
-            return co.uniform.pmf(None, domain)
+            return co.uniform.pmf(None, domain, out)
+        elif params[1] < co.EPSILON:
+            return co.delta.pmf([1], domain, out)
+        else:
+            c = _single_normalizer(params[0], params[1])
+            if c < co.EPSILON:
+                return co.delta.pmf([1], domain, out)
+            else:
+                _pmf = co.buffer(out, domain+1)
+                _pmf[0] = 0.0
+                tail = _pmf[1:]
+                np.multiply(grids.log_x(domain)[1:], -params[0], out=tail)
+                tail -= grids.x(domain)[1:]/params[1]
+                tail -= np.log(c)
+                np.exp(tail, out=tail)
+                return _pmf
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: two elements list containing the exponent (gamma) and cutoff
+        (kappa).
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            return co.uniform.log_pmf(None, x, out)
         elif params[1] < co.EPSILON:
-            return co.delta.pmf([1], domain)
+            return co.delta.log_pmf([1], x, out)
         else:
-            c = polylog(params[0], exp(-1/params[1]))
+            c = _single_normalizer(params[0], params[1])
             if c < co.EPSILON:
-                return co.delta.pmf([1], domain)
+                return co.delta.log_pmf([1], x, out)
             else:
-                x = np.arange(1, domain+1)
-                return np.append([0.0], np.power(x, -params[0])*np.exp(-x/params[1])/c)
+                _x = np.asarray(x, dtype=float)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    log_x = np.log(_x)
+                    return co.where(_x > 0, -params[0]*log_x - _x/params[1] - np.log(c), -np.inf, out)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def log_sf(params, x):
+        """
+        Logarithm of the survival function, P(X >= x).
+        The tail sum is the normalizing constant minus the sum over the head, unless the
+        tail is too light for the subtraction to be precise, where the tail sum is given by
+        exp(-x/kappa) * Phi(exp(-1/kappa), gamma, x), with Phi being the Lerch transcendent.
+        The head sum depends on the parameters, therefore every call costs O(x).
+        The approximating delta and uniform distributions are not used for tail fits,
+        therefore their tail is considered empty.
+
+        :param params: two elements list containing the exponent (gamma) and cutoff
+        (kappa).
+        :param x: lower bound of the tail.
+        :return: log-probability of the tail.
+        """
+        if params[0] < co.EPSILON or params[1] < co.EPSILON:
+            return -np.inf
+        c = _normalizer(float(params[0]), float(params[1]))
+        if c < co.EPSILON:
+            return -np.inf
+        _x = max(int(x), 1)
+        head = grids.x(_x-1)[1:]
+        tail = c - np.sum(np.power(head, -params[0])*np.exp(-head/params[1]))
+        if tail < LERCH_THRESHOLD*c:
+            tail = float(exp(-_x/params[1])*lerchphi(exp(-1/params[1]), params[0], _x))
+        return float(np.log(tail) - np.log(c)) if tail > 0 else -np.inf
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with discrete truncated power-law.
 
@@ -55,18 +132,19 @@ class TruncatedPowerLaw(co.RealDistribution):
         (kappa).
         :param size: number of samples.
         :param domain: domain size.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
         if params[0] < co.EPSILON:
-            return co.uniform.samples(None, size)
+            return co.uniform.samples(None, size, rng=rng)
         elif params[1] < co.EPSILON:
-            return co.delta.samples([1], size)
+            return co.delta.samples([1], size, rng=rng)
         else:
-            if polylog(params[0], exp(-1/params[1])) < co.EPSILON:
-                return co.delta.samples([1], size)
+            if _single_normalizer(params[0], params[1]) < co.EPSILON:
+                return co.delta.samples([1], size, rng=rng)
             else:
-                x = np.arange(1, domain+1)
-                return co.generate_discrete_samples(x, np.power(x, -params[0])*np.exp(-x/params[1]), size)
+                x = grids.x(domain)[1:]
+                return co.generate_discrete_samples(x, np.power(x, -params[0])*np.exp(-x/params[1]), size, rng)
 
     @staticmethod
     def log_likelihood(params, data, nonzero=False):
@@ -74,26 +152,87 @@ class TruncatedPowerLaw(co.RealDistribution):
         Calculates the log-likelihood of the discrete truncated power-law on the data.
 
         :param params: two elements list containing the exponent (gamma) and cutoff
-        (kappa).
-        :param data: input data as a numpy array.
+        (kappa), or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero: unused.
         :return: log-likelihood.
         """
-        nonzero_samples = data[np.where(data > 0)]
-        if params[0] < co.EPSILON:
-            return co.uniform.log_likelihood(None, data)
-        elif params[1] < co.EPSILON:
-            return co.delta.log_likelihood([1], data)
-        else:
-            c = polylog(params[0], exp(-1/params[1]))
-            if c < co.EPSILON:
-                return co.delta.log_likelihood([1], data)
-            else:
-                return -params[0]*np.sum(np.log(nonzero_samples))\
-                       - np.sum(data)/params[1]\
-                       - len(data)*ln(c)
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        gamma = _params[:, 0]
+        kappa = _params[:, 1]
+        uniform = gamma < co.EPSILON
+        c = np.zeros(len(_params))
+        power_law = ~uniform & (kappa >= co.EPSILON)
+        c[power_law] = _normalizers(gamma[power_law], kappa[power_law])
+        delta = ~uniform & (c < co.EPSILON)
+        power_law &= ~delta
+        ll = np.empty(len(_params))
+        ll[uniform] = co.uniform.log_likelihood(None, _data)
+        ll[delta] = co.delta.log_likelihood([1], _data)
+        ll[power_law] = -gamma[power_law]*_data.log_total\
+            - _data.total/kappa[power_law]\
+            - _data.size*np.log(c[power_law])
+        return co.unbatch(ll, single)
 
     @staticmethod
     def get_params(params):
         return "(gamma, kappa) = (%.5f, %.5f)" % (params[0], params[1])
 truncated_power_law = TruncatedPowerLaw()
+
+
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
+def _normalizer(gamma, kappa):
+    """
+    Calculates the polylogarithm normalizing the distribution.
+    Results are cached as the log-likelihood and the survival function of a tail fit are
+    evaluated at the same parameters.
+
+    :param gamma: exponent.
+    :param kappa: cutoff.
+    :return: normalizing constant.
+    """
+    return float(polylog(gamma, exp(-1/kappa)))
+
+
+def _log_normalizer(gamma, log_kappa):
+    """
+    Calculates the logarithm of the normalizing constant exactly, as tabulated.
+
+    :param gamma: exponent.
+    :param log_kappa: logarithm of the cutoff.
+    :return: logarithm of the normalizing constant.
+    """
+    return float(np.log(_normalizer(float(gamma), float(np.exp(log_kappa)))))
+
+
+tables.register(NORMALIZER_TABLE, _log_normalizer, NORMALIZER_TABLE_AXES)
+
+
+def _normalizers(gamma, kappa):
+    """
+    Calculates the normalizing constants for arrays of exponents and cutoffs. Constants
+    are interpolated from the lookup table if it is available, and calculated exactly
+    outside the table or where the table is not within tolerance.
+
+    :param gamma: numpy array of exponents.
+    :param kappa: numpy array of cutoffs.
+    :return: numpy array of normalizing constants.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = np.exp(tables.lookup(NORMALIZER_TABLE, gamma, np.log(kappa)))
+    exact = np.isnan(c)
+    c[exact] = [_normalizer(g, k) for g, k in zip(gamma[exact], kappa[exact])]
+    return c
+
+
+def _single_normalizer(gamma, kappa):
+    """
+    Calculates the normalizing constant for a single exponent and cutoff, interpolated from
+    the lookup table if it is available.
+
+    :param gamma: exponent.
+    :param kappa: cutoff.
+    :return: normalizing constant.
+    """
+    return float(_normalizers(np.array([gamma], dtype=float), np.array([kappa], dtype=float))[0])
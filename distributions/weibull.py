@@ -7,9 +7,12 @@
 #usage          : python weibull.py
 #===================================================================
 import numpy as np
-from mpmath import ln
+from scipy import special as sp
+from scipy import stats
 
 from core import core as co
+from core import grids
+from core import histogram as hi
 
 
 class Weibull(co.RealDistribution):
@@ -21,46 +24,78 @@ class Weibull(co.RealDistribution):
     """
 
     @staticmethod
-    def pmf(params, domain=co.DEFAULT_PDF_MAX):
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
         """
         Probability mass function at integer values.
 
         :param params: two elements list containing the shape (k) and scale (lambda)
         parameters.
         :param domain: domain size.
+        :param out: optional buffer of length domain+1.
         :return: probability mass function.
         """
         if params[0] < co.EPSILON or params[1] < co.EPSILON:
-            return co.delta.pmf([0], domain)
+            return co.delta.pmf([0], domain, out)
         else:
-            if 0 <= params[0] - 1 < co.EPSILON:
-                x = np.arange(1, domain+1)
-                _pmf = np.append([1/params[1]], np.power(x, params[0]-1)*np.exp(-np.power(x/params[1], params[0])))
-            else:
-                x = np.arange(1, domain+1)
-                _pmf = np.append([0.0], np.power(x, params[0]-1)*np.exp(-np.power(x/params[1], params[0])))
-            return _pmf/np.sum(_pmf)
+            _pmf = co.buffer(out, domain+1)
+            _pmf[0] = 1/params[1] if 0 <= params[0] - 1 < co.EPSILON else 0.0
+            tail = _pmf[1:]
+            np.multiply(grids.log_x(domain)[1:], params[0]-1, out=tail)
+            tail -= np.power(grids.x(domain)[1:]/params[1], params[0])
+            np.exp(tail, out=tail)
+            return np.divide(_pmf, np.sum(_pmf), out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function at integer values.
+        The distribution is normalized over the default domain.
+
+        :param params: two elements list containing the shape (k) and scale (lambda)
+        parameters.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON or params[1] < co.EPSILON:
+            return co.delta.log_pmf([0], x, out)
+        else:
+            grid = grids.x(co.DEFAULT_PDF_MAX)[1:]
+            log_terms = (params[0]-1)*grids.log_x(co.DEFAULT_PDF_MAX)[1:] - np.power(grid/params[1], params[0])
+            log_zero = -np.log(params[1]) if 0 <= params[0] - 1 < co.EPSILON else -np.inf
+            log_c = sp.logsumexp(np.append([log_zero], log_terms))
+            _x = np.asarray(x, dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_x = np.log(_x)
+                return co.where(_x > 0,
+                                (params[0]-1)*log_x - np.power(_x/params[1], params[0]) - log_c,
+                                log_zero - log_c, out)
 
     @staticmethod
-    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX):
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
         """
         Returns samples with discrete Weibull distribution.
 
+        Samples are generated from the continuous Weibull distribution with rejection, except
+        for the k = 1 case, which has a finite mass at zero and is sampled over the domain.
+
         :param params: two elements list containing the shape (k) and scale (lambda)
         parameters.
         :param size: number of samples.
-        :param domain: domain size.
+        :param domain: domain size for the k = 1 case.
+        :param rng: random number generator, numpy's global generator is used if not given.
         :return: numpy array of samples.
         """
         if params[0] < co.EPSILON or params[1] < co.EPSILON:
-            return co.delta.samples([0], size)
+            return co.delta.samples([0], size, rng=rng)
         else:
-            x = np.arange(1, domain+1)
-            p = np.power(x, params[0]-1)*np.exp(-np.power(x/params[1], params[0]))
             if 0 <= params[0] - 1 < co.EPSILON:
-                return co.generate_discrete_samples(np.append([0], x), np.append([1/params[1]], p), size)
+                x = grids.x(domain)[1:]
+                p = np.power(x, params[0]-1)*np.exp(-np.power(x/params[1], params[0]))
+                return co.generate_discrete_samples(np.append([0], x), np.append([1/params[1]], p), size, rng)
             else:
-                return co.generate_discrete_samples(x, p, size)
+                mode = params[1]*np.power((params[0]-1)/params[0], 1/params[0]) if params[0] > 1 else 0.0
+                return co.generate_rejection_samples(stats.weibull_min(params[0], scale=params[1]), mode, size, rng)
 
     @staticmethod
     def log_likelihood(params, data, nonzero=False):
@@ -68,20 +103,27 @@ class Weibull(co.RealDistribution):
         Calculates the log-likelihood of the Weibull distribution on the data.
 
         :param params: two elements list containing the shape (k) and scale (lambda)
-        parameters.
-        :param data: input data as a numpy array.
+        parameters, or a matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
         :param nonzero: unused.
         :return: log-likelihood.
         """
-        nonzero_samples = data[np.where(data > 0)]
-        if params[0] < co.EPSILON or params[1] < co.EPSILON:
-            return co.delta.log_likelihood([0], data)
-        else:
-            x = np.arange(1, co.DEFAULT_PDF_MAX+1)
-            c = np.sum(np.power(x, params[0]-1)*np.exp(-np.power(x/params[1], params[0])))
-            return (params[0]-1) * np.sum(np.log(nonzero_samples))\
-                - 1/params[1]**params[0] * np.sum(np.power(data, params[0]))\
-                - len(data) * ln(c)
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        ll = np.empty(len(_params))
+        delta = (_params[:, 0] < co.EPSILON) | (_params[:, 1] < co.EPSILON)
+        ll[delta] = co.delta.log_likelihood([0], _data)
+        k = _params[~delta, 0]
+        lam = _params[~delta, 1]
+        x = grids.x(co.DEFAULT_PDF_MAX)[1:]
+        log_x = grids.log_x(co.DEFAULT_PDF_MAX)[1:]
+        c = co.batch_apply(
+            lambda p: np.sum(np.exp((p[:, 0:1]-1)*log_x - np.power(x/p[:, 1:2], p[:, 0:1])), axis=1),
+            _params[~delta])
+        ll[~delta] = (k-1) * _data.log_total\
+            - 1/lam**k * _data.sum(lambda y: np.power(y, k[:, np.newaxis]))\
+            - _data.size * np.log(c)
+        return co.unbatch(ll, single)
 
     @staticmethod
     def get_params(params):
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+#title          : yule_simon.py
+#description    : Yule-Simon distribution.
+#author         : Enys Mones
+#date           : 2026.10.18
+#version        : 0.1
+#usage          : python yule_simon.py
+#=====================================================================
+import numpy as np
+from scipy import special as sp
+from scipy import stats
+
+from core import core as co
+from core import grids
+from core import histogram as hi
+
+
+class YuleSimon(co.RealDistribution):
+    """
+    Yule-Simon distribution:
+
+    YuleSimon(x) = rho * B(x, rho+1),
+
+    where B is the beta function and x >= 1.
+    If the shape parameter is too small, the distribution is approximated by a uniform
+    distribution.
+    """
+
+    @staticmethod
+    def pmf(params, domain=co.DEFAULT_PDF_MAX, out=None):
+        """
+        Probability mass function.
+
+        :param params: single element list containing the shape (rho) parameter.
+        :param domain: domain size.
+        :param out: optional buffer of length domain+1.
+        :return: probability mass function.
+        """
+        if params[0] < co.EPSILON:
+            return co.uniform.pmf(None, domain, out)
+        else:
+            _pmf = YuleSimon.log_pmf(params, grids.x(domain), co.buffer(out, domain+1))
+            return np.exp(_pmf, out=_pmf)
+
+    @staticmethod
+    def log_pmf(params, x, out=None):
+        """
+        Logarithm of the probability mass function.
+
+        :param params: single element list containing the shape (rho) parameter.
+        :param x: non-negative integer values as a scalar or numpy array.
+        :param out: optional buffer with the shape of x.
+        :return: log-probabilities with the shape of x.
+        """
+        if params[0] < co.EPSILON:
+            return co.uniform.log_pmf(None, x, out)
+        else:
+            _x = np.asarray(x, dtype=float)
+            with np.errstate(invalid='ignore'):
+                return co.where(_x > 0, np.log(params[0]) + sp.betaln(_x, params[0]+1), -np.inf, out)
+
+    @staticmethod
+    def samples(params, size=co.DEFAULT_SAMPLE_SIZE, domain=co.DEFAULT_SAMPLE_MAX, rng=None):
+        """
+        Returns samples with Yule-Simon distribution.
+        These are geometric samples with an exponentially distributed log success
+        probability.
+
+        :param params: single element list containing the shape (rho) parameter.
+        :param size: number of samples.
+        :param domain: domain size for the uniform approximation.
+        :param rng: random number generator, numpy's global generator is used if not given.
+        :return: numpy array of samples.
+        """
+        if params[0] < co.EPSILON:
+            return co.uniform.samples(None, size, domain, rng=rng)
+        else:
+            return stats.yulesimon.rvs(params[0], size=size, random_state=rng)
+
+    @staticmethod
+    def log_likelihood(params, data, nonzero_only=False):
+        """
+        Calculates the log-likelihood on the data.
+        Zero values are outside of the support and they are ignored.
+
+        :param params: single element list containing the shape (rho) parameter, or a
+        matrix of such parameter vectors.
+        :param data: input data as a numpy array or histogram.
+        :param nonzero_only: unused.
+        :return: log-likelihood.
+        """
+        _data = hi.summarize(data)
+        _params, single = co.batch(params)
+        nonzero_samples = _data.nonzero()
+        rho = _params[:, 0]
+        ll = np.empty(len(_params))
+        uniform = rho < co.EPSILON
+        ll[uniform] = co.uniform.log_likelihood(None, _data)
+        ll[~uniform] = nonzero_samples.size*np.log(rho[~uniform])\
+            + nonzero_samples.sum(lambda x: sp.betaln(x, rho[~uniform, np.newaxis]+1))
+        return co.unbatch(ll, single)
+
+    @staticmethod
+    def initial_params(data):
+        """
+        Estimates the shape parameter from the mean m of the nonzero values, which is
+        rho/(rho-1) for rho > 1.
+
+        :param data: histogram of the data.
+        :return: single element list containing the shape (rho) parameter.
+        """
+        m = data.nonzero().mean
+        return [min(m/(m-1), 100.0) if m > 1 else 100.0]
+
+    @staticmethod
+    def get_params(params):
+        return "rho = %.5f" % params[0]
+yule_simon = YuleSimon()
@@ -5,12 +5,14 @@
 # date           : 2015.06.10
 # version        : 0.1
 # usage          : python model.py
-# TODO log-logistic, logistic, gumbel
 # ===================================================================
+import numpy as np
 from sys import exit
 from core import args
 from core import utils
+from core import tables
 from distributions import distribution as dist
+from calculation import fit
 from calculation import model_selection as ms
 
 
@@ -23,6 +25,41 @@ params = a\
          help='Output file, results are stored here.')\
     .add(key='--select', dest='select', default=None,
          help='Model selection with the given method to use (%s)' % ', '.join(ms.AVAILABLE_METHODS))\
+    .add(key='--fit-mode', dest='fit_mode', default=fit.FIT_MODE_LOCAL,
+         help='Fitting mode to use (%s)' % ', '.join(fit.AVAILABLE_MODES))\
+    .add(key='--sequential', dest='sequential', action='store_true', default=False,
+         help='Estimate K-S p-values sequentially, stopping as soon as they are precise enough')\
+    .add(key='--significance', dest='significance', type=float, default=None,
+         help='Significance level at which sequential K-S p-value estimation stops')\
+    .add(key='--refit', dest='refit', action='store_true', default=False,
+         help='Refit the synthetic samples of the K-S p-values')\
+    .add(key='--confidence', dest='confidence', type=float, default=None,
+         help='Confidence level of the bootstrap intervals of the fitted parameters')\
+    .add(key='--errors', dest='errors', action='store_true', default=False,
+         help='Print asymptotic standard errors of the maximum likelihood estimates')\
+    .add(key='--folds', dest='folds', type=int, default=ms.CV_FOLDS,
+         help='Number of folds of the cross-validated model selection')\
+    .add(key='--fit-xmin', dest='fit_xmin', action='store_true', default=False,
+         help='Fit the power-law tails above their optimal x_min (%s)' % ', '.join(fit.XMIN_DISTRIBUTIONS))\
+    .add(key='--executor', dest='executor', default=None,
+         help='Executor to run fits and bootstraps in parallel (%s)' % ', '.join(ms.AVAILABLE_EXECUTORS))\
+    .add(key='--workers', dest='workers', type=int, default=None,
+         help='Number of local workers of the executor')\
+    .add(key='--batch', dest='batch', default=None,
+         help='Directory or glob of input files to select models for in one run, --output is a directory')\
+    .add(key='--generate', dest='generate', default=None,
+         help='Generate a synthetic sample from the given distribution (%s) into --output, '
+              'a binary file if it ends with .npy and a histogram file otherwise' % ', '.join(dist.get()))\
+    .add(key='--params', dest='params', default=None,
+         help='Comma separated parameters of the distribution to generate from')\
+    .add(key='--size', dest='size', type=int, default=None,
+         help='Size of the generated sample')\
+    .add(key='--seed', dest='seed', type=int, default=None,
+         help='Seed of the generated sample')\
+    .add(key='--build-tables', dest='build_tables', action='store_true', default=False,
+         help='Build the lookup tables of the normalizing constants in %s' % tables.TABLE_DIR)\
+    .add(key='--serve', dest='serve', default=None,
+         help='Run as a service listening on the given host:port or Unix socket path')\
     .add(key='--test-sampling', dest='test_sampling', default=None,
          help='Test sampling from the given distribution (%s)' % ', '.join(dist.get()))\
     .add(key='--test-mle-fit', dest='test_mle_fit', default=None,
@@ -35,6 +72,22 @@ params = a\
          help='Test BIC model selection for the given distribution (%s)' % ', '.join(dist.get()))\
     .add(key='--test-ks-ms', dest='test_ks_ms', default=None,
          help='Test K-S model selection for the given distribution (%s)' % ', '.join(dist.get()))\
+    .add(key='--test-lrt-ms', dest='test_lrt_ms', default=None,
+         help='Test LRT model selection for the given distribution (%s)' % ', '.join(dist.get()))\
+    .add(key='--test-cv-ms', dest='test_cv_ms', default=None,
+         help='Test CV model selection for the given distribution (%s)' % ', '.join(dist.get()))\
+    .add(key='--test-xmin-fit', dest='test_xmin_fit', default=None,
+         help='Test x_min scan for the given distribution (%s)' % ', '.join(dist.get()))\
+    .add(key='--test-reductions', dest='test_reductions', action='store_true', default=False,
+         help='Test the chunked reductions of samples with many unique values')\
+    .add(key='--test-heavy-tails', dest='test_heavy_tails', action='store_true', default=False,
+         help='Test the discretized distributions far in their tails')\
+    .add(key='--test-service', dest='test_service', action='store_true', default=False,
+         help='Test the model selection service')\
+    .add(key='--test-information', dest='test_information', action='store_true', default=False,
+         help='Test the information matrices and standard errors of the MLE fits')\
+    .add(key='--test-output-buffers', dest='test_output_buffers', action='store_true', default=False,
+         help='Test that the probability mass functions write into the given buffers')\
     .get()
 
 # Testing
@@ -56,9 +109,108 @@ if params['test_bic_ms'] is not None:
 if params['test_ks_ms'] is not None:
     from tests import test_ks_ms
     test_ks_ms(params['test_ks_ms'])
+if params['test_lrt_ms'] is not None:
+    from tests import test_lrt_ms
+    test_lrt_ms(params['test_lrt_ms'])
+if params['test_cv_ms'] is not None:
+    from tests import test_cv_ms
+    test_cv_ms(params['test_cv_ms'])
+if params['test_xmin_fit'] is not None:
+    from tests import test_fit_xmin
+    test_fit_xmin(params['test_xmin_fit'])
+if params['test_reductions']:
+    from tests import test_reductions
+    test_reductions()
+if params['test_heavy_tails']:
+    from tests import test_heavy_tails
+    test_heavy_tails()
+if params['test_service']:
+    from tests import test_service
+    test_service()
+if params['test_information']:
+    from tests import test_information
+    test_information()
+if params['test_output_buffers']:
+    from tests import test_output_buffers
+    test_output_buffers()
+
+# Service
+if params['serve'] is not None:
+    from calculation import service
+    print("starting service")
+    service.serve(params['serve'], params['workers'])
+    exit()
+
+# Tables
+if params['build_tables']:
+    executor = None
+    if params['executor'] is not None:
+        executor = ms.get_executor(params['executor'], params['workers'])
+    print("building tables")
+    try:
+        for table in tables.build(executor=executor):
+            print("  %s: %i of %i cells within %g (max error %g)" % (table.name, int(np.sum(table.valid)),
+                                                                    table.valid.size, table.tolerance, table.error))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    exit()
+
+# Generation
+if params['generate'] is not None:
+    if params['generate'] not in dist.get() or params['params'] is None or params['size'] is None\
+            or params['output'] is None:
+        print("Error: generation needs a valid distribution, parameters, sample size and output file.")
+        exit()
+    executor = None
+    if params['executor'] is not None:
+        executor = ms.get_executor(params['executor'], params['workers'])
+    print("generating %i samples" % params['size'])
+    chunks = dist.sample_chunks(params['generate'], [float(p) for p in params['params'].split(',')], params['size'],
+                                seed=params['seed'], executor=executor)
+    try:
+        if params['output'].endswith('.npy'):
+            utils.write_sample_chunks(params['output'], chunks, params['size'])
+        else:
+            utils.write_histogram_chunks(params['output'], chunks)
+    except ValueError as error:
+        print("Error: %s" % error)
+    finally:
+        chunks.close()
+        if executor is not None:
+            executor.shutdown()
+    exit()
+
+# Fitting mode
+if params['fit_mode'] not in fit.AVAILABLE_MODES:
+    print("Error: unknown fitting mode: %s" % params['fit_mode'])
+    exit()
+
+# Batch
+if params['batch'] is not None:
+    if params['select'] is None or params['output'] is None:
+        print("Error: batch mode needs a model selection method and an output directory.")
+        exit()
+    inputs = ms.batch_inputs(params['batch'])
+    if len(inputs) == 0:
+        print("Error: no input files match %s." % params['batch'])
+        exit()
+    print("starting %s executor" % (params['executor'] or ms.EXECUTOR_PROCESS))
+    try:
+        executor = ms.get_executor(params['executor'] or ms.EXECUTOR_PROCESS, params['workers'])
+    except ValueError as error:
+        print("Error: %s" % error)
+        exit()
+    try:
+        ms.perform_batch(inputs, params['output'], params['select'], mode=params['fit_mode'], executor=executor)
+    except ValueError as error:
+        print("Error: %s" % error)
+    finally:
+        executor.shutdown()
+    exit()
 
 # Calculations
-if params['select'] is not None:
+if params['select'] is not None or params['fit_xmin']:
     # check if input/output files were given
     errNum = 0
     if params['input'] is None:
@@ -67,20 +219,53 @@ if params['select'] is not None:
     if params['output'] is None:
         print("Error: no output file was given.")
         errNum += 1
+    if params['folds'] < 2:
+        print("Error: the number of folds must be at least 2.")
+        errNum += 1
     if errNum > 0:
         exit()
 
     print("reading data")
-    data = []
-    for row in utils.read_csv(params['input']):
-        if len(row) > 0:
-            data.append(float(row[0]))
+    try:
+        data = utils.read_sample(params['input'])
+    except ValueError as error:
+        print("Error: %s" % error)
+        exit()
+
+    executor = None
+    if params['executor'] is not None:
+        print("starting %s executor" % params['executor'])
+        try:
+            executor = ms.get_executor(params['executor'], params['workers'])
+        except ValueError as error:
+            print("Error: %s" % error)
+            exit()
+        if hasattr(executor, 'publish'):
+            data = executor.publish(data)
 
     if params['select'] == ms.MODEL_SELECTION_METHOD_AIC:
-        ms.perform_aic_test(data, params['output'])
+        ms.perform_aic_test(data, params['output'], mode=params['fit_mode'], confidence=params['confidence'],
+                            errors=params['errors'], executor=executor)
 
     if params['select'] == ms.MODEL_SELECTION_METHOD_BIC:
-        ms.perform_bic_test(data, params['output'])
+        ms.perform_bic_test(data, params['output'], mode=params['fit_mode'], confidence=params['confidence'],
+                            errors=params['errors'], executor=executor)
 
     if params['select'] == ms.MODEL_SELECTION_METHOD_KS:
-        ms.perform_ks_test(data, params['output'])
+        ms.perform_ks_test(data, params['output'], mode=params['fit_mode'],
+                           sequential=params['sequential'], significance=params['significance'],
+                           refit=params['refit'], confidence=params['confidence'], executor=executor)
+
+    if params['select'] == ms.MODEL_SELECTION_METHOD_LRT:
+        ms.perform_lrt_test(data, params['output'], mode=params['fit_mode'], confidence=params['confidence'],
+                            errors=params['errors'], executor=executor)
+
+    if params['select'] == ms.MODEL_SELECTION_METHOD_CV:
+        ms.perform_cv_test(data, params['output'], folds=params['folds'], mode=params['fit_mode'],
+                           confidence=params['confidence'], errors=params['errors'], executor=executor)
+
+    if params['fit_xmin']:
+        ms.perform_xmin_fit(data, params['output'], executor=executor)
+
+    if executor is not None:
+        executor.shutdown()
@@ -16,7 +16,7 @@ do
 		printf "usage:\\ntest.sh [options]\n"
 		printf "options:\n"
 		printf "  -h     print help menu.\n"
-		printf "  -t     test type ([mle-fit], ks-fit, aic-ms, bic-ms, ks-ms).\n"
+		printf "  -t     test type ([mle-fit], ks-fit, aic-ms, bic-ms, ks-ms, lrt-ms, cv-ms, xmin-fit).\n"
 		exit
 		;;
 	esac
@@ -24,11 +24,17 @@ done
 
 # run all tests
 for d in exponential \
+		 geometric \
+		 gumbel \
+		 log-logistic \
+		 logistic \
 		 lognormal \
+		 negative-binomial \
 		 normal \
 		 poisson \
 		 shifted-power-law \
 		 truncated-power-law \
-		 weibull; do
+		 weibull \
+		 yule-simon; do
 	./model.py --test-${TEST} $d
 done
@@ -6,13 +6,21 @@
 #version        : 0.1
 #usage          : python tests.py
 #=========================================================================
+import asyncio
+import json
 import numpy as np
+from itertools import combinations
 from mpmath import exp
+from core import core as co
 from core import utils
+from core import histogram as hi
+from core import shared
 from distributions import distribution as dist
 from calculation import fit
+from calculation import bootstrap as bs
 from calculation import measures as me
-from calculation.model_selection import print_pmfs
+from calculation.model_selection import print_pmfs, pointwise_log_likelihood, cross_validate
+from calculation.service import SelectionService
 
 
 def test_sampling(distribution):
@@ -189,13 +197,263 @@ def test_ks_ms(distribution):
             best_model = d
         print("    %s" % dist.get_params(fit_results[d]['params'], d))
         print("    D = %r" % fit_results[d]['D'])
-        params = fit_results[d]['params']
-        p = 0
-        for r in range(100):
-            synthetic_sample = dist.samples(d, params, len(test_sample))
-            ksd = me.ks_statistics(dist.get_sample_cdf(synthetic_sample), dist.cdf(d, params, np.max(synthetic_sample)))
-            if ksd > fit_results[d]['D']:
-                p += 1
-        print("    p = %r" % (float(p)/100.0))
+        p, replicates = bs.ks_p_value(d, fit_results[d]['params'], fit_results[d]['D'], len(test_sample),
+                                      sequential=True)
+        print("    p = %r (%i synthetic samples)" % (p, replicates))
     print("  Best fitting model: %s" % best_model.upper())
-    print_pmfs(test_sample, fit_results, 'TEST-KS.CSV')
\ No newline at end of file
+    print_pmfs(test_sample, fit_results, 'TEST-KS.CSV')
+
+
+def test_lrt_ms(distribution):
+    """
+    Tests LRT model selection.
+    During the test, this method generates a sample with the specified distribution and then
+    performs Vuong's likelihood ratio test for all pairs of distributions. Finally, the one with
+    the most significant wins is chosen. The pointwise log-likelihoods weighted by the counts
+    are printed along with the log-likelihood of each fit, which they should sum to.
+
+    :param distribution: distribution to test.
+    """
+    print("TESTING: LRT model selection for %s distribution" % distribution.upper())
+    params = dist.DISTRIBUTIONS[distribution][dist.KEY_TEST_PARAMS]
+    print("  creating sample")
+    test_sample = dist.samples(distribution, params)
+    print("  calculating pointwise log-likelihoods for all distributions")
+    print("  input parameters: %s" % dist.get_params(params, distribution))
+    values, counts = np.unique(test_sample, return_counts=True)
+    fit_results = {}
+    pointwise = {}
+    for d in dist.get():
+        fit_results[d] = fit.fit_mle(d, test_sample)
+        pointwise[d] = pointwise_log_likelihood(d, fit_results[d]['params'], test_sample)
+        print("  %s: pointwise total = %r, log-likelihood = %r" % (
+            d.upper(), float(np.dot(counts, pointwise[d])), fit_results[d]['log-likelihood']))
+    wins = {d: 0 for d in dist.get()}
+    for d1, d2 in combinations(dist.get(), 2):
+        ratio, p = me.vuong_test(pointwise[d1], pointwise[d2], counts)
+        if p < 0.1:
+            wins[d1 if ratio > 0 else d2] += 1
+        print("  %s vs %s: R = %.0f, p = %r" % (d1.upper(), d2.upper(), ratio, p))
+    best_model = max(dist.get(), key=lambda d: wins[d])
+    print("  Most likely model: %s" % best_model.upper())
+    print_pmfs(test_sample, fit_results, 'TEST-LRT.CSV')
+
+
+def test_cv_ms(distribution):
+    """
+    Tests cross-validated model selection.
+    During the test, this method generates a sample with the specified distribution and then
+    calculates the held-out log-likelihood of all distributions over k folds. Finally, the one
+    with the largest mean held-out log-likelihood is chosen.
+
+    :param distribution: distribution to test.
+    """
+    print("TESTING: CV model selection for %s distribution" % distribution.upper())
+    params = dist.DISTRIBUTIONS[distribution][dist.KEY_TEST_PARAMS]
+    print("  creating sample")
+    test_sample = dist.samples(distribution, params)
+    print("  cross-validating all distributions")
+    print("  input parameters: %s" % dist.get_params(params, distribution))
+    fit_results = {d: fit.fit_mle(d, test_sample) for d in dist.get()}
+    cv = cross_validate(test_sample, fit_results)
+    for d in dist.get():
+        print("  %s: CV = %r +- %r" % (d.upper(), cv[d][0], cv[d][1]))
+    best_model = max(dist.get(), key=lambda d: cv[d][0])
+    print("  Most likely model: %s" % best_model.upper())
+    print_pmfs(test_sample, fit_results, 'TEST-CV.CSV')
+
+
+def test_fit_xmin(distribution):
+    """
+    Tests the x_min scan of the power-law distributions.
+    During the test, this method generates a sample with the specified distribution and then
+    fits the tail of both power-law distributions above their optimal x_min.
+
+    :param distribution: distribution to test.
+    """
+    print("TESTING: x_min scan for %s distribution" % distribution.upper())
+    params = dist.DISTRIBUTIONS[distribution][dist.KEY_TEST_PARAMS]
+    print("  creating sample")
+    test_sample = dist.samples(distribution, params)
+    print("  input parameters: %s" % dist.get_params(params, distribution))
+    for d in fit.XMIN_DISTRIBUTIONS:
+        fit_result = fit.fit_xmin(d, test_sample)
+        print("  %s:" % d.upper())
+        print("    fit parameters: %s" % dist.get_params(fit_result['params'], d))
+        print("    x_min: %i" % fit_result['xmin'])
+        print("    tail size: %i" % fit_result['tail-size'])
+        print("    log-likelihood: %r" % fit_result['log-likelihood'])
+        print("    K-S statistics: %r" % fit_result['D'])
+
+
+def _reduction_total(n):
+    """
+    Returns the total of a fresh histogram of n unique values, for a worker process.
+
+    :param n: number of unique values.
+    :return: total of the histogram.
+    """
+    return hi.Histogram(np.arange(n, dtype=float), np.ones(n)).total
+
+
+def test_reductions():
+    """
+    Tests the chunked reductions of samples with many unique values.
+    The variance is read first on a fresh histogram, whose reduction needs the total. Then
+    a reduction is run whose function reduces another fresh histogram, so that pooled
+    reductions are started from within the reduction threads. Then the negative binomial,
+    whose initial parameters use the variance, is fitted on a sample of the same kind.
+    Finally, a reduction runs in the workers of a pool forked after the reduction pool of
+    this process was started.
+    """
+    print("TESTING: chunked reductions")
+    n = hi.REDUCTION_CHUNK_SIZE*(hi.REDUCTION_THREADS+1)
+    values = np.arange(n, dtype=float)
+    print("  number of unique values: %i" % n)
+    variance = hi.Histogram(values, np.ones(n)).variance
+    print("  variance: %r (expected %r)" % (float(variance), float(np.var(values))))
+    nested = hi.Histogram(values, np.ones(n)).sum(lambda x: np.full(len(x), _reduction_total(n)))
+    print("  nested reduction: %r (expected %r)" % (float(nested), float(n*np.sum(values))))
+    fit_result = fit.fit_mle('negative-binomial', np.arange(1, n+1, dtype=np.uint32))
+    print("  negative binomial fit: %s" % dist.get_params(fit_result['params'], 'negative-binomial'))
+    pool = shared.WorkerPool(2)
+    try:
+        total = pool.submit(_reduction_total, n).result(timeout=60)
+        print("  total in a worker: %r (expected %r)" % (float(total), float(np.sum(values))))
+    finally:
+        pool.shutdown()
+
+
+def test_heavy_tails():
+    """
+    Tests the discretized distributions far in their tails.
+    Log-probabilities of the log-logistic, logistic and Gumbel distributions are evaluated at
+    values of 1e4 and above, where the survival functions of scipy underflow. Then the
+    log-logistic distribution is fitted to a Zipf sample, whose largest values lie there.
+    """
+    print("TESTING: heavy tails")
+    x = np.array([1e4, 1e5, 1e6, 1e9])
+    print("  values: %s" % x)
+    for d in ['log-logistic', 'logistic', 'gumbel']:
+        params = dist.DISTRIBUTIONS[d][dist.KEY_TEST_PARAMS]
+        print("  %s log-probabilities: %s" % (d.upper(), dist.log_pmf(d, params, x)))
+    print("  creating Zipf(2.2) sample")
+    test_sample = np.random.zipf(2.2, 300000)
+    print("  largest value: %i" % np.max(test_sample))
+    fit_result = fit.fit_mle('log-logistic', test_sample)
+    print("  log-logistic fit: %s" % dist.get_params(fit_result['params'], 'log-logistic'))
+    print("  log-likelihood: %r" % fit_result['log-likelihood'])
+
+
+async def _request(address, verb, path, body=b''):
+    """
+    Sends an HTTP request to the service and reads its response.
+
+    :param address: (host, port) tuple of the service.
+    :param verb: HTTP method.
+    :param path: requested path.
+    :param body: request body.
+    :return: tuple of the status code and the decoded response.
+    """
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(("%s %s HTTP/1.1\r\nContent-Length: %i\r\n\r\n" % (verb, path, len(body))).encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+async def _exercise_service(service, body):
+    """
+    Sends two selection requests at once to a service accepting a single pending request,
+    then repeats the request and reads the metrics.
+
+    :param service: selection service.
+    :param body: body of the selection requests.
+    :return: tuple of the statuses of the concurrent requests, the repeated response and
+    the metrics.
+    """
+    server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+    address = server.sockets[0].getsockname()[:2]
+    async with server:
+        concurrent = await asyncio.gather(_request(address, 'POST', '/select', body),
+                                          _request(address, 'POST', '/select', body))
+        repeated = await _request(address, 'POST', '/select', body)
+        metrics = await _request(address, 'GET', '/metrics')
+    return [status for status, _ in concurrent], repeated, metrics[1]
+
+
+def test_service():
+    """
+    Tests the model selection service.
+    During the test, a service accepting a single pending request is started on a free local
+    port. Two selection requests are sent at the same time, one of which should be rejected
+    with 503, then the request is repeated, which should be served from the result cache.
+    """
+    print("TESTING: model selection service")
+    params = dist.DISTRIBUTIONS['poisson'][dist.KEY_TEST_PARAMS]
+    print("  creating sample")
+    summary = hi.summarize(dist.samples('poisson', params))
+    body = json.dumps({'method': 'aic', 'values': summary.values.tolist(), 'counts': summary.counts.tolist()}).encode()
+    service = SelectionService(max_pending=1)
+    try:
+        statuses, repeated, metrics = asyncio.run(_exercise_service(service, body))
+    finally:
+        service.close()
+    print("  concurrent requests: %s (expected one 200 and one 503)" % sorted(statuses))
+    print("  repeated request: %i, best model: %s" % (repeated[0], repeated[1]['best'].upper()))
+    print("  cache hits: %i (expected 1)" % metrics['cache-hits'])
+    print("  rejected: %i (expected 1)" % metrics['rejected'])
+
+
+def test_information():
+    """
+    Tests the observed Fisher information and the standard errors of the MLE fits.
+    During the test, every distribution is fitted on a sample from its own distribution with
+    standard errors. Where the information is given in closed form, it is compared to the
+    negative of the finite difference Hessian of the log-likelihood at the fit, which
+    should agree to a small relative difference. All standard errors should be finite.
+    """
+    print("TESTING: information matrices")
+    for d in dist.get():
+        params = dist.DISTRIBUTIONS[d][dist.KEY_TEST_PARAMS]
+        summary = hi.summarize(dist.samples(d, params))
+        fit_result = fit.fit_mle(d, summary, errors=True)
+        print("  %s:" % d.upper())
+        print("    fit parameters: %s" % dist.get_params(fit_result['params'], d))
+        information = dist.information(d, fit_result['params'], summary)
+        if information is not None:
+            numerical = -fit._hessian(d, fit_result['params'], summary)
+            print("    relative difference from the Hessian: %r" % float(
+                np.max(np.abs(information-numerical))/np.max(np.abs(information))))
+        print("    standard errors: %s (%s)" % (
+            dist.get_params(fit_result['standard-errors'], d),
+            'finite' if np.all(np.isfinite(fit_result['standard-errors'])) else 'NOT FINITE'))
+
+
+def test_output_buffers():
+    """
+    Tests that the probability mass functions write into the buffers they are given.
+    During the test, the pmf and log-pmf of every distribution are calculated with an output
+    buffer at the test parameters and at the parameters with one of them set below EPSILON,
+    which select the approximating delta and uniform distributions. The functions should
+    return the buffer itself, with the same values as without a buffer.
+    """
+    print("TESTING: output buffers")
+    domain = 1000
+    x = np.arange(domain+1, dtype=float)
+    for d in dist.get():
+        params = dist.DISTRIBUTIONS[d][dist.KEY_TEST_PARAMS]
+        cases = [list(params)] + [[0.5*co.EPSILON if j == i else p for j, p in enumerate(params)]
+                                  for i in range(len(params))]
+        failures = []
+        for case in cases:
+            pmf_buffer, log_pmf_buffer = np.empty(domain+1), np.empty(domain+1)
+            pmf = dist.pmf(d, case, domain, out=pmf_buffer)
+            log_pmf = dist.log_pmf(d, case, x, out=log_pmf_buffer)
+            if pmf is not pmf_buffer or not np.array_equal(pmf, dist.pmf(d, case, domain)):
+                failures.append("pmf at %s" % case)
+            if log_pmf is not log_pmf_buffer or not np.array_equal(log_pmf, dist.log_pmf(d, case, x)):
+                failures.append("log-pmf at %s" % case)
+        print("  %s: %s" % (d.upper(), ', '.join(failures) if failures else 'ok'))